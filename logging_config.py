@@ -1,11 +1,154 @@
+import atexit
+import itertools
 import logging
+import os
+import queue
+from logging.handlers import QueueHandler, QueueListener
+from typing import Any, Dict, Iterator, List, Optional, Set, Tuple
+
+# Все логгеры пишут в один файл через очередь: запись на диск идет в фоновом потоке QueueListener
+LOG_FILE = os.getenv("LOG_FILE", "main.log")
+# Уровень задается переменной окружения LOG_LEVEL; DEBUG-сообщения ниже уровня не форматируются вовсе
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+LOG_FORMAT = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+# Объемные данные (списки операций, ответы) в DEBUG-сообщениях: из каждых PAYLOAD_SAMPLE_EVERY записей
+# одного места вызова пишется одна, в записи не больше PAYLOAD_ITEMS элементов и PAYLOAD_LIMIT символов
+PAYLOAD_SAMPLE_EVERY = int(os.getenv("LOG_PAYLOAD_SAMPLE_EVERY", "10"))
+PAYLOAD_ITEMS = 5
+PAYLOAD_LIMIT = 1000
+
+
+class Payload:
+    """
+    Объемные данные для сообщения лога: в строку приводятся только при записи сообщения
+    и обрезаются до PAYLOAD_ITEMS элементов и PAYLOAD_LIMIT символов.
+
+    Пример: logger.debug("Результат: %s", Payload(transactions)).
+    """
+
+    __slots__ = ("value",)
+
+    def __init__(self, value: Any) -> None:
+        self.value = value
+
+    def __str__(self) -> str:
+        value = self.value
+        if isinstance(value, (list, tuple)) and len(value) > PAYLOAD_ITEMS:
+            text = f"{list(value[:PAYLOAD_ITEMS])} ... (всего {len(value)})"
+        else:
+            text = str(value)
+        if len(text) > PAYLOAD_LIMIT:
+            text = f"{text[:PAYLOAD_LIMIT]} ... ({len(text)} символов)"
+        return text
+
+    __repr__ = __str__
+
+
+class PayloadSampler(logging.Filter):
+    """Пропускает одну из every DEBUG-записей с Payload для каждого места вызова; остальные не форматируются."""
+
+    def __init__(self, every: int = PAYLOAD_SAMPLE_EVERY) -> None:
+        super().__init__()
+        self.every = max(1, every)
+        self._counters: Dict[Tuple[str, int], Iterator[int]] = {}
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if self.every == 1 or record.levelno > logging.DEBUG or not isinstance(record.args, tuple):
+            return True
+        if not any(isinstance(arg, Payload) for arg in record.args):
+            return True
+        # next() у itertools.count атомарен, поэтому счетчик безопасен для потоков
+        counter = self._counters.setdefault((record.pathname, record.lineno), itertools.count())
+        return next(counter) % self.every == 0
+
+
+class _DirectQueue:
+    """Очередь без фонового потока: записи сразу передаются обработчикам (после остановки и в дочерних процессах)."""
+
+    def __init__(self, handlers: List[logging.Handler]) -> None:
+        self.handlers = handlers
+
+    def put_nowait(self, record: logging.LogRecord) -> None:
+        for handler in self.handlers:
+            if record.levelno >= handler.level:
+                handler.handle(record)
+
+
+_queue_handler: Optional[QueueHandler] = None
+_listener: Optional[QueueListener] = None
+_level = LOG_LEVEL
+_loggers: Set[str] = set()
+
+
+def configure_logging(
+    file_path: str = LOG_FILE, level: str = LOG_LEVEL, sample_every: int = PAYLOAD_SAMPLE_EVERY
+) -> QueueHandler:
+    """
+    Настраивает общий конвейер логирования: QueueHandler у логгеров и QueueListener с записью в файл.
+
+    Повторный вызов перенастраивает конвейер (файл, уровень, выборку) для уже созданных логгеров.
+
+    Args:
+        file_path: Файл журнала.
+        level: Уровень логгеров ('DEBUG', 'INFO', ...).
+        sample_every: Из скольких DEBUG-записей с Payload одного места вызова пишется одна.
+
+    Returns:
+        Общий QueueHandler логгеров.
+    """
+    global _queue_handler, _listener, _level
+    shutdown_logging()
+
+    file_handler = logging.FileHandler(file_path, encoding="utf-8", delay=True)
+    file_handler.setFormatter(logging.Formatter(LOG_FORMAT))
+    log_queue: "queue.SimpleQueue[Any]" = queue.SimpleQueue()
+    if _queue_handler is None:
+        _queue_handler = QueueHandler(log_queue)
+        atexit.register(shutdown_logging)
+    _queue_handler.queue = log_queue
+    for log_filter in list(_queue_handler.filters):
+        _queue_handler.removeFilter(log_filter)
+    _queue_handler.addFilter(PayloadSampler(sample_every))
+
+    _listener = QueueListener(log_queue, file_handler)
+    _listener.start()
+    _level = level.upper()
+    for name in _loggers:
+        logging.getLogger(name).setLevel(_level)
+    return _queue_handler
+
+
+def shutdown_logging() -> None:
+    """Дописывает записи из очереди и останавливает фоновый поток; дальше записи пишутся синхронно."""
+    global _listener
+    if _listener is None or _queue_handler is None:
+        return
+    listener, _listener = _listener, None
+    listener.stop()
+    handlers = list(listener.handlers)
+    for handler in handlers:
+        handler.flush()
+    _queue_handler.queue = _DirectQueue(handlers)  # type: ignore[assignment]
+
+
+def _after_fork_in_child() -> None:
+    """В дочернем процессе фонового потока нет: записи пишутся синхронно теми же обработчиками."""
+    global _listener
+    if _listener is not None and _queue_handler is not None:
+        _queue_handler.queue = _DirectQueue(list(_listener.handlers))  # type: ignore[assignment]
+        _listener = None
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_after_fork_in_child)
 
 
 def get_logger(name: str) -> logging.Logger:
+    """Возвращает логгер, подключенный к общему конвейеру; обработчик добавляется только один раз."""
+    handler = _queue_handler if _queue_handler is not None else configure_logging()
     logger = logging.getLogger(name)
-    logger.setLevel(logging.DEBUG)
-    handler = logging.FileHandler("main.log")
-    formatter = logging.Formatter("%(asctime)s - %(name)s - %(levelname)s - %(message)s")
-    handler.setFormatter(formatter)
-    logger.addHandler(handler)
+    logger.setLevel(_level)
+    if handler not in logger.handlers:
+        logger.addHandler(handler)
+    _loggers.add(name)
     return logger
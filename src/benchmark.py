@@ -0,0 +1,259 @@
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+import pandas as pd
+
+from logging_config import get_logger
+from src.dataset import TransactionDataset
+from src.reports import category_expenses_report, weekday_expenses_report, weekday_vs_weekend_expenses_report
+from src.services import get_expenses, get_transactions
+from src.synthetic import generate_operations
+from src.views import filter_transactions_by_date, process_card_data, top_transactions
+
+logger = get_logger(__name__)
+
+# Размеры синтетической выгрузки; по умолчанию запускаются первые два, 1M и 10M — явно через --rows
+BENCHMARK_SIZES = [10_000, 100_000, 1_000_000, 10_000_000]
+DEFAULT_SIZES = BENCHMARK_SIZES[:2]
+BASELINE_FILE = "../data/benchmarks/baseline.json"
+# Допустимое ухудшение относительно базовой линии (доля) и минимальная разница, которая считается регрессией:
+# на малых размерах разброс в доли миллисекунды не должен давать ложных срабатываний
+REGRESSION_TOLERANCE = 0.25
+MIN_TIME_DELTA = 0.005
+MIN_MEMORY_DELTA = 1.0
+# Даты внутри периода синтетической выгрузки (src.synthetic.START_DATE..END_DATE)
+REPORT_DATE = "2021-06-01"
+FILTER_DATE = datetime(2020, 1, 1)
+
+# Замер: функция принимает набор и каталог для выходных файлов
+Benchmark = Callable[[TransactionDataset, str], Any]
+
+
+def _get_transactions(dataset: TransactionDataset, workdir: str) -> Any:
+    return get_transactions("Перевод", dataset=dataset, output_file=os.path.join(workdir, "search.json"), indent=None)
+
+
+BENCHMARKS: Dict[str, Benchmark] = {
+    "process_card_data": lambda dataset, workdir: process_card_data(dataset),
+    "top_transactions": lambda dataset, workdir: top_transactions(dataset),
+    "filter_transactions_by_date": lambda dataset, workdir: filter_transactions_by_date(dataset, FILTER_DATE),
+    "get_transactions": _get_transactions,
+    "get_expenses": lambda dataset, workdir: get_expenses(dataset, "Супермаркеты", REPORT_DATE),
+    "category_expenses_report": lambda dataset, workdir: category_expenses_report(
+        dataset, "Супермаркеты", REPORT_DATE
+    ),
+    "weekday_expenses_report": lambda dataset, workdir: weekday_expenses_report(dataset, REPORT_DATE),
+    "weekday_vs_weekend_expenses_report": lambda dataset, workdir: weekday_vs_weekend_expenses_report(
+        dataset, REPORT_DATE
+    ),
+}
+# Построение набора из выгрузки замеряется отдельно: остальные функции получают уже готовый набор
+DATASET_BENCHMARK = "TransactionDataset"
+METRICS = ["cold_s", "warm_s", "peak_mb"]
+
+
+def _peak_memory(function: Callable[[], Any]) -> float:
+    """Возвращает пиковый объем памяти (МБ), выделенной во время вызова (tracemalloc учитывает и NumPy)."""
+    tracemalloc.start()
+    try:
+        function()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return float(peak) / 2**20
+
+
+def measure(function: Callable[[], Any], repeat: int = 3) -> Dict[str, float]:
+    """
+    Замеряет время вызова функции.
+
+    Returns:
+        Словарь: cold_s — время первого вызова (с построением индексов и кэшей),
+        warm_s — лучшее время из repeat повторных вызовов.
+    """
+    start = time.perf_counter()
+    function()
+    result = {"cold_s": time.perf_counter() - start}
+    warm = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        warm.append(time.perf_counter() - start)
+    result["warm_s"] = min(warm) if warm else result["cold_s"]
+    return result
+
+
+def _call(name: str, operations: pd.DataFrame, base: TransactionDataset, workdir: str) -> Callable[[], Any]:
+    """Возвращает вызов замера name на свежем наборе (с пустыми кэшами)."""
+    if name == DATASET_BENCHMARK:
+        # Набор изменяет переданный DataFrame, поэтому каждый вызов получает копию
+        return lambda: TransactionDataset(operations.copy())
+    # Набор поверх готового канонического DataFrame строится без разбора дат и колонок
+    dataset = TransactionDataset(base.frame)
+    benchmark = BENCHMARKS[name]
+    return lambda: benchmark(dataset, workdir)
+
+
+def run_benchmarks(
+    sizes: Sequence[int] = DEFAULT_SIZES,
+    names: Optional[Sequence[str]] = None,
+    repeat: int = 3,
+    memory: bool = True,
+    seed: int = 0,
+) -> Dict[str, Dict[str, Dict[str, float]]]:
+    """
+    Запускает замеры на синтетических выгрузках заданных размеров.
+
+    Каждая функция замеряется на своем свежем наборе, поэтому cold_s включает построение
+    нужных ей структур (куба, индексов), а не зависит от порядка замеров.
+
+    Args:
+        sizes: Размеры выгрузки (количество операций).
+        names: Имена замеров из BENCHMARKS (и DATASET_BENCHMARK); None — все.
+        repeat: Количество повторных вызовов для warm_s.
+        memory: Замерять пиковую память (отдельным вызовом под tracemalloc).
+        seed: Зерно генератора выгрузки.
+
+    Returns:
+        Результаты: {размер: {замер: {метрика: значение}}}.
+    """
+    selected = list(names) if names is not None else [DATASET_BENCHMARK, *BENCHMARKS]
+    unknown = set(selected) - set(BENCHMARKS) - {DATASET_BENCHMARK}
+    if unknown:
+        raise ValueError(f"Неизвестные замеры: {', '.join(sorted(unknown))}")
+
+    results: Dict[str, Dict[str, Dict[str, float]]] = {}
+    with tempfile.TemporaryDirectory() as workdir:
+        for rows in sizes:
+            operations = generate_operations(rows, seed)
+            base = TransactionDataset(operations.copy())
+            size_results: Dict[str, Dict[str, float]] = {}
+            for name in selected:
+                size_results[name] = measure(_call(name, operations, base, workdir), repeat)
+                if memory:
+                    size_results[name]["peak_mb"] = _peak_memory(_call(name, operations, base, workdir))
+                logger.info("Замер %s на %s операциях: %s", name, rows, size_results[name])
+            results[str(rows)] = size_results
+    return results
+
+
+def environment() -> Dict[str, Any]:
+    """Возвращает описание окружения для сравнения результатов между машинами."""
+    return {
+        "python": platform.python_version(),
+        "pandas": pd.__version__,
+        "machine": platform.machine(),
+        "processor": platform.processor(),
+        "cpus": os.cpu_count(),
+    }
+
+
+def load_baseline(path: str = BASELINE_FILE) -> Dict[str, Any]:
+    """Загружает базовую линию (пустую, если файла нет)."""
+    if not os.path.exists(path):
+        return {"environment": {}, "results": {}}
+    with open(path, encoding="utf-8") as f:
+        baseline: Dict[str, Any] = json.load(f)
+    return baseline
+
+
+def save_baseline(results: Dict[str, Dict[str, Dict[str, float]]], path: str = BASELINE_FILE) -> None:
+    """Сохраняет результаты как базовую линию; результаты других размеров и замеров сохраняются."""
+    baseline = load_baseline(path)
+    for rows, size_results in results.items():
+        baseline["results"].setdefault(rows, {}).update(size_results)
+    baseline["environment"] = environment()
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(baseline, f, indent=2, sort_keys=True)
+
+
+def compare(
+    results: Dict[str, Dict[str, Dict[str, float]]],
+    baseline: Dict[str, Any],
+    tolerance: float = REGRESSION_TOLERANCE,
+) -> List[str]:
+    """
+    Сравнивает результаты с базовой линией.
+
+    Returns:
+        Описания регрессий: метрики, которые хуже базовой линии больше чем на tolerance
+        (и больше чем на MIN_TIME_DELTA секунд или MIN_MEMORY_DELTA МБ).
+    """
+    regressions = []
+    for rows, size_results in results.items():
+        for name, metrics in size_results.items():
+            expected = baseline.get("results", {}).get(rows, {}).get(name, {})
+            for metric, value in metrics.items():
+                if metric not in expected:
+                    continue
+                floor = MIN_MEMORY_DELTA if metric == "peak_mb" else MIN_TIME_DELTA
+                if value > expected[metric] * (1 + tolerance) and value - expected[metric] > floor:
+                    regressions.append(
+                        f"{name} ({rows} строк): {metric} {value:.4f} против {expected[metric]:.4f} "
+                        f"(+{(value / expected[metric] - 1) * 100:.0f}%)"
+                    )
+    return regressions
+
+
+def format_results(results: Dict[str, Dict[str, Dict[str, float]]]) -> str:
+    """Форматирует результаты таблицей."""
+    lines = [f"{'rows':>10}  {'benchmark':<36}{'cold_s':>10}{'warm_s':>10}{'peak_mb':>10}"]
+    for rows, size_results in results.items():
+        for name, metrics in size_results.items():
+            values = "".join(f"{metrics[metric]:>10.4f}" if metric in metrics else f"{'-':>10}" for metric in METRICS)
+            lines.append(f"{rows:>10}  {name:<36}{values}")
+    return "\n".join(lines)
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    """
+    Запускает замеры из командной строки (из каталога src, как main.py):
+
+        python benchmark.py --rows 10000 100000 1000000 --save-baseline
+        python benchmark.py --compare
+
+    Returns:
+        Код завершения: 1, если при --compare найдены регрессии.
+    """
+    parser = argparse.ArgumentParser(description="Замеры времени и памяти функций views, reports и services")
+    parser.add_argument("--rows", type=int, nargs="+", default=DEFAULT_SIZES, help="размеры синтетической выгрузки")
+    parser.add_argument("--only", nargs="+", help="имена замеров")
+    parser.add_argument("--repeat", type=int, default=3, help="повторных вызовов для warm_s")
+    parser.add_argument("--no-memory", action="store_true", help="не замерять пиковую память")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--baseline", default=BASELINE_FILE, help="файл базовой линии")
+    parser.add_argument("--save-baseline", action="store_true", help="сохранить результаты как базовую линию")
+    parser.add_argument("--compare", action="store_true", help="сравнить с базовой линией")
+    parser.add_argument("--tolerance", type=float, default=REGRESSION_TOLERANCE)
+    parser.add_argument("--output", help="записать результаты в JSON")
+    args = parser.parse_args(argv)
+
+    results = run_benchmarks(args.rows, args.only, args.repeat, not args.no_memory, args.seed)
+    print(format_results(results))
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({"environment": environment(), "results": results}, f, indent=2)
+
+    exit_code = 0
+    if args.compare:
+        regressions = compare(results, load_baseline(args.baseline), args.tolerance)
+        for regression in regressions:
+            print(f"Регрессия: {regression}")
+        exit_code = 1 if regressions else 0
+    if args.save_baseline:
+        save_baseline(results, args.baseline)
+        print(f"Базовая линия сохранена в {args.baseline}")
+    return exit_code
+
+
+if __name__ == "__main__":
+    sys.exit(main())
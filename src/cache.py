@@ -0,0 +1,367 @@
+import glob
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+from logging_config import get_logger
+from src.utils import read_xlsx
+
+logger = get_logger(__name__)
+
+# Версия формата кэша: при изменении раскладки старые файлы перестраиваются
+CACHE_VERSION = 1
+CACHE_DIR_NAME = ".cache"
+META_KEY = "__meta__"
+
+# Расширения файлов выгрузок, которые ищутся в каталоге
+STATEMENT_EXTENSIONS = (".xls", ".xlsx", ".csv")
+# Колонки, которые load_statements добавляет к операциям
+SOURCE_COLUMN = "source"
+USER_COLUMN = "user"
+# Операции из разных файлов с одинаковыми значениями этих колонок считаются одной операцией
+DEDUP_COLUMNS = ["Дата операции", "Сумма операции", "Номер карты", "Описание"]
+
+
+def _hash_file(file_path: str, chunk_size: int = 1 << 20) -> str:
+    """Возвращает sha256 содержимого файла."""
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def file_fingerprint(file_path: str) -> Dict[str, Any]:
+    """Возвращает отпечаток файла: размер, время изменения и sha256."""
+    stat = os.stat(file_path)
+    return {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "sha256": _hash_file(file_path)}
+
+
+def cache_path_for(file_path: str, cache_dir: Optional[str] = None, name: str = "") -> str:
+    """Возвращает путь к файлу кэша для исходного файла (name — вид производных данных)."""
+    if cache_dir is None:
+        cache_dir = os.path.join(os.path.dirname(os.path.abspath(file_path)), CACHE_DIR_NAME)
+    suffix = f".{name}.npz" if name else ".npz"
+    return os.path.join(cache_dir, os.path.basename(file_path) + suffix)
+
+
+def _frame_arrays(df: pd.DataFrame) -> Tuple[Dict[str, np.ndarray], List[Dict[str, str]]]:
+    """Раскладывает DataFrame на массивы колоночного формата и описания колонок."""
+    arrays: Dict[str, np.ndarray] = {}
+    columns = []
+    for i, name in enumerate(df.columns):
+        series = df[name]
+        key = f"col_{i}"
+        if pd.api.types.is_datetime64_any_dtype(series):
+            kind = "datetime"
+            arrays[key] = series.to_numpy(dtype="datetime64[ns]")
+        elif pd.api.types.is_numeric_dtype(series) or pd.api.types.is_bool_dtype(series):
+            kind = "numeric"
+            arrays[key] = series.to_numpy()
+        else:
+            kind = "str"
+            mask = series.isna().to_numpy()
+            arrays[key] = np.where(mask, "", series.astype(str).to_numpy()).astype(str)
+            arrays[f"mask_{i}"] = mask
+        columns.append({"name": str(name), "kind": kind})
+    return arrays, columns
+
+
+def _meta_array(meta: Dict[str, Any], columns: List[Dict[str, str]], rows: int) -> np.ndarray:
+    return np.array(json.dumps(dict(meta, version=CACHE_VERSION, columns=columns, rows=rows), ensure_ascii=False))
+
+
+def save_frame(df: pd.DataFrame, path: str, meta: Dict[str, Any]) -> None:
+    """Сохраняет DataFrame в колоночном формате .npz вместе с метаданными."""
+    arrays, columns = _frame_arrays(df)
+    arrays[META_KEY] = _meta_array(meta, columns, len(df))
+
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    # Пишем во временный файл и атомарно подменяем, чтобы параллельные процессы не прочитали половину кэша
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as f:
+        np.savez(f, **arrays)  # type: ignore[arg-type]
+    os.replace(tmp_path, path)
+
+
+class FrameWriter:
+    """
+    Записывает DataFrame в колоночный формат .npz (как save_frame) по чанкам.
+
+    В памяти держится только текущий чанк: части колонок складываются во временный каталог
+    рядом с path, а при закрытии склеиваются в записи архива. Ширина строковых колонок
+    определяется по всем чанкам. Файл появляется атомарно при закрытии; при исключении
+    внутри with он не создается.
+
+    Пример:
+        with FrameWriter(path, {"source": ...}) as writer:
+            for chunk in chunks:
+                writer.write(chunk)
+    """
+
+    def __init__(self, path: str, meta: Optional[Dict[str, Any]] = None) -> None:
+        self.path = path
+        self.meta: Dict[str, Any] = dict(meta or {})
+        self.rows = 0
+        self._columns: Optional[List[Dict[str, str]]] = None
+        self._parts: Dict[str, List[str]] = {}
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._tmp_dir = tempfile.mkdtemp(prefix=".frame-", dir=os.path.dirname(path) or ".")
+
+    def write(self, chunk: pd.DataFrame) -> None:
+        """Добавляет строки чанка; колонки и их виды должны совпадать с первым чанком."""
+        arrays, columns = _frame_arrays(chunk)
+        if self._columns is None:
+            self._columns = columns
+            self._parts = {key: [] for key in arrays}
+        elif columns != self._columns:
+            raise ValueError(f"Колонки чанка не совпадают с первым чанком: {columns} != {self._columns}")
+        for key, values in arrays.items():
+            part = os.path.join(self._tmp_dir, f"{key}.{len(self._parts[key])}.npy")
+            np.save(part, values, allow_pickle=False)
+            self._parts[key].append(part)
+        self.rows += len(chunk)
+
+    def close(self) -> None:
+        """Склеивает части в файл .npz и удаляет временный каталог."""
+        try:
+            if self._columns is None:
+                save_frame(pd.DataFrame(), self.path, self.meta)
+                return
+            tmp_path = f"{self.path}.{os.getpid()}.tmp"
+            with zipfile.ZipFile(tmp_path, "w", allowZip64=True) as archive:
+                for key, parts in self._parts.items():
+                    self._write_column(archive, key, parts)
+                with archive.open(f"{META_KEY}.npy", "w", force_zip64=True) as f:
+                    np.lib.format.write_array(f, _meta_array(self.meta, self._columns, self.rows))
+            os.replace(tmp_path, self.path)
+        finally:
+            self.discard()
+
+    def _write_column(self, archive: zipfile.ZipFile, key: str, parts: List[str]) -> None:
+        # Заголовок .npy пишется по итоговому типу (для строк — по самой длинной строке всех чанков),
+        # данные — по одной части, поэтому колонка целиком в память не загружается
+        dtype = np.result_type(*[np.load(part, mmap_mode="r").dtype for part in parts])
+        with archive.open(f"{key}.npy", "w", force_zip64=True) as f:
+            header = {"descr": np.lib.format.dtype_to_descr(dtype), "fortran_order": False, "shape": (self.rows,)}
+            np.lib.format.write_array_header_2_0(f, header)
+            for part in parts:
+                f.write(np.ascontiguousarray(np.load(part).astype(dtype, copy=False)).tobytes())
+
+    def discard(self) -> None:
+        """Удаляет временные части без записи файла."""
+        shutil.rmtree(self._tmp_dir, ignore_errors=True)
+
+    def __enter__(self) -> "FrameWriter":
+        return self
+
+    def __exit__(self, exc_type: Any, exc: Any, traceback: Any) -> None:
+        if exc_type is None:
+            self.close()
+        else:
+            self.discard()
+
+
+def load_frame(path: str) -> Tuple[pd.DataFrame, Dict[str, Any]]:
+    """Загружает DataFrame и метаданные из колоночного файла .npz."""
+    with np.load(path, allow_pickle=False) as data:
+        meta: Dict[str, Any] = json.loads(str(data[META_KEY]))
+        columns: Dict[str, Any] = {}
+        for i, column in enumerate(meta["columns"]):
+            values = data[f"col_{i}"]
+            if column["kind"] == "str":
+                values = values.astype(object)
+                values[data[f"mask_{i}"]] = np.nan
+            columns[column["name"]] = values
+    return pd.DataFrame(columns), meta
+
+
+def _read_meta(path: str) -> Optional[Dict[str, Any]]:
+    """Читает только метаданные кэша, не загружая колонки."""
+    try:
+        with np.load(path, allow_pickle=False) as data:
+            meta: Dict[str, Any] = json.loads(str(data[META_KEY]))
+    except (OSError, KeyError, ValueError) as e:
+        logger.warning("Не удалось прочитать кэш %s: %s", path, e)
+        return None
+    if meta.get("version") != CACHE_VERSION:
+        return None
+    return meta
+
+
+def _load_cached(file_path: str, path: str, build: Callable[[], pd.DataFrame]) -> pd.DataFrame:
+    """Возвращает DataFrame из кэша path, если исходный файл не менялся, иначе строит и сохраняет его."""
+    stat = os.stat(file_path)
+    meta = _read_meta(path) if os.path.exists(path) else None
+    digest: Optional[str] = None
+    if meta is not None:
+        source = meta["source"]
+        if source["size"] == stat.st_size and source["mtime_ns"] == stat.st_mtime_ns:
+            logger.debug("Данные %s загружены из кэша %s", file_path, path)
+            return load_frame(path)[0]
+        if source["size"] == stat.st_size:
+            digest = _hash_file(file_path)
+            if digest == source["sha256"]:
+                logger.debug("Файл %s не изменился по содержимому, используется кэш %s", file_path, path)
+                return load_frame(path)[0]
+
+    logger.info("Построение кэша %s для файла %s", path, file_path)
+    df = build()
+    source = {
+        "size": stat.st_size,
+        "mtime_ns": stat.st_mtime_ns,
+        "sha256": digest if digest is not None else _hash_file(file_path),
+    }
+    try:
+        save_frame(df, path, {"source": source})
+    except OSError as e:
+        logger.warning("Не удалось сохранить кэш %s: %s", path, e)
+    return df
+
+
+def read_statement(file_path: str) -> pd.DataFrame:
+    """Разбирает файл выгрузки: CSV или Excel."""
+    if file_path.lower().endswith(".csv"):
+        return pd.read_csv(file_path)
+    return read_xlsx(file_path)
+
+
+def load_transactions(file_path: str, cache_dir: Optional[str] = None) -> pd.DataFrame:
+    """
+    Загружает транзакции из файла Excel (или CSV) через колоночный кэш.
+
+    Кэш привязан к размеру, времени изменения и sha256 исходного файла:
+    при совпадении размера и времени файл не перечитывается, при их изменении
+    сверяется хэш, и только если содержимое поменялось, Excel разбирается заново.
+
+    Args:
+        file_path: Путь к файлу Excel с транзакциями.
+        cache_dir: Каталог для файлов кэша (по умолчанию .cache рядом с исходным файлом).
+
+    Returns:
+        DataFrame с транзакциями.
+    """
+    if not os.path.exists(file_path):
+        # Без исходного файла ключ кэша не построить — отдаем разбор (и ошибку) читателю Excel
+        return read_statement(file_path)
+    return _load_cached(file_path, cache_path_for(file_path, cache_dir), lambda: read_statement(file_path))
+
+
+def load_derived(
+    file_path: str, name: str, build: Callable[[], pd.DataFrame], cache_dir: Optional[str] = None
+) -> pd.DataFrame:
+    """
+    Загружает производные данные (агрегаты, индексы) исходного файла из кэша рядом с кэшем транзакций.
+
+    Кэш считается актуальным по тем же правилам, что и в load_transactions;
+    иначе данные строятся вызовом build и сохраняются.
+    """
+    if not os.path.exists(file_path):
+        return build()
+    return _load_cached(file_path, cache_path_for(file_path, cache_dir, name), build)
+
+
+def statement_files(source: Union[str, Iterable[str]]) -> List[str]:
+    """
+    Возвращает список файлов выгрузок.
+
+    Args:
+        source: Каталог (ищутся .xls, .xlsx и .csv во всех подкаталогах), glob-шаблон,
+            путь к файлу или список путей.
+
+    Returns:
+        Отсортированный список путей (список путей возвращается в исходном порядке).
+    """
+    if not isinstance(source, str):
+        return list(source)
+    if os.path.isdir(source):
+        return sorted(
+            path
+            for path in glob.glob(os.path.join(source, "**", "*"), recursive=True)
+            if path.lower().endswith(STATEMENT_EXTENSIONS) and os.path.isfile(path)
+        )
+    if glob.has_magic(source):
+        return sorted(glob.glob(source, recursive=True))
+    return [source]
+
+
+def statement_user(file_path: str) -> str:
+    """Возвращает пользователя выгрузки — имя каталога, в котором лежит файл."""
+    return os.path.basename(os.path.dirname(os.path.abspath(file_path)))
+
+
+def _statement_cache_dir(file_path: str, cache_dir: Optional[str]) -> Optional[str]:
+    """Возвращает каталог кэша для файла выгрузки: у каждого исходного каталога свой (имена файлов повторяются)."""
+    if cache_dir is None:
+        return None
+    directory = os.path.dirname(os.path.abspath(file_path))
+    return os.path.join(cache_dir, hashlib.sha256(directory.encode("utf-8")).hexdigest()[:12])
+
+
+def drop_overlaps(frames: List[pd.DataFrame], columns: List[str] = DEDUP_COLUMNS) -> pd.DataFrame:
+    """
+    Объединяет DataFrame выгрузок, убирая операции, повторяющиеся в нескольких файлах.
+
+    Операция из следующего файла отбрасывается, если такая же уже встретилась в предыдущих.
+    Одинаковые операции внутри одного файла сохраняются: для каждой учитывается номер
+    повтора, поэтому k одинаковых строк файла перекрываются только k строками другого.
+    """
+    if not frames:
+        return pd.DataFrame()
+    keys = [column for column in columns if all(column in df.columns for df in frames)]
+    if not keys or len(frames) == 1:
+        return pd.concat(frames, ignore_index=True)
+
+    combined = pd.concat(frames, ignore_index=True)
+    occurrence = pd.concat([df.groupby(keys, sort=False, dropna=False).cumcount() for df in frames], ignore_index=True)
+    duplicated = combined[keys].assign(__occurrence=occurrence).duplicated()
+    if duplicated.any():
+        logger.info("Удалено %s повторяющихся операций из пересекающихся выгрузок", int(duplicated.sum()))
+    return combined[~duplicated.to_numpy()].reset_index(drop=True)
+
+
+def load_statements(
+    source: Union[str, Iterable[str]],
+    cache_dir: Optional[str] = None,
+    max_workers: Optional[int] = None,
+    user_of: Callable[[str], str] = statement_user,
+) -> pd.DataFrame:
+    """
+    Загружает операции из нескольких выгрузок (например, по файлу на пользователя в месяц).
+
+    Файлы разбираются параллельно в пуле процессов, каждый — через колоночный кэш
+    load_transactions. Операции, повторяющиеся в пересекающихся выгрузках, удаляются.
+
+    Args:
+        source: Каталог, glob-шаблон, путь к файлу или список путей (см. statement_files).
+        cache_dir: Каталог для файлов кэша (по умолчанию .cache рядом с каждым файлом).
+        max_workers: Число процессов (по умолчанию по числу ядер; 1 — разбор в текущем процессе).
+        user_of: Функция, определяющая пользователя по пути файла.
+
+    Returns:
+        DataFrame с операциями и колонками source (путь файла) и user.
+    """
+    paths = statement_files(source)
+    if not paths:
+        raise FileNotFoundError(f"Не найдено файлов выгрузок: {source}")
+
+    cache_dirs = [_statement_cache_dir(path, cache_dir) for path in paths]
+    workers = min(max_workers or os.cpu_count() or 1, len(paths))
+    if workers > 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            frames = list(pool.map(load_transactions, paths, cache_dirs))
+    else:
+        frames = [load_transactions(path, directory) for path, directory in zip(paths, cache_dirs)]
+
+    frames = [df.assign(**{SOURCE_COLUMN: path, USER_COLUMN: user_of(path)}) for df, path in zip(frames, paths)]
+    df = drop_overlaps(frames)
+    logger.info("Загружено %s операций из %s файлов (процессов: %s)", len(df), len(paths), workers)
+    return df
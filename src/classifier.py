@@ -0,0 +1,94 @@
+import hashlib
+import re
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from logging_config import get_logger
+
+logger = get_logger(__name__)
+
+DESCRIPTION_COLUMN = "Описание"
+TAGS_COLUMN = "tags"
+# Теги хранятся битовой маской в int64
+MAX_TAGS = 63
+
+# Детекторы: тег -> регулярное выражение по описанию операции (без учета регистра)
+DETECTORS: Dict[str, str] = {
+    "phone": r"\+?\d{11,15}|\+7[\s(-]*\d{3}[\s)-]*\d{2,3}[\s-]*\d{2}[\s-]*\d{2}\b",
+    "person_to_person": r"\bперевод физическому лицу\b|^(?-i:[А-ЯЁ][а-яё]+ [А-ЯЁ]\.)$",
+    "card_to_card": r"\bперевод (?:с карты|на карту)\b|\bcard2card\b|\bc2c\b",
+    "sbp": r"\bсбп\b|\bsbp\b|систем[аы] быстрых платежей",
+    "atm": r"\bснятие\b.*\bбанкомат|\bснятие наличных\b|\batm\b",
+    "subscription": (
+        r"подписк|subscription|яндекс\.?\s?плюс|кинопоиск|\bokko\b|\bиви\b|\bivi\b|netflix|spotify"
+        r"|apple\.com/bill|google play|youtube premium"
+    ),
+}
+
+
+def register_detector(tag: str, pattern: str) -> None:
+    """Добавляет (или заменяет) детектор в наборе по умолчанию."""
+    re.compile(pattern)
+    DETECTORS[tag] = pattern
+
+
+class TransactionClassifier:
+    """
+    Классификатор операций по описанию: все детекторы собраны в одно регулярное выражение.
+
+    Каждый детектор — необязательный lookahead с именованной группой, поэтому одно
+    сопоставление находит все теги строки. Описания классифицируются один раз на
+    уникальное значение, результат — битовая маска тегов на каждую операцию.
+    """
+
+    def __init__(self, detectors: Optional[Dict[str, str]] = None) -> None:
+        self.detectors = dict(DETECTORS if detectors is None else detectors)
+        if len(self.detectors) > MAX_TAGS:
+            raise ValueError(f"Поддерживается не больше {MAX_TAGS} детекторов")
+        self.tags: List[str] = list(self.detectors)
+        self.pattern = re.compile(
+            "".join(f"(?=(?:.*?(?P<tag{i}>{pattern}))?)" for i, pattern in enumerate(self.detectors.values())),
+            re.IGNORECASE | re.DOTALL,
+        )
+
+    def fingerprint(self) -> str:
+        """Возвращает короткий хэш набора детекторов (ключ кэша тегов)."""
+        digest = hashlib.sha256(repr(sorted(self.detectors.items())).encode("utf-8"))
+        return digest.hexdigest()[:12]
+
+    def classify_text(self, text: str) -> int:
+        """Возвращает битовую маску тегов для одного описания."""
+        match = self.pattern.match(text)
+        if match is None:
+            return 0
+        return sum(1 << i for i in range(len(self.tags)) if match.group(f"tag{i}") is not None)
+
+    def classify(self, descriptions: pd.Series) -> np.ndarray:
+        """Возвращает битовые маски тегов для колонки описаний (пропуски — без тегов)."""
+        codes, uniques = pd.factorize(descriptions)
+        masks = np.array([self.classify_text(str(value)) for value in uniques] + [0], dtype=np.int64)
+        # Код -1 (пропуск) указывает на последний, нулевой элемент
+        tags: np.ndarray = masks[codes]
+        logger.debug("Классифицировано %s операций (%s уникальных описаний)", len(descriptions), len(uniques))
+        return tags
+
+    def classify_frame(self, df: pd.DataFrame) -> pd.DataFrame:
+        """Возвращает DataFrame с колонкой тегов для операций df."""
+        if DESCRIPTION_COLUMN in df.columns:
+            descriptions = df[DESCRIPTION_COLUMN]
+        else:
+            descriptions = df.get("description", pd.Series([np.nan] * len(df), index=df.index, dtype=object))
+        return pd.DataFrame({TAGS_COLUMN: self.classify(descriptions)})
+
+    def mask(self, tags: np.ndarray, tag: str) -> np.ndarray:
+        """Возвращает булеву маску операций с тегом tag."""
+        if tag not in self.tags:
+            raise KeyError(f"Неизвестный тег: {tag}")
+        result: np.ndarray = (tags & (1 << self.tags.index(tag))) != 0
+        return result
+
+    def labels(self, tags: int) -> List[str]:
+        """Возвращает список тегов по битовой маске."""
+        return [tag for i, tag in enumerate(self.tags) if tags & (1 << i)]
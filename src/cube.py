@@ -0,0 +1,187 @@
+from datetime import datetime
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from logging_config import get_logger
+
+logger = get_logger(__name__)
+
+# Суммы в кубе хранятся в копейках (int64), чтобы агрегаты не зависели от порядка сложения
+MEASURES = ["operation_sum", "operation_min", "operation_max", "payment_sum"]
+CUBE_COLUMNS = ["category", "day", "count"] + MEASURES
+WEEKDAY_NAMES = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
+
+
+def to_kopecks(amounts: pd.Series) -> np.ndarray:
+    """Переводит суммы в рублях в целые копейки."""
+    kopecks: np.ndarray = np.rint(amounts.fillna(0.0).to_numpy(dtype=float) * 100).astype(np.int64)
+    return kopecks
+
+
+def _column_kopecks(df: pd.DataFrame, column: str) -> np.ndarray:
+    """Возвращает колонку сумм в копейках (нули, если колонки нет)."""
+    if column not in df.columns:
+        return np.zeros(len(df), dtype=np.int64)
+    return to_kopecks(df[column])
+
+
+def build_cube_rows(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Агрегирует операции в строки куба «категория × день платежа».
+
+    Для каждой пары считаются число операций, сумма, минимум и максимум 'Сумма операции'
+    и сумма 'Сумма платежа'. Операции без даты платежа в куб не попадают.
+    """
+    days = df["Дата платежа"]
+    if not pd.api.types.is_datetime64_any_dtype(days):
+        days = pd.to_datetime(days, format="%d.%m.%Y")
+    valid = days.notna().to_numpy()
+    operation = _column_kopecks(df, "Сумма операции")[valid]
+    payment = _column_kopecks(df, "Сумма платежа")[valid]
+    rows = pd.DataFrame(
+        {
+            "category": df["Категория"].to_numpy(dtype=object)[valid],
+            "day": days.dt.normalize().to_numpy()[valid],
+            "count": 1,
+            "operation_sum": operation,
+            "operation_min": operation,
+            "operation_max": operation,
+            "payment_sum": payment,
+        }
+    )
+    return _combine(rows)
+
+
+def _combine(rows: pd.DataFrame) -> pd.DataFrame:
+    """Сворачивает строки куба с одинаковыми категорией и днем."""
+    combined = (
+        rows.groupby(["category", "day"], sort=False, dropna=False)
+        .agg(
+            count=("count", "sum"),
+            operation_sum=("operation_sum", "sum"),
+            operation_min=("operation_min", "min"),
+            operation_max=("operation_max", "max"),
+            payment_sum=("payment_sum", "sum"),
+        )
+        .reset_index()
+    )
+    return combined.sort_values("day", kind="stable").reset_index(drop=True)[CUBE_COLUMNS]
+
+
+class ExpenseCube:
+    """
+    Предрассчитанный куб расходов «категория × календарный день» (count/sum/min/max).
+
+    Запросы по периоду и категории решаются бинарным поиском по дням и суммированием
+    не более чем по числу дней периода, без просмотра исходных операций.
+    """
+
+    def __init__(self, rows: pd.DataFrame) -> None:
+        self.rows = rows
+        self._arrays: Dict[Tuple[Any, bool], Dict[str, np.ndarray]] = {}
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame) -> "ExpenseCube":
+        """Строит куб по DataFrame с операциями."""
+        return cls(build_cube_rows(df))
+
+    @classmethod
+    def from_chunks(cls, chunks: Iterable[pd.DataFrame]) -> "ExpenseCube":
+        """Строит куб по потоку DataFrame-чанков; в памяти — текущий чанк и строки куба."""
+        rows: Optional[pd.DataFrame] = None
+        for chunk in chunks:
+            part = build_cube_rows(chunk)
+            rows = part if rows is None else _combine(pd.concat([rows, part], ignore_index=True))
+        if rows is None:
+            empty = {column: pd.Series(dtype=np.int64) for column in CUBE_COLUMNS}
+            empty.update(category=pd.Series(dtype=object), day=pd.Series(dtype="datetime64[ns]"))
+            return cls(pd.DataFrame(empty)[CUBE_COLUMNS])
+        return cls(rows)
+
+    def append(self, df: pd.DataFrame) -> None:
+        """Добавляет в куб новые операции, пересчитывая только затронутые пары «категория × день»."""
+        self.rows = _combine(pd.concat([self.rows, build_cube_rows(df)], ignore_index=True))
+        self._arrays.clear()
+        logger.debug("В куб добавлено операций: %s", len(df))
+
+    def _daily(self, category: Any, case_insensitive: bool) -> Dict[str, np.ndarray]:
+        """Возвращает дневные агрегаты для категории (None — все категории), упорядоченные по дню."""
+        key = (category, case_insensitive)
+        if key not in self._arrays:
+            rows = self.rows
+            if category is not None:
+                names = rows["category"]
+                if case_insensitive:
+                    mask = (
+                        names.astype(str).str.strip().str.lower().where(names.notna()) == str(category).strip().lower()
+                    )
+                else:
+                    mask = names == category
+                rows = rows[mask]
+            daily = rows.groupby("day", sort=True).agg(
+                count=("count", "sum"),
+                operation_sum=("operation_sum", "sum"),
+                operation_min=("operation_min", "min"),
+                operation_max=("operation_max", "max"),
+                payment_sum=("payment_sum", "sum"),
+            )
+            arrays = {column: daily[column].to_numpy(dtype=np.int64) for column in daily.columns}
+            arrays["day"] = daily.index.to_numpy(dtype="datetime64[ns]")
+            self._arrays[key] = arrays
+        return self._arrays[key]
+
+    def _slice(
+        self, start: Optional[datetime], end: Optional[datetime], category: Any, case_insensitive: bool
+    ) -> Dict[str, np.ndarray]:
+        """Возвращает дневные агрегаты за период start <= день <= end."""
+        arrays = self._daily(category, case_insensitive)
+        days = arrays["day"]
+        lo = 0 if start is None else int(np.searchsorted(days, np.datetime64(pd.Timestamp(start)), "left"))
+        hi = len(days) if end is None else int(np.searchsorted(days, np.datetime64(pd.Timestamp(end)), "right"))
+        return {name: values[lo:hi] for name, values in arrays.items()}
+
+    def total(
+        self,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        category: Any = None,
+        measure: str = "operation_sum",
+        case_insensitive: bool = False,
+    ) -> float:
+        """Возвращает сумму показателя (в рублях) за период включительно и категорию."""
+        return int(self._slice(start, end, category, case_insensitive)[measure].sum()) / 100
+
+    def summary(
+        self,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        category: Any = None,
+        case_insensitive: bool = False,
+    ) -> Dict[str, Any]:
+        """Возвращает число операций, сумму, минимум и максимум 'Сумма операции' за период."""
+        part = self._slice(start, end, category, case_insensitive)
+        if not len(part["day"]):
+            return {"count": 0, "sum": 0.0, "min": None, "max": None}
+        return {
+            "count": int(part["count"].sum()),
+            "sum": int(part["operation_sum"].sum()) / 100,
+            "min": int(part["operation_min"].min()) / 100,
+            "max": int(part["operation_max"].max()) / 100,
+        }
+
+    def by_weekday(
+        self,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        category: Any = None,
+        measure: str = "operation_sum",
+    ) -> Dict[str, float]:
+        """Возвращает суммы показателя по дням недели (только дни недели, в которые были операции)."""
+        part = self._slice(start, end, category, False)
+        # 1970-01-01 — четверг, поэтому понедельник = 0 получается сдвигом на 3
+        weekdays = (part["day"].astype("datetime64[D]").astype(np.int64) + 3) % 7
+        sums = np.bincount(weekdays, weights=part[measure], minlength=7)
+        counts = np.bincount(weekdays, weights=part["count"], minlength=7)
+        return {WEEKDAY_NAMES[day]: float(sums[day]) / 100 for day in range(7) if counts[day]}
@@ -0,0 +1,530 @@
+from datetime import datetime
+from functools import partial
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+from logging_config import get_logger
+from src.cache import SOURCE_COLUMN, USER_COLUMN, load_derived, load_statements, load_transactions
+from src.classifier import TAGS_COLUMN, TransactionClassifier
+from src.cube import ExpenseCube, build_cube_rows
+from src.schema import CATEGORICAL_COLUMNS, compact_frame, memory_report
+from src.text_index import POSTINGS, TextIndex
+
+logger = get_logger(__name__)
+
+OPERATIONS_FILE = "../data/operations.xls"
+
+# Форматы дат в выгрузке банка
+OPERATION_DATE_FORMAT = "%d.%m.%Y %H:%M:%S"
+PAYMENT_DATE_FORMAT = "%d.%m.%Y"
+DATE_FORMATS = {"Дата операции": OPERATION_DATE_FORMAT, "Дата платежа": PAYMENT_DATE_FORMAT}
+
+# Служебные колонки, которые добавляет TransactionDataset
+CATEGORY_COLUMN = "category_lower"
+CARD_COLUMN = "last_digits"
+DERIVED_COLUMNS = [CATEGORY_COLUMN, CARD_COLUMN]
+
+
+# Сводки, которые набор поддерживает при добавлении операций:
+# имя -> (построение по DataFrame, слияние сводок в порядке следования строк)
+ROLLUPS: Dict[
+    str, Tuple[Callable[[pd.DataFrame], pd.DataFrame], Callable[[pd.DataFrame, pd.DataFrame], pd.DataFrame]]
+] = {}
+
+
+def register_rollup(
+    name: str,
+    build: Callable[[pd.DataFrame], pd.DataFrame],
+    merge: Callable[[pd.DataFrame, pd.DataFrame], pd.DataFrame],
+) -> None:
+    """
+    Регистрирует сводку, которую TransactionDataset строит один раз и обновляет при append.
+
+    Args:
+        name: Имя сводки.
+        build: Строит сводку по DataFrame с операциями.
+        merge: Сливает сводки двух частей набора (первая часть идет в наборе раньше второй).
+    """
+    ROLLUPS[name] = (build, merge)
+
+
+def normalize_frame(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Приводит DataFrame с операциями к каноническому виду.
+
+    Даты операции и платежа разбираются в datetime, добавляются категория
+    в нижнем регистре и последние 4 цифры карты, текстовые колонки становятся
+    категориальными (см. compact_frame). Уже приведенные колонки не пересчитываются.
+    """
+    for column, date_format in DATE_FORMATS.items():
+        if column in df.columns and not pd.api.types.is_datetime64_any_dtype(df[column]):
+            df[column] = pd.to_datetime(df[column], format=date_format, errors="coerce")
+
+    if "Категория" in df.columns and CATEGORY_COLUMN not in df.columns:
+        categories = df["Категория"]
+        df[CATEGORY_COLUMN] = categories.astype(str).str.strip().str.lower().where(categories.notna())
+
+    if "Номер карты" in df.columns and CARD_COLUMN not in df.columns:
+        df[CARD_COLUMN] = card_suffix(df["Номер карты"])
+
+    return compact_frame(df, CATEGORICAL_COLUMNS + DERIVED_COLUMNS + [SOURCE_COLUMN, USER_COLUMN])
+
+
+def card_suffix(cards: pd.Series) -> pd.Series:
+    """Возвращает последние 4 цифры номеров карт (NaN для операций без карты)."""
+    return cards.astype(str).str[-4:].where(cards.notna())
+
+
+# Позиции полей даты в ISO-строке 'YYYY-MM-DDTHH:MM:SS' (см. format_dates)
+_ISO_FIELDS = {
+    "%Y": range(0, 4),
+    "%m": range(5, 7),
+    "%d": range(8, 10),
+    "%H": range(11, 13),
+    "%M": range(14, 16),
+    "%S": range(17, 19),
+}
+
+
+def _iso_layout(date_format: str) -> Optional[Tuple[List[int], Dict[int, int]]]:
+    """Возвращает позиции символов ISO-строки для date_format и литералы формата (None для других директив)."""
+    positions: List[int] = []
+    literals: Dict[int, int] = {}
+    i = 0
+    while i < len(date_format):
+        token = date_format[i : i + 2]
+        if token in _ISO_FIELDS:
+            positions.extend(_ISO_FIELDS[token])
+            i += 2
+        elif date_format[i] == "%":
+            return None
+        else:
+            literals[len(positions)] = ord(date_format[i])
+            positions.append(0)
+            i += 1
+    return positions, literals
+
+
+def format_dates(dates: pd.Series, date_format: str) -> pd.Series:
+    """
+    Форматирует даты строками, как dates.dt.strftime(date_format) (NaT — NaN), в несколько раз быстрее.
+
+    Форматируется только каждое уникальное значение: NumPy строит ISO-строки, а символы
+    переставляются по формату на массиве кодов. Поддерживаются директивы %Y %m %d %H %M %S,
+    для остальных используется strftime.
+    """
+    layout = _iso_layout(date_format)
+    if layout is None:
+        return dates.dt.strftime(date_format).astype(object)
+    positions, literals = layout
+    codes, uniques = pd.factorize(dates)
+    iso = np.datetime_as_string(uniques.to_numpy(dtype="datetime64[s]"), unit="s")
+    chars = iso.view(np.uint32).reshape(len(iso), iso.dtype.itemsize // 4)[:, positions]
+    for position, code in literals.items():
+        chars[:, position] = code
+    # Код -1 (NaT) попадает на последний элемент — NaN
+    text = np.append(np.ascontiguousarray(chars).view(f"<U{len(positions)}").ravel().astype(object), np.nan)
+    return pd.Series(text[codes], index=dates.index, name=dates.name)
+
+
+def restore_source_format(df: pd.DataFrame) -> pd.DataFrame:
+    """Возвращает DataFrame в формате выгрузки: даты строками, без служебных колонок."""
+    df = df.drop(columns=DERIVED_COLUMNS, errors="ignore")
+    formatted = {
+        column: format_dates(df[column], date_format)
+        for column, date_format in DATE_FORMATS.items()
+        if column in df.columns and pd.api.types.is_datetime64_any_dtype(df[column])
+    }
+    return df.assign(**formatted) if formatted else df
+
+
+def _to_datetime64(value: datetime) -> np.datetime64:
+    """Переводит дату в datetime64[ns] без потери наносекунд у pd.Timestamp."""
+    return np.datetime64(pd.Timestamp(value).as_unit("ns").value, "ns")
+
+
+class DateIndex:
+    """
+    Отсортированный индекс по колонке дат для поиска диапазонов бинарным поиском (searchsorted).
+
+    Если колонка уже упорядочена (выгрузка банка идет по убыванию даты), диапазон — это
+    непрерывный срез строк и перестановка не хранится.
+    """
+
+    def __init__(self, dates: pd.Series) -> None:
+        values = dates.to_numpy(dtype="datetime64[ns]")
+        self.size = len(values)
+        self.order: Optional[np.ndarray] = None
+        self.descending = False
+        if dates.is_monotonic_increasing:
+            self.sorted_values = values
+        elif dates.is_monotonic_decreasing:
+            self.sorted_values = values[::-1]
+            self.descending = True
+        else:
+            valid = np.flatnonzero(~np.isnat(values))
+            self.order = valid[np.argsort(values[valid], kind="stable")]
+            self.sorted_values = values[self.order]
+
+    def positions(self, start: Optional[datetime] = None, end: Optional[datetime] = None) -> Union[slice, np.ndarray]:
+        """Возвращает позиции строк с start <= дата < end в исходном порядке строк."""
+        lo = 0 if start is None else int(np.searchsorted(self.sorted_values, _to_datetime64(start), "left"))
+        hi = len(self.sorted_values)
+        if end is not None:
+            hi = int(np.searchsorted(self.sorted_values, _to_datetime64(end), "left"))
+        hi = max(lo, hi)
+        if self.order is not None:
+            return np.sort(self.order[lo:hi])
+        if self.descending:
+            return slice(self.size - hi, self.size - lo)
+        return slice(lo, hi)
+
+
+class TransactionStore:
+    """
+    Операции, упорядоченные по колонке дат, с запросами по временным окнам.
+
+    Окно — срез строк, найденный бинарным поиском, без булевых масок по всему набору.
+    Для запросов по категории набор один раз разбивается на упорядоченные части по значению категории.
+    Строки без даты в окна не попадают.
+    """
+
+    def __init__(self, df: pd.DataFrame, column: str = "Дата платежа", positions: Optional[np.ndarray] = None) -> None:
+        # positions — номера строк в исходном DataFrame, чтобы окно можно было вернуть в исходном порядке
+        if positions is None:
+            positions = np.arange(len(df))
+        dates = df[column]
+        if dates.isna().any():
+            valid = dates.notna().to_numpy()
+            df, positions = df[valid], positions[valid]
+            dates = df[column]
+        if not (dates.is_monotonic_increasing or dates.is_monotonic_decreasing):
+            order = np.argsort(dates.to_numpy(dtype="datetime64[ns]"), kind="stable")
+            df, positions = df.iloc[order], positions[order]
+        self.frame = df
+        self.positions = positions
+        self.column = column
+        self.index = DateIndex(df[column])
+        self._partitions: Dict[str, Dict[Any, "TransactionStore"]] = {}
+
+    def partition(self, category: Any, category_column: str = "Категория") -> Optional["TransactionStore"]:
+        """Возвращает часть набора с заданной категорией (все части строятся за один проход)."""
+        if category_column not in self._partitions:
+            self._partitions[category_column] = {
+                value: TransactionStore(self.frame.iloc[rows], self.column, self.positions[rows])
+                for value, rows in self.frame.groupby(category_column, sort=False, observed=True).indices.items()
+            }
+        return self._partitions[category_column].get(category)
+
+    def window(
+        self,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        category: Any = None,
+        category_column: str = "Категория",
+        include_end: bool = True,
+        source_order: bool = False,
+    ) -> pd.DataFrame:
+        """
+        Возвращает операции за период (и категорию, если задана).
+
+        Args:
+            start: Начало периода (включительно); None — без ограничения.
+            end: Конец периода; None — без ограничения.
+            category: Значение категории; None — все категории.
+            category_column: Колонка категории ('Категория' или category_lower).
+            include_end: Включать ли операции с датой, равной end.
+            source_order: Вернуть строки в порядке исходного набора (копия вместо среза).
+
+        Returns:
+            Срез DataFrame с операциями за период.
+        """
+        store = self if category is None else self.partition(category, category_column)
+        if store is None:
+            return self.frame.iloc[:0]
+        if end is not None and include_end:
+            end = pd.Timestamp(end) + pd.Timedelta(1, "ns")
+        rows = store.index.positions(start, end)
+        if source_order:
+            order = np.argsort(store.positions[rows], kind="stable")
+            return store.frame.iloc[rows].iloc[order]
+        return store.frame.iloc[rows]
+
+    def month(self, year: int, month: int, category: Any = None, category_column: str = "Категория") -> pd.DataFrame:
+        """Возвращает операции за календарный месяц."""
+        start = datetime(year, month, 1)
+        end = datetime(year + month // 12, month % 12 + 1, 1)
+        return self.window(start, end, category, category_column, include_end=False)
+
+
+class TransactionDataset:
+    """
+    Общий набор транзакций, который загружается один раз за запуск и передается во все функции.
+
+    Владеет каноническим DataFrame (см. normalize_frame); переданный DataFrame изменяется на месте.
+    """
+
+    def __init__(self, df: pd.DataFrame) -> None:
+        self.frame = normalize_frame(df)
+        self._records: Optional[List[Dict[str, Any]]] = None
+        self._date_indexes: Dict[str, DateIndex] = {}
+        self._stores: Dict[str, TransactionStore] = {}
+        self._cube: Optional[ExpenseCube] = None
+        self._text_index: Optional[TextIndex] = None
+        self._tags: Dict[str, np.ndarray] = {}
+        self._classifiers: Dict[str, TransactionClassifier] = {}
+        self._rollups: Dict[str, pd.DataFrame] = {}
+        # Исходный файл и каталог кэша, если набор загружен через from_file
+        self.source_path: Optional[str] = None
+        self.cache_dir: Optional[str] = None
+
+    @classmethod
+    def from_file(cls, file_path: str = OPERATIONS_FILE, cache_dir: Optional[str] = None) -> "TransactionDataset":
+        """Загружает набор транзакций из файла Excel через колоночный кэш."""
+        dataset = cls(load_transactions(file_path, cache_dir))
+        dataset.source_path, dataset.cache_dir = file_path, cache_dir
+        logger.info("Загружено %s транзакций из %s", len(dataset), file_path)
+        return dataset
+
+    @classmethod
+    def from_files(
+        cls,
+        source: Union[str, Iterable[str]],
+        cache_dir: Optional[str] = None,
+        max_workers: Optional[int] = None,
+    ) -> "TransactionDataset":
+        """
+        Загружает набор из нескольких выгрузок (каталог, glob-шаблон или список путей).
+
+        Файлы разбираются параллельно, пересекающиеся операции удаляются, у каждой операции
+        есть колонки source и user (см. src.cache.load_statements). Производные структуры
+        строятся в памяти: дисковый кэш индексов привязан к одному исходному файлу.
+        """
+        dataset = cls(load_statements(source, cache_dir, max_workers))
+        dataset.cache_dir = cache_dir
+        logger.info("Загружено %s транзакций из выгрузок %s", len(dataset), source)
+        return dataset
+
+    def __len__(self) -> int:
+        return len(self.frame)
+
+    def memory_usage(self) -> Dict[str, Any]:
+        """Возвращает отчет о памяти, занимаемой набором (см. src.schema.memory_report)."""
+        return memory_report(self.frame)
+
+    def subset(self, rows: Any) -> "TransactionDataset":
+        """Возвращает набор из выбранных строк (булева маска или срез)."""
+        return TransactionDataset(self.frame[rows])
+
+    def date_index(self, column: str = "Дата операции") -> DateIndex:
+        """Возвращает индекс по колонке дат (строится один раз на набор)."""
+        if column not in self._date_indexes:
+            self._date_indexes[column] = DateIndex(self.frame[column])
+        return self._date_indexes[column]
+
+    def store(self, column: str = "Дата платежа") -> TransactionStore:
+        """Возвращает набор, упорядоченный по колонке дат, для запросов по окнам (строится один раз)."""
+        if column not in self._stores:
+            self._stores[column] = TransactionStore(self.frame, column)
+        return self._stores[column]
+
+    def cube(self) -> ExpenseCube:
+        """Возвращает куб расходов «категория × день» (для набора из файла — из кэша рядом с кэшем транзакций)."""
+        if self._cube is None:
+            if self.source_path is not None:
+                rows = load_derived(self.source_path, "cube", lambda: build_cube_rows(self.frame), self.cache_dir)
+            else:
+                rows = build_cube_rows(self.frame)
+            self._cube = ExpenseCube(rows)
+        return self._cube
+
+    def text_index(self) -> TextIndex:
+        """Возвращает текстовый индекс по описанию и категории (для набора из файла — из кэша)."""
+        if self._text_index is None:
+            if self.source_path is not None:
+                frames: Dict[str, pd.DataFrame] = {}
+
+                def build(name: str) -> pd.DataFrame:
+                    # Обе таблицы строятся одним проходом, даже если в кэше не хватает только одной
+                    if not frames:
+                        frames.update(TextIndex.build_frames(self.frame))
+                    return frames[name]
+
+                tables = {
+                    name: load_derived(self.source_path, f"text_{name}", partial(build, name), self.cache_dir)
+                    for name in ["codes", "values", *POSTINGS]
+                }
+                self._text_index = TextIndex(tables["codes"], tables["values"], tables)
+            else:
+                self._text_index = TextIndex.from_frame(self.frame)
+        return self._text_index
+
+    def tags(self, classifier: Optional[TransactionClassifier] = None) -> np.ndarray:
+        """Возвращает битовые маски тегов операций (вычисляются один раз на набор детекторов и кэшируются)."""
+        active = classifier or TransactionClassifier()
+        key = active.fingerprint()
+        if key not in self._tags:
+            if self.source_path is not None:
+                frame = load_derived(
+                    self.source_path, f"tags-{key}", lambda: active.classify_frame(self.frame), self.cache_dir
+                )
+            else:
+                frame = active.classify_frame(self.frame)
+            self._tags[key] = frame[TAGS_COLUMN].to_numpy(dtype=np.int64)
+        self._classifiers[key] = active
+        return self._tags[key]
+
+    def rollup(self, name: str) -> pd.DataFrame:
+        """Возвращает зарегистрированную сводку name (см. register_rollup), построенную один раз на набор."""
+        if name not in self._rollups:
+            build, _ = ROLLUPS[name]
+            self._rollups[name] = build(self.frame)
+        return self._rollups[name]
+
+    def append(self, df: pd.DataFrame) -> "TransactionDataset":
+        """
+        Добавляет новые операции, обновляя уже построенные структуры только по новым строкам.
+
+        Куб расходов, текстовый индекс, теги, сводки и записи дополняются данными новых строк;
+        индексы дат перестраиваются при следующем запросе. Если набор упорядочен по убыванию
+        даты операции (как выгрузка банка), новые строки ставятся в начало, иначе — в конец.
+
+        Args:
+            df: DataFrame с новыми операциями в формате выгрузки.
+
+        Returns:
+            Этот же набор.
+        """
+        delta = normalize_frame(df.reset_index(drop=True))
+        if delta.empty:
+            return self
+        prepend = bool(self.frame["Дата операции"].is_monotonic_decreasing) if len(self.frame) else False
+
+        def place(old: Any, new: Any) -> List[Any]:
+            return [new, old] if prepend else [old, new]
+
+        frame = pd.concat(place(self.frame, delta), ignore_index=True)
+        self.frame = compact_frame(frame, CATEGORICAL_COLUMNS + DERIVED_COLUMNS + [SOURCE_COLUMN, USER_COLUMN])
+
+        if self._records is not None:
+            new_records = restore_source_format(delta).to_dict(orient="records")
+            self._records = new_records + self._records if prepend else self._records + new_records
+        if self._cube is not None:
+            self._cube.append(delta)
+        if self._text_index is not None:
+            self._text_index.append(delta, prepend)
+        default = TransactionClassifier()
+        for key in list(self._tags):
+            classifier = self._classifiers.get(key) or (default if default.fingerprint() == key else None)
+            if classifier is None:
+                del self._tags[key]
+                continue
+            self._classifiers[key] = classifier
+            self._tags[key] = np.concatenate(place(self._tags[key], classifier.classify_frame(delta)[TAGS_COLUMN]))
+        for name in list(self._rollups):
+            build, merge = ROLLUPS[name]
+            self._rollups[name] = merge(*place(self._rollups[name], build(delta)))
+
+        self._date_indexes.clear()
+        self._stores.clear()
+        # Производные данные больше не соответствуют исходному файлу
+        self.source_path = None
+        logger.info("В набор добавлено %s операций, всего %s", len(delta), len(self.frame))
+        return self
+
+    def derived_frames(self) -> Dict[str, pd.DataFrame]:
+        """Возвращает построенные производные структуры в виде DataFrame (для сохранения в кэш)."""
+        frames: Dict[str, pd.DataFrame] = {}
+        if self._cube is not None:
+            frames["cube"] = self._cube.rows
+        if self._text_index is not None:
+            frames.update({f"text_{name}": frame for name, frame in self._text_index.frames().items()})
+        frames.update({f"tags-{key}": pd.DataFrame({TAGS_COLUMN: tags}) for key, tags in self._tags.items()})
+        # Индекс сводки (ключ группы) сохраняется первой колонкой
+        frames.update({f"rollup-{name}": rollup.reset_index() for name, rollup in self._rollups.items()})
+        return frames
+
+    def restore_derived(self, frames: Dict[str, pd.DataFrame]) -> None:
+        """Восстанавливает производные структуры, сохраненные derived_frames."""
+        if "cube" in frames:
+            self._cube = ExpenseCube(frames["cube"])
+        if "text_codes" in frames and "text_values" in frames:
+            postings = {name: frames[f"text_{name}"] for name in POSTINGS if f"text_{name}" in frames}
+            self._text_index = TextIndex(frames["text_codes"], frames["text_values"], postings)
+        for name, frame in frames.items():
+            if name.startswith("tags-"):
+                self._tags[name[len("tags-") :]] = frame[TAGS_COLUMN].to_numpy(dtype=np.int64)
+            elif name.startswith("rollup-") and name[len("rollup-") :] in ROLLUPS:
+                self._rollups[name[len("rollup-") :]] = frame.set_index(frame.columns[0])
+
+    def tagged(self, tag: str, classifier: Optional[TransactionClassifier] = None) -> "TransactionDataset":
+        """Возвращает операции с тегом tag."""
+        classifier = classifier or TransactionClassifier()
+        return TransactionDataset(self.frame[classifier.mask(self.tags(classifier), tag)])
+
+    def search(self, query: str, columns: Optional[List[str]] = None) -> "TransactionDataset":
+        """Возвращает операции, в описании или категории которых встречается query (через текстовый индекс)."""
+        return TransactionDataset(self.frame.iloc[self.text_index().search(query, columns)])
+
+    def between(
+        self, start: Optional[datetime] = None, end: Optional[datetime] = None, column: str = "Дата операции"
+    ) -> "TransactionDataset":
+        """Возвращает операции с start <= дата < end, найденные бинарным поиском по индексу дат."""
+        return TransactionDataset(self.frame.iloc[self.date_index(column).positions(start, end)])
+
+    def records(self) -> List[Dict[str, Any]]:
+        """Возвращает операции списком словарей в формате выгрузки (вычисляется один раз)."""
+        if self._records is None:
+            self._records = restore_source_format(self.frame).to_dict(orient="records")
+        return self._records
+
+
+Transactions = Union[List[Dict[str, Any]], TransactionDataset]
+Frame = Union[pd.DataFrame, TransactionDataset]
+
+
+def as_records(transactions: Transactions) -> List[Dict[str, Any]]:
+    """Возвращает операции списком словарей."""
+    if isinstance(transactions, TransactionDataset):
+        return transactions.records()
+    return transactions
+
+
+def as_frame(transactions: Frame) -> pd.DataFrame:
+    """Возвращает операции в виде DataFrame."""
+    if isinstance(transactions, TransactionDataset):
+        return transactions.frame
+    return transactions
+
+
+def payment_window(
+    transactions: Frame,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    category: Any = None,
+    category_column: str = "Категория",
+    include_end: bool = True,
+    source_order: bool = False,
+) -> pd.DataFrame:
+    """
+    Возвращает операции за период по дате платежа (и категорию, если задана).
+
+    Для TransactionDataset запрос идет в упорядоченный по дате платежа набор (см. TransactionStore)
+    и затрагивает только строки периода, для DataFrame строится булева маска.
+    С source_order=True строки возвращаются в порядке исходного набора.
+    """
+    if isinstance(transactions, TransactionDataset):
+        return transactions.store().window(start, end, category, category_column, include_end, source_order)
+
+    df = transactions
+    payment_dates = pd.to_datetime(df["Дата платежа"], format=PAYMENT_DATE_FORMAT)
+    mask = pd.Series(True, index=df.index)
+    if category is not None:
+        mask &= df[category_column] == category
+    if start is not None:
+        mask &= payment_dates >= start
+    if end is not None:
+        mask &= (payment_dates <= end) if include_end else (payment_dates < end)
+    return df[mask]
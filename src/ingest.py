@@ -0,0 +1,176 @@
+import glob
+import os
+import uuid
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from logging_config import get_logger
+from src.cache import DEDUP_COLUMNS, load_frame, load_transactions, save_frame
+from src.dataset import OPERATION_DATE_FORMAT, OPERATIONS_FILE, TransactionDataset
+
+logger = get_logger(__name__)
+
+INGEST_DIR = "../data/.cache/ingest"
+FRAME_NAME = "operations"
+WATERMARK_COLUMN = "Дата операции"
+
+
+def row_fingerprints(df: pd.DataFrame) -> np.ndarray:
+    """Возвращает отпечатки операций (uint64) по дате, сумме, карте и описанию."""
+    columns = [column for column in DEDUP_COLUMNS if column in df.columns]
+    # Типы колонок зависят от содержимого файла (например, пустая колонка читается как float), поэтому
+    # ключи приводятся к единому виду: сумма — float, остальное — строки
+    keys = df[columns].astype({column: float if column == "Сумма операции" else str for column in columns})
+    fingerprints: np.ndarray = pd.util.hash_pandas_object(keys, index=False).to_numpy()
+    return fingerprints
+
+
+def _operation_dates(df: pd.DataFrame) -> pd.Series:
+    """Возвращает даты операций выгрузки в виде datetime (NaT для пустых и некорректных)."""
+    dates = df[WATERMARK_COLUMN]
+    if pd.api.types.is_datetime64_any_dtype(dates):
+        return dates
+    return pd.to_datetime(dates, format=OPERATION_DATE_FORMAT, errors="coerce")
+
+
+def new_rows(df: pd.DataFrame, watermark: Optional[Dict[str, Any]]) -> np.ndarray:
+    """
+    Возвращает булеву маску операций выгрузки, которых еще нет в накопленном наборе.
+
+    Новыми считаются операции позже водяного знака. Операции ровно в момент водяного знака
+    сверяются по отпечаткам с учетом повторов: из k одинаковых операций новыми будут
+    только те, что сверх уже учтенных. Операции без даты после первой загрузки не принимаются.
+
+    Args:
+        df: DataFrame выгрузки.
+        watermark: Водяной знак источника (см. advance_watermark); None — все операции новые.
+    """
+    if watermark is None:
+        return np.ones(len(df), dtype=bool)
+    dates = _operation_dates(df)
+    last = pd.Timestamp(watermark["last"])
+    mask: np.ndarray = (dates > last).to_numpy()
+
+    at_last = (dates == last).to_numpy()
+    if at_last.any():
+        seen = pd.Series(watermark["fingerprints"], dtype=np.uint64).value_counts()
+        fingerprints = pd.Series(row_fingerprints(df[at_last]))
+        occurrence = fingerprints.groupby(fingerprints, sort=False).cumcount()
+        known = fingerprints.map(seen).fillna(0).to_numpy()
+        mask[np.flatnonzero(at_last)] = occurrence.to_numpy() >= known
+
+    skipped = int(dates.isna().sum())
+    if skipped:
+        logger.warning("Пропущено операций без даты: %s", skipped)
+    return mask
+
+
+def advance_watermark(watermark: Optional[Dict[str, Any]], df: pd.DataFrame) -> Optional[Dict[str, Any]]:
+    """Возвращает водяной знак после добавления операций df: последняя дата и отпечатки операций с этой датой."""
+    dates = _operation_dates(df)
+    if dates.isna().all():
+        return watermark
+    last = dates.max()
+    fingerprints: List[int] = [int(value) for value in row_fingerprints(df[(dates == last).to_numpy()])]
+    if watermark is not None and pd.Timestamp(watermark["last"]) == last:
+        fingerprints = list(watermark["fingerprints"]) + fingerprints
+    elif watermark is not None and pd.Timestamp(watermark["last"]) > last:
+        return watermark
+    return {"last": last.isoformat(), "fingerprints": fingerprints}
+
+
+class IncrementalStore:
+    """
+    Накопленный набор операций с водяными знаками по источникам.
+
+    Набор и его производные структуры (куб расходов, текстовый индекс, теги, сводки)
+    хранятся в каталоге кэша. При очередном запуске из выгрузки берутся только операции
+    новее водяного знака, и структуры дополняются ими (см. TransactionDataset.append),
+    поэтому работа пропорциональна новым операциям, а не всей истории.
+    """
+
+    def __init__(self, directory: str = INGEST_DIR) -> None:
+        self.directory = directory
+        self.watermarks: Dict[str, Dict[str, Any]] = {}
+        self.dataset: Optional[TransactionDataset] = None
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.directory, f"{name}.npz")
+
+    def load(self) -> Optional[TransactionDataset]:
+        """Загружает накопленный набор (None, если его нет или он не читается)."""
+        path = self._path(FRAME_NAME)
+        if not os.path.exists(path):
+            return None
+        try:
+            frame, meta = load_frame(path)
+            derived = {}
+            for name in meta.get("derived", []):
+                derived_frame, derived_meta = load_frame(self._path(name))
+                # Файлы другого поколения (прерванное сохранение) не используются
+                if derived_meta.get("generation") == meta["generation"]:
+                    derived[name] = derived_frame
+        except (OSError, KeyError, ValueError) as e:
+            logger.warning("Не удалось загрузить накопленный набор %s: %s", path, e)
+            return None
+
+        dataset = TransactionDataset(frame)
+        dataset.restore_derived(derived)
+        self.watermarks = meta.get("watermarks", {})
+        self.dataset = dataset
+        logger.info("Загружен накопленный набор: %s операций, структур: %s", len(dataset), len(derived))
+        return dataset
+
+    def ingest(self, file_path: str = OPERATIONS_FILE) -> TransactionDataset:
+        """
+        Добавляет в накопленный набор новые операции выгрузки file_path.
+
+        Args:
+            file_path: Путь к файлу выгрузки (источник водяного знака).
+
+        Returns:
+            Накопленный набор с новыми операциями (сохраняется вызовом save).
+        """
+        source = os.path.abspath(file_path)
+        raw = load_transactions(file_path)
+        dataset = self.dataset if self.dataset is not None else self.load()
+        watermark = self.watermarks.get(source)
+        delta = raw[new_rows(raw, watermark)].reset_index(drop=True)
+        # Отпечатки считаются по строкам в формате выгрузки, до нормализации набором
+        advanced = advance_watermark(watermark, delta)
+        added = len(delta)
+
+        if dataset is None:
+            dataset = TransactionDataset(delta)
+        else:
+            dataset.append(delta)
+        if advanced is not None:
+            self.watermarks[source] = advanced
+        self.dataset = dataset
+        logger.info("Из %s добавлено %s новых операций из %s", file_path, added, len(raw))
+        return dataset
+
+    def save(self, dataset: Optional[TransactionDataset] = None) -> None:
+        """Сохраняет набор, его построенные структуры и водяные знаки."""
+        dataset = dataset if dataset is not None else self.dataset
+        if dataset is None:
+            return
+        generation = uuid.uuid4().hex
+        derived = dataset.derived_frames()
+        try:
+            for name, frame in derived.items():
+                save_frame(frame, self._path(name), {"generation": generation})
+            # Набор записывается последним: его метаданные подтверждают поколение структур
+            meta = {"generation": generation, "watermarks": self.watermarks, "derived": list(derived)}
+            save_frame(dataset.frame, self._path(FRAME_NAME), meta)
+        except OSError as e:
+            logger.warning("Не удалось сохранить накопленный набор в %s: %s", self.directory, e)
+            return
+
+        keep = {self._path(name) for name in [FRAME_NAME, *derived]}
+        for path in glob.glob(os.path.join(self.directory, "*.npz")):
+            if path not in keep:
+                os.remove(path)
+        logger.debug("Накопленный набор сохранен: %s операций, структур: %s", len(dataset), len(derived))
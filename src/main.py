@@ -1,15 +1,40 @@
+import os
+from typing import Optional
+
+from src.dataset import OPERATIONS_FILE, TransactionDataset
+from src.ingest import IncrementalStore
+from src.profiling import profile_run, stage
 from src.reports import main_reports
 from src.services import main_services
 from src.views import main_views
 
+# Режим инкрементальной загрузки: INCREMENTAL_INGEST=1
+INCREMENTAL_INGEST = os.getenv("INCREMENTAL_INGEST") == "1"
+
 
-def main() -> None:
+def main(incremental: Optional[bool] = None) -> None:
     """
     Главная функция для запуска всей программы.
+
+    В инкрементальном режиме из выгрузки добавляются только новые операции, а накопленный набор
+    и его структуры (куб, индекс, сводки) сохраняются для следующего запуска (см. src.ingest).
     """
-    main_views()
-    main_reports()
-    main_services()
+    if incremental is None:
+        incremental = INCREMENTAL_INGEST
+    # При PROFILE=1 время, память и строки по этапам сохраняются в отчет запуска (см. src.profiling)
+    with profile_run("main"):
+        # Набор транзакций загружается один раз и передается во все модули
+        store = IncrementalStore() if incremental else None
+        with stage("main.load"):
+            dataset = (
+                store.ingest(OPERATIONS_FILE) if store is not None else TransactionDataset.from_file(OPERATIONS_FILE)
+            )
+        main_views(dataset)
+        main_reports(dataset)
+        main_services(dataset)
+        if store is not None:
+            with stage("main.save"):
+                store.save(dataset)
 
 
 if __name__ == "__main__":
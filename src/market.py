@@ -0,0 +1,370 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Hashable, List, Optional, Sequence, Set, Tuple
+
+import numpy as np
+import pandas as pd
+import requests
+import yfinance as yf
+from requests.adapters import HTTPAdapter
+
+from logging_config import get_logger
+from src.cache import CACHE_DIR_NAME
+
+logger = get_logger(__name__)
+
+USER_SETTINGS_FILE = "../data/user_settings.json"
+QUOTES_FILE = os.path.join(os.path.dirname(USER_SETTINGS_FILE), CACHE_DIR_NAME, "quotes.sqlite3")
+CURRENCY_API_URL = "https://api.exchangerate-api.com/v4/latest/{currency}"
+# Базовая валюта снимка курсов: один запрос возвращает курсы всех валют к ней
+SNAPSHOT_BASE = "USD"
+# Таймаут (соединение, чтение) в секундах, время жизни котировок в кэше и размер пула потоков
+DEFAULT_TIMEOUT = (3.05, 10.0)
+DEFAULT_TTL = 300.0
+# Сколько секунд после истечения TTL котировка еще отдается сразу, пока обновляется в фоне
+DEFAULT_STALE_TTL = 24 * 3600.0
+DEFAULT_WORKERS = 8
+
+
+def load_user_settings(file_path: str = USER_SETTINGS_FILE) -> Dict[str, Any]:
+    """Читает пользовательские настройки (валюты и акции для главной страницы)."""
+    try:
+        with open(file_path, "r", encoding="utf-8") as f:
+            settings: Dict[str, Any] = json.load(f)
+    except (OSError, ValueError) as e:
+        logger.warning("Не удалось прочитать настройки %s: %s", file_path, e)
+        return {}
+    return settings
+
+
+def fetch_stock_price(symbol: str) -> float:
+    """Возвращает максимальную цену акции за текущий день через yfinance."""
+    history = yf.Ticker(symbol).history(period="1d")
+    return float(history["High"].iloc[0])
+
+
+class RatesSnapshot:
+    """
+    Снимок курсов всех валют к базовой валюте, полученный одним запросом.
+
+    Курс любой пары считается локально через базовую валюту: rate(a, b) = rates[b] / rates[a].
+    """
+
+    def __init__(self, base: str, rates: Dict[str, float]) -> None:
+        self.base = base
+        self.rates = dict(rates)
+        self.rates[base] = 1.0
+
+    def rate(self, currency: str, target: str = "RUB") -> float:
+        """Возвращает, сколько единиц target стоит одна единица currency."""
+        if currency not in self.rates or target not in self.rates:
+            raise KeyError(f"Нет курса для пары {currency}/{target}")
+        return self.rates[target] / self.rates[currency]
+
+    def convert(self, amounts: Any, currencies: Any, target: str = "RUB") -> np.ndarray:
+        """
+        Переводит массив сумм в валютах currencies в валюту target одной векторной операцией.
+
+        Курс ищется один раз на уникальную валюту; суммы в неизвестных валютах становятся NaN.
+        """
+        codes, uniques = pd.factorize(pd.Series(currencies, dtype=object))
+        factors = np.array(
+            [self.rate(str(currency), target) if currency in self.rates else np.nan for currency in uniques] + [np.nan]
+        )
+        # Код -1 (валюта не указана) указывает на последний элемент — NaN
+        converted: np.ndarray = np.asarray(amounts, dtype=float) * factors[codes]
+        return converted
+
+
+def convert_amounts(
+    df: pd.DataFrame,
+    snapshot: RatesSnapshot,
+    target: str = "RUB",
+    amount_column: str = "Сумма операции",
+    currency_column: str = "Валюта операции",
+) -> pd.Series:
+    """Возвращает колонку сумм операций, переведенную в валюту target по снимку курсов."""
+    return pd.Series(
+        snapshot.convert(df[amount_column].to_numpy(), df[currency_column].to_numpy(), target),
+        index=df.index,
+        name=amount_column,
+    )
+
+
+class TTLCache:
+    """Потокобезопасный кэш значений с ограниченным временем жизни."""
+
+    def __init__(self, ttl: float = DEFAULT_TTL, clock: Callable[[], float] = time.monotonic) -> None:
+        self.ttl = ttl
+        self._clock = clock
+        self._items: Dict[Hashable, Tuple[float, Any]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """Возвращает значение, если оно есть и не устарело, иначе None."""
+        with self._lock:
+            item = self._items.get(key)
+            if item is None or item[0] <= self._clock():
+                return None
+            return item[1]
+
+    def set(self, key: Hashable, value: Any) -> None:
+        """Сохраняет значение на ttl секунд."""
+        with self._lock:
+            self._items[key] = (self._clock() + self.ttl, value)
+
+    def clear(self) -> None:
+        """Очищает кэш."""
+        with self._lock:
+            self._items.clear()
+
+
+class QuoteStore:
+    """
+    Кэш котировок на диске (SQLite), общий для всех процессов.
+
+    Ключ — вид котировки и символ: хранится только последняя котировка и время ее получения,
+    чтобы считать возраст. Она же служит последним известным значением, если API недоступен.
+    """
+
+    def __init__(self, path: str = QUOTES_FILE, clock: Callable[[], float] = time.time) -> None:
+        self.path = path
+        self._clock = clock
+        self._ready = False
+
+    def _connect(self) -> sqlite3.Connection:
+        """Открывает соединение, при первом обращении создавая файл и таблицу."""
+        if not self._ready:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        connection = sqlite3.connect(self.path, timeout=5.0)
+        if not self._ready:
+            connection.execute("PRAGMA journal_mode=WAL")
+            with connection:
+                columns = {row[1] for row in connection.execute("PRAGMA table_info(quotes)")}
+                if "day" in columns:
+                    # Раньше котировки хранились по дням: из старой таблицы переносится последняя по каждому символу
+                    connection.execute("ALTER TABLE quotes RENAME TO quotes_by_day")
+                connection.execute(
+                    "CREATE TABLE IF NOT EXISTS quotes (kind TEXT NOT NULL, symbol TEXT NOT NULL, "
+                    "value REAL NOT NULL, fetched_at REAL NOT NULL, PRIMARY KEY (kind, symbol))"
+                )
+                if "day" in columns:
+                    connection.execute(
+                        "INSERT INTO quotes SELECT kind, symbol, value, MAX(fetched_at) "
+                        "FROM quotes_by_day GROUP BY kind, symbol"
+                    )
+                    connection.execute("DROP TABLE quotes_by_day")
+            self._ready = True
+        return connection
+
+    def get(self, kind: str, symbol: str) -> Optional[Tuple[float, float]]:
+        """Возвращает последнюю котировку и ее возраст в секундах или None."""
+        connection = self._connect()
+        try:
+            row = connection.execute(
+                "SELECT value, fetched_at FROM quotes WHERE kind = ? AND symbol = ?", (kind, symbol)
+            ).fetchone()
+        finally:
+            connection.close()
+        if row is None:
+            return None
+        return float(row[0]), self._clock() - float(row[1])
+
+    def put(self, kind: str, symbol: str, value: float) -> None:
+        """Сохраняет котировку вместо предыдущей."""
+        connection = self._connect()
+        try:
+            with connection:
+                connection.execute(
+                    "INSERT OR REPLACE INTO quotes (kind, symbol, value, fetched_at) VALUES (?, ?, ?, ?)",
+                    (kind, symbol, value, self._clock()),
+                )
+        finally:
+            connection.close()
+
+
+class MarketDataClient:
+    """
+    Клиент рыночных данных: курсы валют и цены акций.
+
+    HTTP-запросы идут через одну сессию с пулом соединений и таймаутами, котировки
+    кэшируются на ttl секунд, а fetch_all запрашивает все недостающие котировки параллельно
+    в пуле потоков, так что время ответа близко к самому медленному запросу, а не к их сумме.
+
+    Если задан store, котировки переживают перезапуск: устаревшая не более чем на stale_ttl
+    котировка отдается сразу и обновляется в фоне, а при ошибке API возвращается последнее
+    известное значение.
+    """
+
+    def __init__(
+        self,
+        base_url: str = CURRENCY_API_URL,
+        timeout: Any = DEFAULT_TIMEOUT,
+        ttl: float = DEFAULT_TTL,
+        max_workers: int = DEFAULT_WORKERS,
+        stock_fetcher: Callable[[str], float] = fetch_stock_price,
+        store: Optional[QuoteStore] = None,
+        stale_ttl: float = DEFAULT_STALE_TTL,
+    ) -> None:
+        self.base_url = base_url
+        self.timeout = timeout
+        self.cache = TTLCache(ttl)
+        self.max_workers = max_workers
+        self.stock_fetcher = stock_fetcher
+        self.store = store
+        self.stale_ttl = stale_ttl
+        self._refreshing: Set[Tuple[str, str]] = set()
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=max_workers, pool_maxsize=max_workers)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+        self._snapshot_lock = threading.Lock()
+
+    def _pool(self) -> ThreadPoolExecutor:
+        """Возвращает пул потоков (создается при первом параллельном запросе)."""
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(self.max_workers, thread_name_prefix="market")
+            return self._executor
+
+    def _fetch_snapshot(self, base: str) -> RatesSnapshot:
+        """Запрашивает у API курсы всех валют к base одним запросом."""
+        response = self.session.get(self.base_url.format(currency=base), timeout=self.timeout)
+        response.raise_for_status()
+        rates = response.json()["rates"]
+        return RatesSnapshot(base, {str(currency): float(rate) for currency, rate in rates.items()})
+
+    def rates_snapshot(self, base: str = SNAPSHOT_BASE) -> RatesSnapshot:
+        """Возвращает снимок курсов (один запрос на ttl, параллельные вызовы ждут один и тот же запрос)."""
+        key = ("snapshot", base)
+        snapshot = self.cache.get(key)
+        if snapshot is None:
+            with self._snapshot_lock:
+                snapshot = self.cache.get(key)
+                if snapshot is None:
+                    snapshot = self._fetch_snapshot(base)
+                    self.cache.set(key, snapshot)
+                    logger.debug("Получен снимок курсов к %s: %s валют", base, len(snapshot.rates))
+        result: RatesSnapshot = snapshot
+        return result
+
+    def _fetch_currency_rate(self, currency: str) -> float:
+        """Возвращает курс валюты к рублю, вычисленный по снимку курсов."""
+        return self.rates_snapshot().rate(currency, "RUB")
+
+    def _fetch(self, key: Tuple[str, str], fetch: Callable[[str], float]) -> float:
+        """Запрашивает котировку и сохраняет ее в кэш в памяти и на диске."""
+        value = fetch(key[1])
+        self.cache.set(key, value)
+        if self.store is not None:
+            try:
+                self.store.put(key[0], key[1], value)
+            except sqlite3.Error as e:
+                logger.warning("Не удалось сохранить котировку %s %s: %s", key[0], key[1], e)
+        return value
+
+    def _refresh(self, key: Tuple[str, str], fetch: Callable[[str], float]) -> None:
+        """Обновляет котировку в фоне (не больше одного обновления на ключ)."""
+        with self._lock:
+            if key in self._refreshing:
+                return
+            self._refreshing.add(key)
+
+        def run() -> None:
+            try:
+                self._fetch(key, fetch)
+            except Exception as e:
+                logger.warning("Фоновое обновление котировки %s %s не удалось: %s", key[0], key[1], e)
+            finally:
+                with self._lock:
+                    self._refreshing.discard(key)
+
+        self._pool().submit(run)
+
+    def _cached(self, key: Tuple[str, str], fetch: Callable[[str], float]) -> float:
+        """Возвращает котировку из кэша или запрашивает и кэширует ее."""
+        value = self.cache.get(key)
+        if value is not None:
+            return float(value)
+
+        stored: Optional[Tuple[float, float]] = None
+        if self.store is not None:
+            try:
+                stored = self.store.get(key[0], key[1])
+            except sqlite3.Error as e:
+                logger.warning("Не удалось прочитать кэш котировок: %s", e)
+        if stored is not None:
+            stored_value, age = stored
+            if age < self.cache.ttl:
+                self.cache.set(key, stored_value)
+                return stored_value
+            if age < self.cache.ttl + self.stale_ttl:
+                self._refresh(key, fetch)
+                return stored_value
+
+        try:
+            return self._fetch(key, fetch)
+        except Exception as e:
+            if stored is None:
+                raise
+            logger.warning("Котировка %s %s недоступна (%s), используется последнее известное значение", *key, e)
+            return stored[0]
+
+    def currency_rate(self, currency: str) -> float:
+        """Возвращает курс валюты к рублю (из кэша, если он не устарел)."""
+        return self._cached(("currency", currency), self._fetch_currency_rate)
+
+    def stock_price(self, symbol: str) -> float:
+        """Возвращает цену акции (из кэша, если она не устарела)."""
+        return self._cached(("stock", symbol), self.stock_fetcher)
+
+    def fetch_all(self, currencies: Sequence[str], stocks: Sequence[str]) -> Dict[str, List[Dict[str, Any]]]:
+        """
+        Возвращает курсы валют и цены акций, запрашивая недостающие котировки параллельно.
+
+        Args:
+            currencies: Коды валют, например ['USD', 'EUR'].
+            stocks: Тикеры акций, например ['AAPL', 'AMZN'].
+
+        Returns:
+            Словарь с ключами 'currency_rates' и 'stock_prices'; котировка, которую не удалось
+            получить и для которой нет последнего известного значения, равна None.
+        """
+        requests_to_run: List[Tuple[str, str, Callable[[str], float]]] = [
+            ("currency", currency, self.currency_rate) for currency in currencies
+        ] + [("stock", symbol, self.stock_price) for symbol in stocks]
+        futures: Dict[Tuple[str, str], "Future[float]"] = {}
+        values: Dict[Tuple[str, str], Optional[float]] = {}
+        for kind, name, getter in requests_to_run:
+            cached = self.cache.get((kind, name))
+            if cached is not None:
+                values[(kind, name)] = float(cached)
+            else:
+                futures[(kind, name)] = self._pool().submit(getter, name)
+
+        for key, future in futures.items():
+            try:
+                values[key] = future.result()
+            except Exception as e:
+                logger.error("Ошибка при запросе котировки %s %s: %s", key[0], key[1], e)
+                values[key] = None
+        logger.debug("Котировки: %s из кэша, %s запрошено", len(values) - len(futures), len(futures))
+
+        return {
+            "currency_rates": [{"currency": name, "rate": values[("currency", name)]} for name in currencies],
+            "stock_prices": [{"stock": name, "price": values[("stock", name)]} for name in stocks],
+        }
+
+    def close(self) -> None:
+        """Закрывает пул потоков и HTTP-сессию."""
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False)
+                self._executor = None
+        self.session.close()
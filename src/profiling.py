@@ -0,0 +1,393 @@
+import argparse
+import atexit
+import cProfile
+import functools
+import inspect
+import json
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager, nullcontext
+from datetime import datetime
+from typing import Any, Callable, ContextManager, Dict, Iterator, List, Optional, Sequence, TypeVar, cast
+
+import pandas as pd
+
+from logging_config import get_logger
+from src.serialization import dumps
+
+logger = get_logger(__name__)
+
+# Профилирование включается переменной окружения PROFILE=1. Без нее декоратор profiled возвращает
+# функцию без изменений, а stage — пустой контекстный менеджер, так что накладных расходов нет
+PROFILE = os.getenv("PROFILE") == "1"
+# Учет памяти через tracemalloc замедляет программу в разы, поэтому включается отдельно: PROFILE_MEMORY=1
+PROFILE_MEMORY = os.getenv("PROFILE_MEMORY") == "1"
+# Полный профиль cProfile за запуск в формате pstats (python -m pstats <файл>): PROFILE_CPROFILE=1
+PROFILE_CPROFILE = os.getenv("PROFILE_CPROFILE") == "1"
+PROFILE_DIR = os.getenv("PROFILE_DIR", "../data/profiles")
+# Сколько самых долгих этапов выводится в лог и в таблицу
+SUMMARY_STAGES = 15
+METRICS = ["calls", "wall_s", "self_wall_s", "cpu_s", "self_cpu_s", "rows_in", "rows_out", "alloc_mb", "peak_mb"]
+
+F = TypeVar("F", bound=Callable[..., Any])
+
+
+def _rows(value: Any) -> Optional[int]:
+    """Количество строк в значении: DataFrame, Series, список или набор транзакций; иначе None."""
+    if isinstance(value, (pd.DataFrame, pd.Series, list, tuple)):
+        return len(value)
+    frame = getattr(value, "frame", None)
+    if isinstance(frame, pd.DataFrame):
+        return len(frame)
+    return None
+
+
+def _input_rows(args: Sequence[Any], kwargs: Dict[str, Any]) -> Optional[int]:
+    """Количество строк в первом аргументе, у которого оно есть."""
+    for value in (*args, *kwargs.values()):
+        rows = _rows(value)
+        if rows is not None:
+            return rows
+    return None
+
+
+class _Frame:
+    """Открытый этап: моменты начала, время вложенных этапов и память на входе."""
+
+    __slots__ = ("name", "wall", "cpu", "child_wall", "child_cpu", "memory", "peak")
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+        self.wall = 0.0
+        self.cpu = 0.0
+        self.child_wall = 0.0
+        self.child_cpu = 0.0
+        self.memory = 0
+        self.peak = 0
+
+
+class ProfileRun:
+    """
+    Профиль одного запуска: метрики этапов, суммированные по вызовам.
+
+    Для каждого этапа учитываются количество вызовов, время (wall_s) и процессорное время потока
+    (cpu_s) вместе с вложенными этапами и без них (self_wall_s, self_cpu_s), строки на входе
+    и выходе, а при учете памяти — прирост памяти (alloc_mb) и пик сверх памяти на входе (peak_mb).
+    Пик памяти точен для этапов, которые выполняются в одном потоке.
+
+    Учет памяти (memory) и профиль cProfile (cprofile) по умолчанию включаются переменными
+    окружения PROFILE_MEMORY и PROFILE_CPROFILE.
+    """
+
+    def __init__(self, name: str, memory: Optional[bool] = None, cprofile: Optional[bool] = None) -> None:
+        self.name = name
+        self.memory = PROFILE_MEMORY if memory is None else memory
+        self.started = datetime.now()
+        self.stages: Dict[str, Dict[str, float]] = {}
+        self.wall_s = 0.0
+        self.cpu_s = 0.0
+        self._wall = 0.0
+        self._cpu = 0.0
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._profiler = cProfile.Profile() if (PROFILE_CPROFILE if cprofile is None else cprofile) else None
+        self._tracing = False
+        self._running = False
+
+    def start(self) -> None:
+        """Начинает запуск: включает tracemalloc и cProfile, если они нужны."""
+        if self.memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._tracing = True
+        if self._profiler is not None:
+            self._profiler.enable()
+        self._running = True
+        self._cpu = time.process_time()
+        self._wall = time.perf_counter()
+
+    def stop(self) -> None:
+        """Завершает запуск; повторный вызов ничего не делает."""
+        if not self._running:
+            return
+        self._running = False
+        self.wall_s = time.perf_counter() - self._wall
+        self.cpu_s = time.process_time() - self._cpu
+        if self._profiler is not None:
+            self._profiler.disable()
+        if self._tracing:
+            tracemalloc.stop()
+            self._tracing = False
+
+    def _stack(self) -> List[_Frame]:
+        stack: Optional[List[_Frame]] = getattr(self._local, "stack", None)
+        if stack is None:
+            stack = self._local.stack = []
+        return stack
+
+    def enter(self, name: str) -> _Frame:
+        """Открывает этап name в текущем потоке."""
+        stack = self._stack()
+        frame = _Frame(name)
+        if self.memory:
+            # Пик у tracemalloc один на процесс: перед сбросом он запоминается у объемлющего этапа
+            current, peak = tracemalloc.get_traced_memory()
+            if stack:
+                stack[-1].peak = max(stack[-1].peak, peak)
+            tracemalloc.reset_peak()
+            frame.memory = frame.peak = current
+        stack.append(frame)
+        frame.cpu = time.thread_time()
+        frame.wall = time.perf_counter()
+        return frame
+
+    def exit(
+        self, frame: _Frame, rows_in: Optional[int] = None, rows_out: Optional[int] = None, calls: int = 1
+    ) -> None:
+        """Закрывает этап и добавляет его метрики к метрикам этапа с тем же именем."""
+        wall = time.perf_counter() - frame.wall
+        cpu = time.thread_time() - frame.cpu
+        stack = self._stack()
+        if frame in stack:
+            stack.remove(frame)
+        metrics: Dict[str, float] = {
+            "calls": calls,
+            "wall_s": wall,
+            "self_wall_s": wall - frame.child_wall,
+            "cpu_s": cpu,
+            "self_cpu_s": cpu - frame.child_cpu,
+        }
+        if rows_in is not None:
+            metrics["rows_in"] = rows_in
+        if rows_out is not None:
+            metrics["rows_out"] = rows_out
+        if self.memory:
+            current, peak = tracemalloc.get_traced_memory()
+            frame.peak = max(frame.peak, peak)
+            metrics["alloc_mb"] = (current - frame.memory) / 2**20
+            metrics["peak_mb"] = (frame.peak - frame.memory) / 2**20
+            if stack:
+                stack[-1].peak = max(stack[-1].peak, frame.peak)
+            tracemalloc.reset_peak()
+        if stack:
+            stack[-1].child_wall += wall
+            stack[-1].child_cpu += cpu
+
+        with self._lock:
+            stats = self.stages.setdefault(frame.name, {})
+            for metric, value in metrics.items():
+                if metric == "peak_mb":
+                    stats[metric] = max(stats.get(metric, 0.0), value)
+                else:
+                    stats[metric] = stats.get(metric, 0) + value
+
+    def report(self) -> Dict[str, Any]:
+        """Возвращает отчет запуска; этапы упорядочены по собственному времени (без вложенных этапов)."""
+        with self._lock:
+            ranked = sorted(self.stages.items(), key=lambda item: item[1]["self_wall_s"], reverse=True)
+        stages = [{"name": name, **stats} for name, stats in ranked]
+        return {
+            "run": self.name,
+            "started": self.started.isoformat(timespec="seconds"),
+            "pid": os.getpid(),
+            "wall_s": self.wall_s,
+            "cpu_s": self.cpu_s,
+            "memory": self.memory,
+            "stages": stages,
+        }
+
+    def save(self, directory: Optional[str] = None) -> str:
+        """
+        Сохраняет отчет запуска в JSON (и профиль cProfile рядом, с расширением .pstats).
+
+        Args:
+            directory: Каталог отчетов; None — PROFILE_DIR.
+
+        Returns:
+            Путь к файлу отчета.
+        """
+        directory = directory or PROFILE_DIR
+        os.makedirs(directory, exist_ok=True)
+        base = os.path.join(directory, f"{self.name}-{self.started:%Y%m%d-%H%M%S}-{os.getpid()}")
+        report = self.report()
+        if self._profiler is not None:
+            report["pstats"] = base + ".pstats"
+            self._profiler.dump_stats(report["pstats"])
+        with open(base + ".json", "w", encoding="utf-8") as f:
+            f.write(dumps(report, indent=2))
+        return base + ".json"
+
+
+_run: Optional[ProfileRun] = None
+_NO_STAGE: ContextManager[None] = nullcontext()
+
+
+def _save_at_exit(run: ProfileRun) -> None:
+    run.stop()
+    if run.stages:
+        logger.info("Профиль процесса сохранен в %s", run.save())
+
+
+def current_run() -> ProfileRun:
+    """
+    Возвращает активный запуск. Этапы вне profile_run попадают в общий запуск процесса,
+    который сохраняется в PROFILE_DIR при выходе.
+    """
+    global _run
+    if _run is None:
+        _run = ProfileRun("process")
+        _run.start()
+        atexit.register(_save_at_exit, _run)
+    return _run
+
+
+@contextmanager
+def profile_run(
+    name: str, directory: Optional[str] = None, enabled: Optional[bool] = None
+) -> Iterator[Optional[ProfileRun]]:
+    """
+    Профилирует запуск: этапы внутри блока собираются в отдельный отчет, который по выходе
+    сохраняется в directory и кратко пишется в лог.
+
+    Args:
+        name: Имя запуска (начало имени файла отчета).
+        directory: Каталог отчетов; None — PROFILE_DIR.
+        enabled: Профилировать ли запуск; None — по переменной окружения PROFILE.
+
+    Yields:
+        Запуск или None, если профилирование выключено.
+    """
+    if not (PROFILE if enabled is None else enabled):
+        yield None
+        return
+    global _run
+    previous, run = _run, ProfileRun(name)
+    _run = run
+    run.start()
+    try:
+        yield run
+    finally:
+        run.stop()
+        _run = previous
+        path = run.save(directory)
+        report = run.report()
+        logger.info("Профиль запуска %s (%.3f с) сохранен в %s", name, report["wall_s"], path)
+        logger.info("Самые долгие этапы:\n%s", format_report(report, SUMMARY_STAGES))
+
+
+def stage(name: str) -> ContextManager[None]:
+    """
+    Профилирует блок кода как этап name (например, with stage("load"): ...).
+
+    Если профилирование выключено и запуск не начат, возвращает пустой контекстный менеджер.
+    """
+    if not PROFILE and _run is None:
+        return _NO_STAGE
+    return _stage(name)
+
+
+@contextmanager
+def _stage(name: str) -> Iterator[None]:
+    run = current_run()
+    frame = run.enter(name)
+    try:
+        yield
+    finally:
+        run.exit(frame)
+
+
+def profiled(function: F) -> F:
+    """
+    Декоратор: профилирует каждый вызов функции как этап '<модуль>.<функция>'.
+
+    Если профилирование выключено (PROFILE), возвращает саму функцию. У функций-генераторов
+    замеряется выполнение тела генератора при выдаче каждого элемента, а строки на выходе —
+    это сумма строк выданных элементов.
+    """
+    if not PROFILE:
+        return function
+    name = f"{function.__module__.rsplit('.', 1)[-1]}.{function.__qualname__}"
+
+    if inspect.isgeneratorfunction(function):
+
+        @functools.wraps(function)
+        def generator_wrapper(*args: Any, **kwargs: Any) -> Iterator[Any]:
+            rows_in = _input_rows(args, kwargs)
+            calls = 1
+            iterator = function(*args, **kwargs)
+            try:
+                while True:
+                    run = current_run()
+                    frame = run.enter(name)
+                    try:
+                        item = next(iterator)
+                    except StopIteration:
+                        run.exit(frame, rows_in, None, calls)
+                        return
+                    except BaseException:
+                        run.exit(frame, rows_in, None, calls)
+                        raise
+                    run.exit(frame, rows_in, _rows(item), calls)
+                    rows_in, calls = None, 0
+                    yield item
+            finally:
+                iterator.close()
+
+        return cast(F, generator_wrapper)
+
+    @functools.wraps(function)
+    def wrapper(*args: Any, **kwargs: Any) -> Any:
+        run = current_run()
+        frame = run.enter(name)
+        rows_out = None
+        try:
+            result = function(*args, **kwargs)
+            rows_out = _rows(result)
+            return result
+        finally:
+            run.exit(frame, _input_rows(args, kwargs), rows_out)
+
+    return cast(F, wrapper)
+
+
+def format_report(report: Dict[str, Any], limit: Optional[int] = None) -> str:
+    """Форматирует этапы отчета таблицей (первые limit этапов)."""
+    lines = [f"{'stage':<44}" + "".join(f"{metric:>12}" for metric in METRICS)]
+    for stats in report["stages"][:limit]:
+        values = []
+        for metric in METRICS:
+            value = stats.get(metric)
+            if value is None:
+                values.append(f"{'-':>12}")
+            elif metric in ("calls", "rows_in", "rows_out"):
+                values.append(f"{int(value):>12}")
+            else:
+                values.append(f"{value:>12.4f}")
+        lines.append(f"{stats['name']:<44}" + "".join(values))
+    return "\n".join(lines)
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    """
+    Выводит таблицу этапов сохраненного отчета:
+
+        python profiling.py ../data/profiles/main-20240101-120000-1234.json --limit 20
+    """
+    parser = argparse.ArgumentParser(description="Таблица этапов из отчета профилирования")
+    parser.add_argument("report", help="JSON-отчет из PROFILE_DIR")
+    parser.add_argument("--limit", type=int, help="сколько этапов вывести")
+    args = parser.parse_args(argv)
+
+    with open(args.report, encoding="utf-8") as f:
+        report = json.load(f)
+    print(f"{report['run']} ({report['started']}): wall {report['wall_s']:.4f} с, cpu {report['cpu_s']:.4f} с")
+    print(format_report(report, args.limit))
+    if report.get("pstats"):
+        print(f"Профиль cProfile: {report['pstats']}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,127 @@
+import heapq
+from itertools import count
+from typing import Any, Dict, Hashable, Iterable, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from src.dataset import OPERATION_DATE_FORMAT
+
+AMOUNT_COLUMN = "Сумма операции"
+DATE_COLUMN = "Дата операции"
+
+
+def _date_sort_key(value: Any) -> str:
+    """Возвращает ключ сортировки даты операции: 'DD.MM.YYYY HH:MM:SS' -> 'YYYYMMDD HH:MM:SS'."""
+    if isinstance(value, str):
+        return value[6:10] + value[3:5] + value[0:2] + value[10:]
+    if value is None or value is pd.NaT or (isinstance(value, float) and np.isnan(value)):
+        return ""
+    return str(pd.Timestamp(value).strftime("%Y%m%d %H:%M:%S"))
+
+
+def _date_values(dates: pd.Series) -> np.ndarray:
+    """Возвращает даты в виде int64 для сравнения (NaT — самая ранняя дата)."""
+    if not pd.api.types.is_datetime64_any_dtype(dates):
+        dates = pd.to_datetime(dates, format=OPERATION_DATE_FORMAT, errors="coerce")
+    values: np.ndarray = dates.to_numpy(dtype="datetime64[ns]").view("int64").copy()
+    # NaT хранится как минимальный int64; сдвигаем на 1, чтобы значение можно было безопасно инвертировать
+    values[values == np.iinfo(np.int64).min] += 1
+    return values
+
+
+def top_positions(amounts: np.ndarray, n: int, dates: Optional[pd.Series] = None) -> np.ndarray:
+    """
+    Возвращает позиции n операций с наибольшей суммой по модулю, упорядоченные по убыванию.
+
+    Отбор частичный (np.partition, O(n)), полностью сортируются только кандидаты.
+    При равных суммах выше более поздняя операция, затем более ранняя позиция.
+    Даты разбираются только для кандидатов.
+    """
+    magnitudes = np.nan_to_num(np.abs(np.asarray(amounts, dtype=float)), nan=-1.0)
+    if n <= 0 or len(magnitudes) == 0:
+        return np.array([], dtype=np.intp)
+
+    if n < len(magnitudes):
+        threshold = np.partition(magnitudes, len(magnitudes) - n)[len(magnitudes) - n]
+        # Берем всех, кто не меньше порога, чтобы равные на границе решил порядок по дате
+        candidates = np.flatnonzero(magnitudes >= threshold)
+    else:
+        candidates = np.arange(len(magnitudes))
+
+    keys: List[np.ndarray] = [candidates]
+    if dates is not None:
+        keys.append(-_date_values(dates.iloc[candidates]))
+    keys.append(-magnitudes[candidates])
+    order = np.lexsort(keys)
+    return candidates[order[:n]]
+
+
+def top_frame(df: pd.DataFrame, n: int = 10, group_by: Optional[str] = None) -> pd.DataFrame:
+    """
+    Возвращает топ-N операций DataFrame по сумме операции (по модулю).
+
+    Args:
+        df: DataFrame с операциями.
+        n: Количество операций (в каждой группе, если задан group_by).
+        group_by: Колонка для топ-N внутри группы (например, 'Номер карты' или 'Категория').
+
+    Returns:
+        DataFrame с отобранными операциями; группы идут в порядке первого появления.
+    """
+    dates = df[DATE_COLUMN] if DATE_COLUMN in df.columns else None
+    amounts = df[AMOUNT_COLUMN].to_numpy(dtype=float)
+    if group_by is None:
+        return df.iloc[top_positions(amounts, n, dates)]
+
+    # Коды factorize идут в порядке первого появления (и для категориальных колонок), пропуск — отдельная группа
+    codes, _ = pd.factorize(df[group_by], use_na_sentinel=False)
+    order = np.argsort(codes, kind="stable")
+    groups = np.split(order, np.flatnonzero(np.diff(codes[order])) + 1) if len(order) else []
+    selected = [
+        positions[top_positions(amounts[positions], n, dates.iloc[positions] if dates is not None else None)]
+        for positions in groups
+    ]
+    return df.iloc[np.concatenate(selected)] if selected else df.iloc[:0]
+
+
+def top_chunks(chunks: Iterable[pd.DataFrame], n: int = 10, group_by: Optional[str] = None) -> pd.DataFrame:
+    """
+    Возвращает топ-N операций из потока DataFrame-чанков.
+
+    В памяти держатся только текущий чанк и не более n кандидатов на группу.
+    """
+    best: Optional[pd.DataFrame] = None
+    for chunk in chunks:
+        candidates = top_frame(chunk, n, group_by)
+        best = candidates if best is None else top_frame(pd.concat([best, candidates]), n, group_by)
+    return best if best is not None else pd.DataFrame()
+
+
+def top_records(
+    records: Iterable[Dict[str, Any]], n: int = 10, group_by: Optional[str] = None
+) -> List[Dict[str, Any]]:
+    """
+    Возвращает топ-N операций из списка (или итератора) словарей по сумме операции (по модулю).
+
+    Использует кучу ограниченного размера (O(len * log n) времени, O(n) памяти на группу).
+    Порядок совпадает с устойчивой сортировкой по убыванию суммы, при равенстве выше более поздняя операция.
+    """
+    if n <= 0:
+        return []
+    heaps: Dict[Hashable, List[Tuple[float, str, int, Dict[str, Any]]]] = {}
+    for index, record in zip(count(), records):
+        group = record.get(group_by) if group_by is not None else None
+        if isinstance(group, float) and np.isnan(group):
+            group = None
+        heap = heaps.setdefault(group, [])
+        entry = (abs(record[AMOUNT_COLUMN]), _date_sort_key(record.get(DATE_COLUMN)), -index, record)
+        if len(heap) < n:
+            heapq.heappush(heap, entry)
+        elif entry[:3] > heap[0][:3]:
+            heapq.heapreplace(heap, entry)
+
+    result: List[Dict[str, Any]] = []
+    for heap in heaps.values():
+        result.extend(entry[3] for entry in sorted(heap, key=lambda entry: entry[:3], reverse=True))
+    return result
@@ -1,46 +1,49 @@
 import json
-import logging
 from datetime import datetime, timedelta
-from typing import Any, Dict, Optional
+from typing import Any, Dict, Optional, Union
 
 import pandas as pd
 
-from src.views import logger, read_xlsx
+from logging_config import get_logger
+from src.cube import WEEKDAY_NAMES, ExpenseCube
+from src.dataset import OPERATIONS_FILE, Frame, TransactionDataset, as_frame, payment_window, restore_source_format
+from src.profiling import profiled
+from src.utils import write_json
+from src.views import logger
 
-# --- Логирование модуля reports ---
-reports_logger = logging.getLogger("reports")
-reports_logger.setLevel(logging.DEBUG)
+# Логирование модуля reports (общий конвейер logging_config)
+reports_logger = get_logger("reports")
 
-# Создаем обработчик для записи логов в файл
-reports_file_handler = logging.FileHandler("reports.log")
+# Отчеты по расходам принимают и готовый куб (например, собранный из потока чанков ExpenseCube.from_chunks)
+Expenses = Union[Frame, ExpenseCube]
 
-# Создаем форматтер для логов
-reports_formatter = logging.Formatter("%(asctime)s - %(name)s - %(levellevel)s - %(message)s")
 
-# Устанавливаем форматтер для обработчика
-reports_file_handler.setFormatter(reports_formatter)
+def _expense_cube(transactions: Union[TransactionDataset, ExpenseCube]) -> ExpenseCube:
+    """Возвращает куб расходов набора (или сам куб)."""
+    return transactions if isinstance(transactions, ExpenseCube) else transactions.cube()
 
-# Добавляем обработчик к логгеру
-reports_logger.addHandler(reports_file_handler)
 
-
-def category_expenses_report(df: pd.DataFrame, category: str, start_date: str) -> str:
+@profiled
+def category_expenses_report(transactions: Expenses, category: str, start_date: str) -> str:
     reports_logger.debug(
-        f"Запуск функции category_expenses_report с параметрами: category={category}, start_date={start_date}"
+        "Запуск функции category_expenses_report с параметрами: category=%s, start_date=%s", category, start_date
     )
 
     start_date_parsed: datetime = datetime.strptime(start_date, "%Y-%m-%d")
     end_date: datetime = start_date_parsed + timedelta(days=90)
 
     # Проверка наличия необходимых столбцов
-    if not {"Категория", "Дата платежа", "Сумма операции"}.issubset(df.columns):
+    if not isinstance(transactions, ExpenseCube) and not {"Категория", "Дата платежа", "Сумма операции"}.issubset(
+        as_frame(transactions).columns
+    ):
         raise KeyError("DataFrame должен содержать столбцы 'Категория', 'Дата платежа', 'Сумма операции'")
 
-    filtered_df: pd.DataFrame = df[
-        (df["Категория"] == category) & (df["Дата платежа"] >= start_date_parsed) & (df["Дата платежа"] <= end_date)
-    ]
-
-    total_expenses: int = int(filtered_df["Сумма операции"].sum())
+    total_expenses: int
+    if isinstance(transactions, pd.DataFrame):
+        filtered_df: pd.DataFrame = payment_window(transactions, start_date_parsed, end_date, category)
+        total_expenses = int(filtered_df["Сумма операции"].sum())
+    else:
+        total_expenses = int(_expense_cube(transactions).total(start_date_parsed, end_date, category))
 
     result: Dict[str, Any] = {
         "category": category,
@@ -48,51 +51,63 @@ def category_expenses_report(df: pd.DataFrame, category: str, start_date: str) -
         "period": f"{start_date_parsed.date()} to {end_date.date()}",
     }
 
-    reports_logger.debug(f"Результат функции category_expenses_report: {result}")
+    reports_logger.debug("Результат функции category_expenses_report: %s", result)
     return json.dumps(result)
 
 
-def weekday_expenses_report(df: pd.DataFrame, start_date: Optional[str] = None) -> str:
+@profiled
+def weekday_expenses_report(transactions: Expenses, start_date: Optional[str] = None) -> str:
     """
     Функция для получения отчета о расходах по дням недели.
 
-    :param df: DataFrame с транзакциями.
+    :param transactions: DataFrame, TransactionDataset или куб расходов ExpenseCube.
     :param start_date: Необязательная дата начала отчетного периода в формате 'YYYY-MM-DD'.
     :return: JSON-строка с результатами отчета.
     """
-    reports_logger.debug(f"Запуск функции weekday_expenses_report с параметром start_date={start_date}")
+    reports_logger.debug("Запуск функции weekday_expenses_report с параметром start_date=%s", start_date)
 
-    if start_date:
-        start_date_parsed: datetime = datetime.strptime(start_date, "%Y-%m-%d")
-        df = df[df["Дата платежа"] >= start_date_parsed]
+    start_date_parsed: Optional[datetime] = datetime.strptime(start_date, "%Y-%m-%d") if start_date else None
 
-    df["weekday"] = df["Дата платежа"].dt.day_name()
-    expenses_by_weekday: Dict[str, int] = df.groupby("weekday")["Сумма операции"].sum().astype(int).to_dict()
+    expenses_by_weekday: Dict[str, int]
+    if isinstance(transactions, pd.DataFrame):
+        df = payment_window(transactions, start_date_parsed) if start_date_parsed else transactions
+        weekday = df["Дата платежа"].dt.day_name().rename("weekday")
+        expenses_by_weekday = df.groupby(weekday)["Сумма операции"].sum().astype(int).to_dict()
+    else:
+        by_weekday = _expense_cube(transactions).by_weekday(start_date_parsed)
+        expenses_by_weekday = {name: int(by_weekday[name]) for name in sorted(by_weekday)}
 
     result: Dict[str, Any] = {"expenses_by_weekday": expenses_by_weekday}
 
-    reports_logger.debug(f"Результат функции weekday_expenses_report: {result}")
+    reports_logger.debug("Результат функции weekday_expenses_report: %s", result)
     return json.dumps(result)
 
 
-def weekday_vs_weekend_expenses_report(df: pd.DataFrame, start_date: str) -> str:
+@profiled
+def weekday_vs_weekend_expenses_report(transactions: Expenses, start_date: str) -> str:
     """
     Функция для получения отчета о расходах в будние дни по сравнению с выходными.
 
-    :param df: DataFrame с транзакциями.
+    :param transactions: DataFrame, TransactionDataset или куб расходов ExpenseCube.
     :param start_date: Дата начала отчетного периода в формате 'YYYY-MM-DD'.
     :return: JSON-строка с результатами отчета.
     """
-    reports_logger.debug(f"Запуск функции weekday_vs_weekend_expenses_report с параметром start_date={start_date}")
+    reports_logger.debug("Запуск функции weekday_vs_weekend_expenses_report с параметром start_date=%s", start_date)
 
     start_date_parsed: datetime = datetime.strptime(start_date, "%Y-%m-%d")
     end_date: datetime = start_date_parsed + timedelta(days=90)
 
-    filtered_df: pd.DataFrame = df[(df["Дата платежа"] >= start_date_parsed) & (df["Дата платежа"] <= end_date)]
-
-    filtered_df["is_weekend"] = filtered_df["Дата платежа"].dt.weekday >= 5
-    weekend_expenses: int = int(filtered_df[filtered_df["is_weekend"]]["Сумма операции"].sum())
-    weekday_expenses: int = int(filtered_df[~filtered_df["is_weekend"]]["Сумма операции"].sum())
+    weekend_expenses: int
+    weekday_expenses: int
+    if isinstance(transactions, pd.DataFrame):
+        filtered_df: pd.DataFrame = payment_window(transactions, start_date_parsed, end_date)
+        is_weekend = filtered_df["Дата платежа"].dt.weekday >= 5
+        weekend_expenses = int(filtered_df.loc[is_weekend, "Сумма операции"].sum())
+        weekday_expenses = int(filtered_df.loc[~is_weekend, "Сумма операции"].sum())
+    else:
+        by_weekday = _expense_cube(transactions).by_weekday(start_date_parsed, end_date)
+        weekend_expenses = int(sum(by_weekday.get(name, 0.0) for name in WEEKDAY_NAMES[5:]))
+        weekday_expenses = int(sum(by_weekday.get(name, 0.0) for name in WEEKDAY_NAMES[:5]))
 
     result: Dict[str, Any] = {
         "weekday_expenses": weekday_expenses,
@@ -100,55 +115,51 @@ def weekday_vs_weekend_expenses_report(df: pd.DataFrame, start_date: str) -> str
         "period": f"{start_date_parsed.date()} to {end_date.date()}",
     }
 
-    reports_logger.debug(f"Результат функции weekday_vs_weekend_expenses_report: {result}")
+    reports_logger.debug("Результат функции weekday_vs_weekend_expenses_report: %s", result)
     return json.dumps(result)
 
 
-def filter_transactions(transactions: pd.DataFrame, category: str, start_date: str) -> Any:
+@profiled
+def filter_transactions(transactions: Frame, category: str, start_date: str) -> Any:
     """
     Фильтрация транзакций по категории и дате.
 
     Args:
-        transactions: DataFrame с транзакциями.
+        transactions: DataFrame или TransactionDataset с транзакциями.
         category: Категория для фильтрации.
         start_date: Дата начала 3-месячного периода в формате 'DD.MM.YYYY'.
 
     Returns:
         Список словарей с транзакциями, соответствующими запросу.
     """
-    # Преобразование столбца "Дата платежа" в тип datetime
-    transactions["Дата платежа"] = pd.to_datetime(transactions["Дата платежа"], format="%d.%m.%Y")
+    return filter_transactions_frame(transactions, category, start_date).to_dict("records")
+
 
+@profiled
+def filter_transactions_frame(transactions: Frame, category: str, start_date: str) -> pd.DataFrame:
+    """Возвращает DataFrame операций категории за 3 месяца с start_date ('DD.MM.YYYY') в формате выгрузки."""
     start_date_parsed = datetime.strptime(start_date, "%d.%m.%Y")
     end_date = start_date_parsed + timedelta(days=90)
 
-    filtered_transactions = transactions[
-        (transactions["Категория"] == category)
-        & (transactions["Дата платежа"] >= start_date_parsed)
-        & (transactions["Дата платежа"] < end_date)
-    ]
-
-    # Использование .loc для изменения значений в DataFrame
-    filtered_transactions.loc[:, "Дата платежа"] = filtered_transactions["Дата платежа"].dt.strftime("%d.%m.%Y")
-
-    # Преобразование объектов Timestamp в строки
-    filtered_transactions = filtered_transactions.astype(str)
+    filtered_transactions = payment_window(
+        transactions, start_date_parsed, end_date, category, include_end=False, source_order=True
+    )
 
-    return filtered_transactions.to_dict("records")
+    # Возвращаем даты в формат выгрузки и убираем служебные колонки
+    return restore_source_format(filtered_transactions)
 
 
-def main_reports() -> None:
+@profiled
+def main_reports(dataset: Optional[TransactionDataset] = None) -> None:
     """
     Главная функция модуля.
     """
-    operations = read_xlsx("../data/operations.xls")
+    operations = dataset if dataset is not None else TransactionDataset.from_file(OPERATIONS_FILE)
     category = input("Введите категорию трат: ")
     start_date = input("Введите дату начала 3-месячного периода (DD.MM.YYYY): ")
 
-    filtered_operations = filter_transactions(operations, category, start_date)
-
-    with open("filtered_operations.json", "w", encoding="utf-8") as f:
-        json.dump(filtered_operations, f, indent=4, ensure_ascii=False)
+    # Операции записываются в JSON напрямую из DataFrame (пропуски — null)
+    write_json("filtered_operations.json", filter_transactions_frame(operations, category, start_date))
 
     logger.info("Отфильтрованные операции записаны в файл filtered_operations.json")
     print("Отфильтрованные операции записаны в файл filtered_operations.json")
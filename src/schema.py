@@ -0,0 +1,53 @@
+from typing import Any, Dict, Iterable
+
+import pandas as pd
+
+from logging_config import get_logger
+
+logger = get_logger(__name__)
+
+# Текстовые колонки выгрузки с небольшим числом различных значений
+CATEGORICAL_COLUMNS = ["Статус", "Валюта операции", "Валюта платежа", "Категория", "Номер карты", "Описание"]
+# Колонка становится категориальной, только если уникальных значений не больше этой доли строк
+MAX_CATEGORY_RATIO = 0.5
+
+
+def compact_frame(df: pd.DataFrame, categorical: Iterable[str] = CATEGORICAL_COLUMNS) -> pd.DataFrame:
+    """
+    Возвращает DataFrame с колонками, приведенными к компактным типам.
+
+    Текстовые колонки с повторяющимися значениями становятся category (коды int8/int16 вместо
+    строк Python; для номера карты коды служат компактным идентификатором карты), целочисленные
+    колонки сжимаются до наименьшего подходящего целого типа. Суммы остаются float64: точная
+    арифметика в копейках выполняется при агрегации (см. src.cube).
+    """
+    converted: Dict[str, pd.Series] = {}
+    for column in categorical:
+        if column not in df.columns or not pd.api.types.is_object_dtype(df[column]):
+            continue
+        values = df[column]
+        if values.nunique() <= max(1, len(values) * MAX_CATEGORY_RATIO):
+            converted[column] = values.astype("category")
+
+    for column in df.select_dtypes("integer").columns:
+        values = pd.to_numeric(df[column], downcast="integer")
+        if values.dtype != df[column].dtype:
+            converted[str(column)] = values
+
+    if not converted:
+        return df
+    logger.debug("Компактные типы для колонок: %s", ", ".join(converted))
+    return df.assign(**converted)
+
+
+def memory_report(df: pd.DataFrame) -> Dict[str, Any]:
+    """
+    Возвращает отчет о занимаемой DataFrame памяти.
+
+    Returns:
+        Словарь: rows, total_bytes и columns — для каждой колонки тип и размер в байтах
+        (строки Python учитываются полностью).
+    """
+    usage = df.memory_usage(deep=True, index=True)
+    columns = {str(column): {"dtype": str(df[column].dtype), "bytes": int(usage[column])} for column in df.columns}
+    return {"rows": len(df), "total_bytes": int(usage.sum()), "columns": columns}
@@ -0,0 +1,133 @@
+import json
+import re
+from datetime import date, datetime
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+try:
+    import orjson
+except ImportError:  # orjson — необязательная зависимость, без нее используется стандартный json
+    orjson = None  # type: ignore[assignment]
+
+# Строковые литералы JSON пропускаются, чтобы не заменить 'NaN' внутри текста
+_NON_FINITE = re.compile(r'"(?:[^"\\]|\\.)*"|-?Infinity|NaN')
+# Знаков после запятой у чисел в DataFrame.to_json: суммы в копейках записываются без потерь
+DOUBLE_PRECISION = 10
+
+
+def _default(value: Any) -> Any:
+    """Приводит к типам JSON значения, которые json не сериализует сам (даты, типы NumPy и pandas)."""
+    if value is pd.NaT:
+        return None
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, np.integer):
+        return int(value)
+    if isinstance(value, np.floating):
+        return None if np.isnan(value) else float(value)
+    if isinstance(value, np.bool_):
+        return bool(value)
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    if isinstance(value, pd.Timedelta):
+        return str(value)
+    if isinstance(value, (set, frozenset)):
+        return list(value)
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def _null_non_finite(text: str) -> str:
+    """Заменяет NaN и Infinity (недопустимые в JSON) на null."""
+    if "NaN" not in text and "Infinity" not in text:
+        return text
+    return _NON_FINITE.sub(lambda match: match.group(0) if match.group(0)[0] == '"' else "null", text)
+
+
+def dumps(data: Any, indent: Optional[int] = None, ensure_ascii: bool = False) -> str:
+    """
+    Сериализует данные в JSON: даты — в ISO 8601, NaN и NaT — в null, типы NumPy — в числа.
+
+    Если установлен orjson и формат им поддерживается (без отступов или с отступом 2, без
+    экранирования не-ASCII символов), сериализует orjson, иначе — стандартный json.
+
+    Args:
+        data: Данные для сериализации.
+        indent: Отступ; None — компактный вывод в одну строку.
+        ensure_ascii: Экранировать не-ASCII символы.
+
+    Returns:
+        JSON-строка.
+    """
+    if orjson is not None and indent in (None, 2) and not ensure_ascii:
+        option = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        result: str = orjson.dumps(data, default=_default, option=option).decode("utf-8")
+        return result
+    return _null_non_finite(json.dumps(data, default=_default, indent=indent, ensure_ascii=ensure_ascii))
+
+
+def _to_json_kwargs(ensure_ascii: bool) -> Dict[str, Any]:
+    """Параметры DataFrame.to_json, общие для компактного и форматированного вывода."""
+    return {"force_ascii": ensure_ascii, "double_precision": DOUBLE_PRECISION, "date_format": "iso", "date_unit": "s"}
+
+
+def _cells_json(series: pd.Series, indent: int, ensure_ascii: bool) -> List[str]:
+    """
+    Возвращает JSON-представления значений колонки по строкам DataFrame, как их записал бы json.dumps.
+
+    Значения кодируются pandas так же, как в компактном выводе, но только уникальные:
+    ячейки получают готовую строку по коду значения.
+    """
+    try:
+        codes, uniques = pd.factorize(series, use_na_sentinel=False)
+    except TypeError:  # нехэшируемые значения (например, списки) кодируются по ячейкам
+        codes, uniques = np.arange(len(series)), series
+    values = json.loads(pd.Series(uniques).to_json(orient="values", **_to_json_kwargs(ensure_ascii)))
+    if pd.api.types.is_numeric_dtype(series) and not pd.api.types.is_bool_dtype(series):
+        # json.dumps записывает числа через repr
+        cells = ["null" if value is None else repr(value) for value in values]
+    else:
+        # Вложенные значения получают отступ уровня поля записи
+        nested = "\n" + " " * (2 * indent)
+        encoder = json.JSONEncoder(indent=indent, ensure_ascii=ensure_ascii)
+        cells = [encoder.encode(value).replace("\n", nested) for value in values]
+    result: List[str] = np.array(cells, dtype=object)[codes].tolist()
+    return result
+
+
+def _indented_records(df: pd.DataFrame, indent: int, ensure_ascii: bool) -> str:
+    """Собирает список записей с отступом, как json.dumps, из строк значений по колонкам, без словаря на запись."""
+    if not len(df) or not len(df.columns):
+        return "[]"
+    padding = " " * indent
+    # Строка записи — шаблон str.format: фигурные скобки в именах колонок экранируются
+    keys = [json.dumps(str(column), ensure_ascii=ensure_ascii).replace("{", "{{").replace("}", "}}") for column in df]
+    template = padding + "{{\n" + ",\n".join(padding * 2 + key + ": {}" for key in keys) + "\n" + padding + "}}"
+    columns = [_cells_json(df.iloc[:, i], indent, ensure_ascii) for i in range(len(df.columns))]
+    return "[\n" + ",\n".join(template.format(*row) for row in zip(*columns)) + "\n]"
+
+
+def frame_to_json(df: pd.DataFrame, indent: Optional[int] = None, ensure_ascii: bool = False) -> str:
+    """
+    Сериализует DataFrame списком записей напрямую (в C-коде pandas), без промежуточных словарей Python.
+
+    Пропуски записываются как null, колонки datetime — в ISO 8601. Даты в формате выгрузки
+    нужно привести заранее (см. src.dataset.restore_source_format). Вывод с отступом совпадает
+    с json.dumps: он собирается по колонкам из закодированных pandas уникальных значений.
+
+    Args:
+        df: DataFrame для сериализации.
+        indent: Отступ; None — компактный вывод в одну строку.
+        ensure_ascii: Экранировать не-ASCII символы.
+
+    Returns:
+        JSON-строка со списком записей.
+    """
+    if indent:
+        return _indented_records(df, indent, ensure_ascii)
+    text: str = df.to_json(orient="records", **_to_json_kwargs(ensure_ascii))
+    # pandas экранирует '/', хотя JSON этого не требует
+    return text.replace("\\/", "/")
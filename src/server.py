@@ -0,0 +1,344 @@
+import argparse
+import asyncio
+import json
+import sys
+import time
+from collections import OrderedDict
+from datetime import datetime
+from http import HTTPStatus
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple, Union
+from urllib.parse import parse_qs, urlsplit
+
+from logging_config import get_logger
+from src.dataset import OPERATIONS_FILE, TransactionDataset
+from src.market import load_user_settings
+from src.profiling import stage
+from src.reports import category_expenses_report, weekday_expenses_report, weekday_vs_weekend_expenses_report
+from src.serialization import dumps
+from src.services import beneficial_cashback_categories, get_expenses, get_transactions, invest_piggy_bank
+from src.views import CARDS_ROLLUP, index_page, market_client
+
+logger = get_logger(__name__)
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8080
+# Ответы на одинаковые запросы к неизменному набору одинаковы: последние RESPONSE_CACHE_SIZE хранятся в памяти
+RESPONSE_CACHE_SIZE = 1024
+# Ограничения запроса: заголовки длиннее MAX_HEADER_SIZE байт и тело длиннее MAX_BODY_SIZE отклоняются
+MAX_HEADER_SIZE = 16 * 1024
+MAX_BODY_SIZE = 1024 * 1024
+# Соединение keep-alive без запросов закрывается через KEEP_ALIVE_TIMEOUT секунд
+KEEP_ALIVE_TIMEOUT = 15.0
+
+Params = Dict[str, List[str]]
+Handler = Callable[[Params], str]
+
+
+def _param(params: Params, name: str) -> str:
+    """Возвращает обязательный параметр запроса (последнее значение, если параметр повторяется)."""
+    values = params.get(name)
+    if not values:
+        raise ValueError(f"Не задан параметр '{name}'")
+    return values[-1]
+
+
+def _optional_param(params: Params, name: str) -> Optional[str]:
+    values = params.get(name)
+    return values[-1] if values else None
+
+
+def _int_param(params: Params, name: str) -> Optional[int]:
+    value = _optional_param(params, name)
+    if value is None:
+        return None
+    try:
+        return int(value)
+    except ValueError:
+        raise ValueError(f"Параметр '{name}' должен быть целым числом") from None
+
+
+def warm_up(dataset: TransactionDataset) -> None:
+    """Строит структуры набора, которые используют обработчики: куб, текстовый индекс, сводку по картам."""
+    dataset.cube()
+    dataset.text_index()
+    dataset.rollup(CARDS_ROLLUP)
+    dataset.date_index()
+    dataset.store()
+
+
+class TransactionService:
+    """
+    HTTP/JSON API к одному набору транзакций, который хранится в памяти между запросами.
+
+    Набор, его индексы и кэш котировок (src.views.market_client) строятся один раз, поэтому
+    ответ — это обработка запроса, а не загрузка выгрузки. Все обработчики выполняются в потоке
+    цикла событий, кроме запроса котировок, который ждет сеть в пуле потоков.
+
+    Эндпоинты (GET, параметры в строке запроса):
+        /health                          — состояние сервиса и количество операций;
+        /index?date=                     — главная страница (views.index_page);
+        /reports/category?category=&start_date=
+        /reports/weekday?start_date=
+        /reports/weekday-vs-weekend?start_date=
+        /transactions?q=                 — поиск (services.get_transactions);
+        /expenses?category=&date=        — траты за 3 месяца (services.get_expenses), без date — до текущего момента;
+        /cashback/categories?year=&month=
+        /cashback/piggy-bank?limit=&month=&year= — limit можно повторить для сравнения лимитов;
+        /quotes                          — котировки из пользовательских настроек.
+    """
+
+    def __init__(self, dataset: TransactionDataset, cache_size: int = RESPONSE_CACHE_SIZE) -> None:
+        self.dataset = dataset
+        self.cache_size = cache_size
+        self._responses: "OrderedDict[Tuple[str, Tuple[Tuple[str, Tuple[str, ...]], ...]], str]" = OrderedDict()
+        self.routes: Dict[str, Handler] = {
+            "/health": self.health,
+            "/index": self.index,
+            "/reports/category": self.category_report,
+            "/reports/weekday": self.weekday_report,
+            "/reports/weekday-vs-weekend": self.weekday_vs_weekend_report,
+            "/transactions": self.transactions,
+            "/expenses": self.expenses,
+            "/cashback/categories": self.cashback_categories,
+            "/cashback/piggy-bank": self.piggy_bank,
+            "/quotes": self.quotes,
+        }
+        # Ответы этих эндпоинтов меняются со временем, а котировки ждут сеть и не блокируют цикл событий
+        self.uncached = {"/health", "/quotes"}
+        self.blocking = {"/quotes"}
+        # Без этого параметра эндпоинт считает от текущего момента, и такой ответ не кэшируется
+        self.dated = {"/expenses": "date"}
+
+    def health(self, params: Params) -> str:
+        return dumps({"status": "ok", "transactions": len(self.dataset)})
+
+    def index(self, params: Params) -> str:
+        date = _param(params, "date")
+        try:
+            datetime.strptime(date, "%Y-%m-%d %H:%M:%S")
+        except ValueError:
+            raise ValueError("Параметр 'date' должен быть в формате YYYY-MM-DD HH:MM:SS") from None
+        body = index_page(date, self.dataset)
+        # index_page сообщает об ошибке телом ответа; такой ответ не должен попасть в кэш с кодом 200
+        error = json.loads(body).get("error")
+        if error is not None:
+            raise RuntimeError(error)
+        return body
+
+    def category_report(self, params: Params) -> str:
+        return category_expenses_report(self.dataset, _param(params, "category"), _param(params, "start_date"))
+
+    def weekday_report(self, params: Params) -> str:
+        return weekday_expenses_report(self.dataset, _optional_param(params, "start_date"))
+
+    def weekday_vs_weekend_report(self, params: Params) -> str:
+        return weekday_vs_weekend_expenses_report(self.dataset, _param(params, "start_date"))
+
+    def transactions(self, params: Params) -> str:
+        return get_transactions(_param(params, "q"), dataset=self.dataset, output_file=None, indent=None)
+
+    def expenses(self, params: Params) -> str:
+        return get_expenses(self.dataset, _param(params, "category"), _optional_param(params, "date"))
+
+    def cashback_categories(self, params: Params) -> str:
+        year = _int_param(params, "year")
+        if year is None:
+            raise ValueError("Не задан параметр 'year'")
+        return beneficial_cashback_categories(year, _int_param(params, "month"), self.dataset)
+
+    def piggy_bank(self, params: Params) -> str:
+        try:
+            limits = [float(limit) for limit in params.get("limit", [])]
+        except ValueError:
+            raise ValueError("Параметр 'limit' должен быть числом") from None
+        if not limits:
+            raise ValueError("Не задан параметр 'limit'")
+        limit: Union[float, List[float]] = limits[0] if len(limits) == 1 else limits
+        return invest_piggy_bank(_int_param(params, "month"), self.dataset, limit, _int_param(params, "year"))
+
+    def quotes(self, params: Params) -> str:
+        settings = load_user_settings()
+        return dumps(market_client.fetch_all(settings.get("user_currencies", []), settings.get("user_stocks", [])))
+
+    def _cached(self, key: Any) -> Optional[str]:
+        body = self._responses.get(key)
+        if body is not None:
+            self._responses.move_to_end(key)
+        return body
+
+    def _remember(self, key: Any, body: str) -> None:
+        self._responses[key] = body
+        if len(self._responses) > self.cache_size:
+            self._responses.popitem(last=False)
+
+    def clear_cache(self) -> None:
+        """Сбрасывает кэш ответов (после изменения набора)."""
+        self._responses.clear()
+
+    async def handle(self, method: str, target: str) -> Tuple[int, str]:
+        """
+        Обрабатывает запрос.
+
+        Args:
+            method: HTTP-метод.
+            target: Путь со строкой запроса, например '/expenses?category=Супермаркеты&date=2021-12-31'.
+
+        Returns:
+            Код ответа и JSON-тело.
+        """
+        url = urlsplit(target)
+        path = url.path.rstrip("/") or "/"
+        handler = self.routes.get(path)
+        if handler is None:
+            return HTTPStatus.NOT_FOUND, dumps({"error": f"Неизвестный путь {path}"})
+        if method not in ("GET", "HEAD"):
+            return HTTPStatus.METHOD_NOT_ALLOWED, dumps({"error": f"Метод {method} не поддерживается"})
+
+        params = parse_qs(url.query)
+        key = (path, tuple(sorted((name, tuple(values)) for name, values in params.items())))
+        cached = path not in self.uncached and (path not in self.dated or self.dated[path] in params)
+        if cached:
+            body = self._cached(key)
+            if body is not None:
+                return HTTPStatus.OK, body
+        try:
+            with stage(f"server.{path}"):
+                if path in self.blocking:
+                    body = await asyncio.get_running_loop().run_in_executor(None, handler, params)
+                else:
+                    body = handler(params)
+        except (ValueError, KeyError) as e:
+            return HTTPStatus.BAD_REQUEST, dumps({"error": str(e)})
+        except Exception as e:
+            logger.exception("Ошибка при обработке запроса %s: %s", target, e)
+            return HTTPStatus.INTERNAL_SERVER_ERROR, dumps({"error": "Внутренняя ошибка сервиса"})
+        if cached:
+            self._remember(key, body)
+        return HTTPStatus.OK, body
+
+
+def _response(status: int, body: bytes, keep_alive: bool, head: bool = False) -> bytes:
+    """Собирает HTTP/1.1-ответ с JSON-телом."""
+    headers = (
+        f"HTTP/1.1 {int(status)} {HTTPStatus(status).phrase}\r\n"
+        "Content-Type: application/json; charset=utf-8\r\n"
+        f"Content-Length: {len(body)}\r\n"
+        f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n"
+    )
+    return headers.encode("latin-1") + (b"" if head else body)
+
+
+async def handle_connection(
+    service: TransactionService, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+) -> None:
+    """Обслуживает соединение: запросы HTTP/1.x по очереди, пока клиент держит keep-alive."""
+    try:
+        while True:
+            try:
+                head = await asyncio.wait_for(reader.readuntil(b"\r\n\r\n"), KEEP_ALIVE_TIMEOUT)
+            except (asyncio.IncompleteReadError, asyncio.TimeoutError, ConnectionError):
+                return
+            except asyncio.LimitOverrunError:
+                writer.write(_response(HTTPStatus.REQUEST_HEADER_FIELDS_TOO_LARGE, b"", False))
+                return
+            start = time.perf_counter()
+
+            lines = head.decode("latin-1").split("\r\n")
+            try:
+                method, target, version = lines[0].split(" ")
+                # Клиенты вроде curl передают не-ASCII символы пути без %-кодирования, в UTF-8
+                target = target.encode("latin-1").decode("utf-8")
+            except ValueError:
+                writer.write(_response(HTTPStatus.BAD_REQUEST, dumps({"error": "Неверный запрос"}).encode(), False))
+                return
+            headers = {}
+            for line in lines[1:]:
+                name, _, value = line.partition(":")
+                headers[name.strip().lower()] = value.strip()
+            connection = headers.get("connection", "").lower()
+            keep_alive = connection == "keep-alive" if version == "HTTP/1.0" else connection != "close"
+
+            content_length = headers.get("content-length", "0")
+            length = int(content_length) if content_length.isdigit() else -1
+            if not 0 <= length <= MAX_BODY_SIZE:
+                writer.write(_response(HTTPStatus.REQUEST_ENTITY_TOO_LARGE, b"", False))
+                return
+            if length:
+                await reader.readexactly(length)  # тело запросам не нужно
+
+            status, body = await service.handle(method, target)
+            writer.write(_response(status, body.encode("utf-8"), keep_alive, method == "HEAD"))
+            await writer.drain()
+            logger.debug("%s %s -> %s за %.2f мс", method, target, status, (time.perf_counter() - start) * 1000)
+            if not keep_alive:
+                return
+    finally:
+        writer.close()
+
+
+async def start_server(
+    service: TransactionService, host: str = DEFAULT_HOST, port: int = DEFAULT_PORT
+) -> asyncio.Server:
+    """Запускает сервер; port=0 — любой свободный порт (см. server.sockets)."""
+    return await asyncio.start_server(
+        lambda reader, writer: handle_connection(service, reader, writer), host, port, limit=MAX_HEADER_SIZE
+    )
+
+
+async def _prefetch_quotes() -> None:
+    """Заполняет кэш котировок из пользовательских настроек, не задерживая запуск сервера."""
+    settings = load_user_settings()
+    try:
+        await asyncio.get_running_loop().run_in_executor(
+            None, market_client.fetch_all, settings.get("user_currencies", []), settings.get("user_stocks", [])
+        )
+    except Exception as e:
+        logger.error("Не удалось заранее получить котировки: %s", e)
+
+
+async def serve(service: TransactionService, host: str = DEFAULT_HOST, port: int = DEFAULT_PORT) -> None:
+    """Запускает сервер и обслуживает запросы до отмены."""
+    server = await start_server(service, host, port)
+    prefetch = asyncio.create_task(_prefetch_quotes())
+    logger.info("Сервис слушает %s:%s, операций в наборе: %s", host, port, len(service.dataset))
+    print(f"Сервис слушает http://{host}:{port}")
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        prefetch.cancel()
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    """
+    Запускает HTTP/JSON-сервис из командной строки (из каталога src, как main.py):
+
+        python server.py --port 8080
+        curl 'http://127.0.0.1:8080/expenses?category=Супермаркеты&date=2021-12-31'
+    """
+    parser = argparse.ArgumentParser(description="HTTP/JSON-сервис главной страницы, отчетов и поиска")
+    parser.add_argument("--host", default=DEFAULT_HOST)
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--file", nargs="+", default=[OPERATIONS_FILE], help="файлы выгрузки")
+    parser.add_argument("--cache-size", type=int, default=RESPONSE_CACHE_SIZE, help="ответов в кэше")
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    if len(args.file) == 1:
+        dataset = TransactionDataset.from_file(args.file[0])
+    else:
+        dataset = TransactionDataset.from_files(args.file)
+    warm_up(dataset)
+    logger.info("Набор загружен и подготовлен за %.2f с", time.perf_counter() - start)
+
+    try:
+        asyncio.run(serve(TransactionService(dataset, args.cache_size), args.host, args.port))
+    except KeyboardInterrupt:
+        logger.info("Сервис остановлен")
+    finally:
+        market_client.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
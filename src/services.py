@@ -1,32 +1,48 @@
 import json
-import logging
-import re
 from datetime import datetime
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, List, Optional, Sequence, Tuple, Union
 
+import numpy as np
 import pandas as pd
 
-from src.views import logger, read_xlsx
-
-# Логирование модуля services
-services_logger = logging.getLogger("services")
-services_logger.setLevel(logging.DEBUG)
-
-# Создаем обработчик для записи логов в файл
-services_file_handler = logging.FileHandler("services.log")
-
-# Создаем форматтер для логов
-services_formatter = logging.Formatter("%(asctime)s - %(name)s - %(levelname)s - %(message)s")
-
-# Устанавливаем форматтер для обработчика
-services_file_handler.setFormatter(services_formatter)
-
-# Добавляем обработчик к логгеру
-services_logger.addHandler(services_file_handler)
-
-
+from logging_config import Payload, get_logger
+from src.cache import load_transactions
+from src.classifier import TransactionClassifier
+from src.cube import to_kopecks
+from src.dataset import (
+    CATEGORY_COLUMN,
+    OPERATION_DATE_FORMAT,
+    OPERATIONS_FILE,
+    Frame,
+    TransactionDataset,
+    Transactions,
+    format_dates,
+    payment_window,
+    restore_source_format,
+)
+from src.profiling import profiled
+from src.serialization import dumps, frame_to_json
+from src.text_index import TextIndex, normalize_text
+from src.utils import iter_transaction_chunks
+from src.views import logger
+
+# Логирование модуля services (общий конвейер logging_config)
+services_logger = get_logger("services")
+
+# Ставки повышенного кешбэка по категориям; для остальных категорий берется DEFAULT_CASHBACK_RATE
+# (переводы и снятие наличных кешбэком не вознаграждаются)
+CASHBACK_RATES: Dict[str, float] = {"Переводы": 0.0, "Наличные": 0.0}
+DEFAULT_CASHBACK_RATE = 0.05
+
+
+@profiled
 def get_transactions(
-    search_term: str, file_path: str = "../data/operations.xls", output_file: str = "transactions_search_result.json"
+    search_term: str,
+    file_path: str = OPERATIONS_FILE,
+    output_file: Optional[str] = "transactions_search_result.json",
+    dataset: Optional[TransactionDataset] = None,
+    chunk_size: Optional[int] = None,
+    indent: Optional[int] = 4,
 ) -> str:
     """
     Возвращает JSON-ответ со всеми транзакциями, содержащими search_term
@@ -34,86 +50,334 @@ def get_transactions(
 
     Args:
         search_term: Строка для поиска.
-        file_path: Путь к файлу Excel с данными транзакций.
-        output_file: Путь к выходному файлу JSON с результатами поиска.
+        file_path: Путь к файлу Excel (или CSV) с данными транзакций.
+        output_file: Путь к выходному файлу JSON с результатами поиска; None — файл не записывается.
+        dataset: Уже загруженный набор транзакций; если передан, файл не читается.
+        chunk_size: Если задан, файл читается потоком по chunk_size строк и целиком в память не загружается.
+        indent: Отступ в JSON; None — компактный вывод для машинной обработки.
 
     Returns:
         JSON-строка с результатами поиска.
     """
-    logger.info(f"Поиск транзакций по ключевому слову: {search_term}")
+    logger.info("Поиск транзакций по ключевому слову: %s", search_term)
     try:
-        data = pd.read_excel(file_path)
+        # Поиск идет по текстовому индексу: для набора он строится один раз (и хранится в кэше)
+        if dataset is not None:
+            filtered_data = dataset.search(search_term).frame
+        elif chunk_size is not None:
+            found = [
+                chunk.iloc[TextIndex.from_frame(chunk).search(search_term)]
+                for chunk in iter_transaction_chunks(file_path, chunk_size)
+            ]
+            filtered_data = pd.concat(found, ignore_index=True) if found else pd.DataFrame()
+        else:
+            data = load_transactions(file_path)
+            filtered_data = data.iloc[TextIndex.from_frame(data).search(search_term)]
+
+        # Найденные операции сериализуются напрямую из DataFrame, без списка словарей
+        if filtered_data.empty:
+            json_response = dumps([{"message": "Слово не найдено ни в одной категории"}], indent)
+        else:
+            json_response = frame_to_json(restore_source_format(filtered_data), indent)
+
+        if output_file is not None:
+            with open(output_file, "w", encoding="utf-8") as f:
+                f.write(json_response)
+            logger.info("Результаты поиска записаны в файл %s", output_file)
+        return json_response
 
-        data["Описание"] = data["Описание"].astype(str)
-        data["Категория"] = data["Категория"].astype(str)
+    except FileNotFoundError:
+        logger.error("Файл %s не найден.", file_path)
+        return json.dumps({"error": f"Файл {file_path} не найден."}, indent=4, ensure_ascii=False)
+    except Exception as e:
+        logger.error("Произошла ошибка: %s", e)
+        return json.dumps({"error": f"Произошла ошибка: {str(e)}"}, indent=4, ensure_ascii=False)
 
-        filtered_data = data[
-            data["Описание"].str.contains(search_term, case=False)
-            | data["Категория"].str.contains(search_term, case=False)
-        ]
 
-        transaction_list = filtered_data.to_dict(orient="records")
+def _operations_table(transactions: Union[Transactions, pd.DataFrame]) -> pd.DataFrame:
+    """Возвращает операции DataFrame; список словарей разбирается в таблицу один раз."""
+    if isinstance(transactions, TransactionDataset):
+        return transactions.frame
+    if isinstance(transactions, pd.DataFrame):
+        return transactions
+    return pd.DataFrame.from_records(transactions)
+
+
+def _period(year: int, month: Optional[int]) -> Tuple[datetime, datetime]:
+    """Возвращает границы [начало, конец) месяца или всего года, если месяц не задан."""
+    if month is None:
+        return datetime(year, 1, 1), datetime(year + 1, 1, 1)
+    return datetime(year, month, 1), datetime(year + month // 12, month % 12 + 1, 1)
+
+
+def _operation_dates(df: pd.DataFrame) -> pd.Series:
+    """Возвращает колонку 'Дата операции' в виде datetime."""
+    dates = df["Дата операции"]
+    if pd.api.types.is_datetime64_any_dtype(dates):
+        return dates
+    return pd.to_datetime(dates, format=OPERATION_DATE_FORMAT, errors="coerce")
+
+
+def _period_slice(transactions: Union[Transactions, pd.DataFrame], year: int, month: Optional[int]) -> pd.DataFrame:
+    """Возвращает операции месяца (или года) по дате операции."""
+    start, end = _period(year, month)
+    if isinstance(transactions, TransactionDataset):
+        return transactions.between(start, end).frame
+    df = _operations_table(transactions)
+    if df.empty:
+        return df
+    dates = _operation_dates(df)
+    return df[(dates >= start) & (dates < end)]
+
+
+@profiled
+def get_transactions_batch(
+    search_terms: List[str],
+    transactions: Frame,
+    category: Optional[str] = None,
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None,
+) -> Dict[str, List[Dict[str, Any]]]:
+    """
+    Ищет сразу несколько слов в описании или категории транзакций за один проход по данным.
+
+    Все слова проверяются одним автоматом Ахо — Корасик по словарю значений текстового индекса,
+    поэтому сотни запросов стоят примерно как один.
 
-        if not transaction_list:
-            transaction_list = [{"message": "Слово не найдено ни в одной категории"}]
+    Args:
+        search_terms: Слова для поиска.
+        transactions: DataFrame или TransactionDataset с транзакциями.
+        category: Необязательная категория (без учета регистра).
+        start_date: Необязательная дата начала периода по дате операции в формате 'YYYY-MM-DD'.
+        end_date: Необязательная дата конца периода (не включается) в формате 'YYYY-MM-DD'.
 
-        json_response = json.dumps(transaction_list, indent=4, ensure_ascii=False)
+    Returns:
+        Словарь слово -> список найденных транзакций в формате выгрузки.
+    """
+    logger.info("Пакетный поиск транзакций по %s словам", len(search_terms))
+    if isinstance(transactions, TransactionDataset):
+        df = transactions.frame
+        index = transactions.text_index()
+        categories = df[CATEGORY_COLUMN]
+    else:
+        df = transactions
+        index = TextIndex.from_frame(df)
+        categories = df["Категория"].astype(str).str.strip().str.lower()
+
+    # Фильтры по категории и дате считаются один раз маской и применяются ко всем словам
+    allowed = np.ones(len(df), dtype=bool)
+    if category is not None:
+        allowed &= (categories == str(category).strip().lower()).to_numpy()
+    if start_date or end_date:
+        dates = _operation_dates(df)
+        if start_date:
+            allowed &= (dates >= datetime.strptime(start_date, "%Y-%m-%d")).to_numpy()
+        if end_date:
+            allowed &= (dates < datetime.strptime(end_date, "%Y-%m-%d")).to_numpy()
+
+    found = {term: positions[allowed[positions]] for term, positions in index.search_many(search_terms).items()}
+
+    # Строки, найденные несколькими словами, переводятся в словари один раз
+    rows = np.unique(np.concatenate([np.array([], dtype=np.intp), *found.values()]))
+    records = restore_source_format(df.iloc[rows]).to_dict(orient="records")
+    result = {term: [records[i] for i in np.searchsorted(rows, positions)] for term, positions in found.items()}
+    logger.info("Пакетный поиск завершен, найдено транзакций: %s", len(rows))
+    return result
 
-        with open(output_file, "w", encoding="utf-8") as f:
-            f.write(json_response)
 
-        logger.info(f"Результаты поиска записаны в файл {output_file}")
-        return json_response
+@profiled
+def cashback_by_category(
+    transactions: Union[Transactions, pd.DataFrame],
+    year: int,
+    month: Optional[int] = None,
+    rates: Optional[Dict[str, float]] = None,
+    default_rate: float = DEFAULT_CASHBACK_RATE,
+) -> pd.DataFrame:
+    """
+    Считает расходы и возможный кешбэк по категориям за месяц (или по всем месяцам года).
 
-    except FileNotFoundError:
-        logger.error(f"Файл {file_path} не найден.")
-        return json.dumps({"error": f"Файл {file_path} не найден."}, indent=4, ensure_ascii=False)
-    except Exception as e:
-        logger.error(f"Произошла ошибка: {str(e)}")
-        return json.dumps({"error": f"Произошла ошибка: {str(e)}"}, indent=4, ensure_ascii=False)
+    Расходы — успешные операции с отрицательной суммой платежа; суммируются в копейках
+    одним группированием по паре «месяц × категория».
 
+    Args:
+        transactions: Транзакции (список словарей, DataFrame или TransactionDataset).
+        year: Год для расчета.
+        month: Месяц для расчета; None — все месяцы года.
+        rates: Ставки кешбэка по категориям (по умолчанию CASHBACK_RATES).
+        default_rate: Ставка для категорий, которых нет в rates.
 
-def beneficial_cashback_categories(year: int, month: int, transactions: List[Dict[str, Any]]) -> str:
+    Returns:
+        DataFrame с колонками month, category, spent, cashback; внутри месяца строки
+        упорядочены по убыванию кешбэка.
+    """
+    df = _period_slice(transactions, year, month)
+    if df.empty:
+        return pd.DataFrame(columns=["month", "category", "spent", "cashback"])
+
+    amounts = df["Сумма платежа"] if "Сумма платежа" in df.columns else df["Сумма операции"]
+    expense = (amounts < 0) & df["Категория"].notna()
+    if "Статус" in df.columns:
+        expense &= df["Статус"] == "OK"
+    rows = pd.DataFrame(
+        {
+            "month": _operation_dates(df).dt.month,
+            "category": df["Категория"].astype(object),
+            "spent": -to_kopecks(amounts),
+        }
+    )[expense]
+
+    grouped = rows.groupby(["month", "category"], sort=False)["spent"].sum().reset_index()
+    rate = grouped["category"].map(CASHBACK_RATES if rates is None else rates).fillna(default_rate)
+    grouped["spent"] = grouped["spent"] / 100
+    grouped["cashback"] = (grouped["spent"] * rate).round(2)
+    return grouped.sort_values(
+        ["month", "cashback", "category"], ascending=[True, False, True], kind="stable"
+    ).reset_index(drop=True)
+
+
+def _ranked_categories(rows: pd.DataFrame) -> Dict[str, Any]:
+    """Преобразует строки одного месяца в рейтинг категорий для JSON-ответа."""
+    return {
+        "categories": rows["category"].tolist(),
+        "cashback": {str(category): float(value) for category, value in zip(rows["category"], rows["cashback"])},
+    }
+
+
+@profiled
+def beneficial_cashback_categories(
+    year: int,
+    month: Optional[int],
+    transactions: Union[Transactions, pd.DataFrame],
+    rates: Optional[Dict[str, float]] = None,
+    default_rate: float = DEFAULT_CASHBACK_RATE,
+) -> str:
     """
     Функция для получения выгодных категорий повышенного кешбэка.
 
+    Категории ранжируются по возможному кешбэку: расходы в категории за месяц × ставка категории.
+
     Args:
         year: Год для расчета.
-        month: Месяц для расчета.
-        transactions: Список транзакций в формате списка словарей.
+        month: Месяц для расчета; None — рейтинг по каждому месяцу года.
+        transactions: Список транзакций в формате списка словарей, DataFrame или TransactionDataset.
+        rates: Ставки кешбэка по категориям (по умолчанию CASHBACK_RATES).
+        default_rate: Ставка для категорий, которых нет в rates.
 
     Returns:
         JSON-ответ с выгодными категориями.
     """
-    services_logger.debug(f"Запуск функции beneficial_cashback_categories с параметрами: year={year}, month={month}")
-    result = {"year": year, "month": month, "categories": ["category1", "category2", "category3"]}
-    services_logger.debug(f"Результат функции beneficial_cashback_categories: {result}")
-    return json.dumps(result)
+    services_logger.debug(
+        "Запуск функции beneficial_cashback_categories с параметрами: year=%s, month=%s", year, month
+    )
+    table = cashback_by_category(transactions, year, month, rates, default_rate)
+    result: Dict[str, Any]
+    if month is None:
+        result = {
+            "year": year,
+            "months": [
+                {"month": int(month_number), **_ranked_categories(rows)}
+                for month_number, rows in table.groupby("month", sort=True)
+            ],
+        }
+    else:
+        result = {"year": year, "month": month, **_ranked_categories(table)}
+    services_logger.debug("Результат функции beneficial_cashback_categories: %s", Payload(result))
+    return json.dumps(result, ensure_ascii=False)
+
+
+@profiled
+def piggy_bank_savings(
+    transactions: Union[Transactions, pd.DataFrame],
+    rounding_limits: Sequence[float],
+    month: Optional[int] = None,
+    year: Optional[int] = None,
+) -> pd.DataFrame:
+    """
+    Считает суммы «Инвесткопилки» по месяцам сразу для нескольких лимитов округления.
 
+    Каждый расход округляется вверх до кратного лимиту: ceil(amount / limit) * limit - amount.
+    Расчет идет в целых копейках матрицей «операции × лимиты», поэтому результат точен
+    и не зависит от числа лимитов и месяцев.
 
-def invest_piggy_bank(month: int, transactions: List[Dict[str, Any]], rounding_limit: float) -> str:
+    Args:
+        transactions: Транзакции (список словарей, DataFrame или TransactionDataset).
+        rounding_limits: Лимиты округления в рублях, например [10, 50, 100].
+        month: Номер месяца; None — все месяцы. Задается только вместе с year.
+        year: Год; None — все годы.
+
+    Returns:
+        DataFrame: строки — месяцы 'YYYY-MM', колонки — лимиты, значения — отложенная сумма в рублях.
+    """
+    limits = np.rint(np.asarray(rounding_limits, dtype=float) * 100).astype(np.int64)
+    if (limits <= 0).any():
+        raise ValueError("Лимит округления должен быть положительным")
+    if month is not None and year is None:
+        raise ValueError("Для расчета по месяцу нужно указать год")
+
+    df = _period_slice(transactions, year, month) if year is not None else _operations_table(transactions)
+    if df.empty:
+        return pd.DataFrame(columns=list(rounding_limits), dtype=float)
+    dates = _operation_dates(df)
+    amounts = df["Сумма платежа"] if "Сумма платежа" in df.columns else df["Сумма операции"]
+    expense = (amounts < 0) & dates.notna()
+    if "Статус" in df.columns:
+        expense &= df["Статус"] == "OK"
+
+    spent = -to_kopecks(amounts[expense])
+    # ceil(k / L) * L - k == (-k) mod L для целых k >= 0 и L > 0
+    roundups = np.mod(-spent[:, None], limits[None, :])
+    periods = format_dates(dates[expense], "%Y-%m").to_numpy()
+    savings = pd.DataFrame(roundups, columns=list(rounding_limits)).groupby(periods, sort=True).sum()
+    return savings / 100
+
+
+@profiled
+def invest_piggy_bank(
+    month: Optional[int],
+    transactions: Union[Transactions, pd.DataFrame],
+    rounding_limit: Union[float, Sequence[float]],
+    year: Optional[int] = None,
+) -> str:
     """
     Функция для сервиса «Инвесткопилка».
 
     Args:
-        month: Месяц для расчета.
-        transactions: Список транзакций в формате списка словарей.
-        rounding_limit: Лимит округления.
+        month: Месяц для расчета; None — все месяцы. Задается только вместе с year.
+        transactions: Список транзакций в формате списка словарей, DataFrame или TransactionDataset.
+        rounding_limit: Лимит округления (10, 50, 100) или список лимитов для сравнения.
+        year: Год для расчета; None — все годы.
 
     Returns:
         JSON-ответ с результатами расчета.
     """
     services_logger.debug(
-        f"Запуск функции invest_piggy_bank с параметрами: month={month}, rounding_limit={rounding_limit}"
+        "Запуск функции invest_piggy_bank с параметрами: month=%s, rounding_limit=%s", month, rounding_limit
     )
-    result = {"month": month, "rounding_limit": rounding_limit, "saved_amount": 1234.56}
-    services_logger.debug(f"Результат функции invest_piggy_bank: {result}")
+    limits = [rounding_limit] if isinstance(rounding_limit, (int, float)) else list(rounding_limit)
+    savings = piggy_bank_savings(transactions, limits, month, year)
+    totals = savings.sum()
+
+    result: Dict[str, Any]
+    if isinstance(rounding_limit, (int, float)) and month is not None:
+        result = {"month": month, "rounding_limit": rounding_limit, "saved_amount": round(float(totals[limits[0]]), 2)}
+    else:
+        result = {
+            "month": month,
+            "rounding_limits": limits,
+            "saved_amount": {str(limit): round(float(totals[limit]), 2) for limit in limits},
+            "by_month": {
+                str(period): {str(limit): round(float(value), 2) for limit, value in zip(limits, row)}
+                for period, row in zip(savings.index, savings.to_numpy())
+            },
+        }
+    services_logger.debug("Результат функции invest_piggy_bank: %s", Payload(result))
     return json.dumps(result)
 
 
-def simple_search(query: str, transactions: List[Dict[str, Any]]) -> str:
+@profiled
+def simple_search(query: str, transactions: Transactions) -> str:
     """
-    Функция для сервиса «Простой поиск».
+    Функция для сервиса «Простой поиск» (без учета регистра, 'ё' и 'е' не различаются).
 
     Args:
         query: Запрос для поиска.
@@ -122,13 +386,58 @@ def simple_search(query: str, transactions: List[Dict[str, Any]]) -> str:
     Returns:
         JSON-ответ с отфильтрованными транзакциями.
     """
-    services_logger.debug(f"Запуск функции simple_search с параметром: query={query}")
-    filtered_transactions = [t for t in transactions if query.lower() in t.get("Описание", "").lower()]
-    services_logger.debug(f"Результат функции simple_search: {filtered_transactions}")
-    return json.dumps(filtered_transactions)
+    services_logger.debug("Запуск функции simple_search с параметром: query=%s", query)
+    if isinstance(transactions, TransactionDataset):
+        records = transactions.records()
+        positions = transactions.text_index().search(query, ["Описание"])
+        filtered_transactions = [records[position] for position in positions]
+    else:
+        normalized_query = normalize_text(query)
+        filtered_transactions = [
+            t for t in transactions if normalized_query in normalize_text(str(t.get("Описание") or ""))
+        ]
+    services_logger.debug("Результат функции simple_search: %s", Payload(filtered_transactions))
+    return dumps(filtered_transactions, ensure_ascii=True)
+
+
+@profiled
+def tagged_transactions(
+    tag: str, transactions: Transactions, classifier: Optional[TransactionClassifier] = None
+) -> List[Dict[str, Any]]:
+    """
+    Возвращает транзакции, отмеченные тегом классификатора (см. src.classifier.DETECTORS).
+
+    Для TransactionDataset теги вычисляются один раз и переиспользуются всеми сервисами,
+    для списка словарей описания классифицируются за один проход.
+    """
+    classifier = classifier or TransactionClassifier()
+    if isinstance(transactions, TransactionDataset):
+        records = transactions.records()
+        return [records[i] for i in np.flatnonzero(classifier.mask(transactions.tags(classifier), tag))]
+    descriptions = pd.Series([t.get("Описание", t.get("description")) for t in transactions], dtype=object)
+    return [transactions[i] for i in np.flatnonzero(classifier.mask(classifier.classify(descriptions), tag))]
 
 
-def phone_number_search(transactions: List[Dict[str, Any]]) -> str:
+@profiled
+def search_by_tag(tag: str, transactions: Transactions) -> str:
+    """
+    Функция для сервиса «Поиск по типу операции» (телефон, перевод, снятие наличных и т.д.).
+
+    Args:
+        tag: Тег классификатора, например 'card_to_card', 'sbp', 'atm' или 'subscription'.
+        transactions: Список транзакций в формате списка словарей или TransactionDataset.
+
+    Returns:
+        JSON-ответ с транзакциями, отмеченными тегом.
+    """
+    services_logger.debug("Запуск функции search_by_tag с параметром: tag=%s", tag)
+    found = tagged_transactions(tag, transactions)
+    services_logger.debug("Найдено транзакций с тегом %s: %s", tag, len(found))
+    return dumps(found, ensure_ascii=True)
+
+
+@profiled
+def phone_number_search(transactions: Transactions) -> str:
     """
     Функция для сервиса «Поиск по телефонным номерам».
 
@@ -139,13 +448,13 @@ def phone_number_search(transactions: List[Dict[str, Any]]) -> str:
         JSON-ответ с транзакциями, содержащими телефонные номера.
     """
     services_logger.debug("Запуск функции phone_number_search")
-    phone_pattern = re.compile(r"\+?\d{11,15}")
-    phone_transactions = [t for t in transactions if phone_pattern.search(t.get("description", ""))]
-    services_logger.debug(f"Результат функции phone_number_search: {phone_transactions}")
-    return json.dumps(phone_transactions)
+    phone_transactions = tagged_transactions("phone", transactions)
+    services_logger.debug("Результат функции phone_number_search: %s", Payload(phone_transactions))
+    return dumps(phone_transactions, ensure_ascii=True)
 
 
-def person_to_person_search(transactions: List[Dict[str, Any]]) -> str:
+@profiled
+def person_to_person_search(transactions: Transactions) -> str:
     """
     Функция для сервиса «Поиск переводов физическим лицам».
 
@@ -156,18 +465,18 @@ def person_to_person_search(transactions: List[Dict[str, Any]]) -> str:
         JSON-ответ с транзакциями, содержащими переводы физическим лицам.
     """
     services_logger.debug("Запуск функции person_to_person_search")
-    person_pattern = re.compile(r"\bперевод физическому лицу\b", re.IGNORECASE)
-    person_transactions = [t for t in transactions if person_pattern.search(t.get("description", ""))]
-    services_logger.debug(f"Результат функции person_to_person_search: {person_transactions}")
-    return json.dumps(person_transactions)
+    person_transactions = tagged_transactions("person_to_person", transactions)
+    services_logger.debug("Результат функции person_to_person_search: %s", Payload(person_transactions))
+    return dumps(person_transactions, ensure_ascii=True)
 
 
-def get_expenses(transactions: pd.DataFrame, category: str, report_date: Optional[str] = None) -> str:
+@profiled
+def get_expenses(transactions: Frame, category: str, report_date: Optional[str] = None) -> str:
     """
     Вычисляет траты по категории за последние 3 месяца от указанной даты.
 
     Args:
-        transactions: DataFrame с транзакциями.
+        transactions: DataFrame или TransactionDataset с транзакциями.
         category: Категория для расчета.
         report_date: Дата, от которой отсчитывать 3 месяца.
 
@@ -176,35 +485,33 @@ def get_expenses(transactions: pd.DataFrame, category: str, report_date: Optiona
     """
     report_date_dt = datetime.strptime(report_date, "%Y-%m-%d") if report_date else datetime.now()
 
-    # Преобразуем столбец с датой к типу datetime
-    transactions["Дата платежа"] = pd.to_datetime(transactions["Дата платежа"], format="%d.%m.%Y")
-
-    # Приведем категории к нижнему регистру и уберем пробелы по краям
-    transactions["Категория"] = transactions["Категория"].astype(str).str.strip().str.lower()
+    # Приведем категории к нижнему регистру и уберем пробелы по краям (в TransactionDataset колонка уже есть)
+    if not isinstance(transactions, TransactionDataset) and CATEGORY_COLUMN not in transactions.columns:
+        transactions = transactions.assign(
+            **{CATEGORY_COLUMN: transactions["Категория"].astype(str).str.strip().str.lower()}
+        )
     category = str(category).strip().lower()
+    start_date = report_date_dt - pd.DateOffset(months=3)
 
-    logger.info(
-        f"Расчет трат по категории: {category} за период {report_date_dt - pd.DateOffset(months=3)}--{report_date_dt}"
-    )
-
-    # Отфильтруем транзакции по категории и дате
-    filtered_transactions = transactions[
-        (transactions["Категория"] == category)
-        & (transactions["Дата платежа"] >= report_date_dt - pd.DateOffset(months=3))
-        & (transactions["Дата платежа"] <= report_date_dt)
-    ]
+    logger.info("Расчет трат по категории: %s за период %s--%s", category, start_date, report_date_dt)
 
-    # Выводим отфильтрованные транзакции для отладки
-    logger.debug(f"Отфильтрованные транзакции: {filtered_transactions}")
+    # Для TransactionDataset сумма берется из куба расходов, для DataFrame — из отфильтрованных транзакций
+    if isinstance(transactions, TransactionDataset):
+        cube = transactions.cube()
+        found = cube.summary(start_date, report_date_dt, category, case_insensitive=True)["count"]
+        total_expenses = cube.total(start_date, report_date_dt, category, "payment_sum", case_insensitive=True)
+    else:
+        filtered_transactions = payment_window(
+            transactions, start_date, report_date_dt, category, category_column=CATEGORY_COLUMN
+        )
+        found = len(filtered_transactions)
+        total_expenses = filtered_transactions["Сумма платежа"].sum()
 
     # Проверим количество отфильтрованных транзакций
-    if filtered_transactions.empty:
-        logger.warning(f"Не найдено транзакций по категории '{category}' за указанный период.")
+    if not found:
+        logger.warning("Не найдено транзакций по категории '%s' за указанный период.", category)
     else:
-        logger.info(f"Найдено {len(filtered_transactions)} транзакций по категории '{category}' за указанный период.")
-
-    # Вычислим общую сумму трат по отфильтрованным транзакциям
-    total_expenses = filtered_transactions["Сумма платежа"].sum()
+        logger.info("Найдено %s транзакций по категории '%s' за указанный период.", found, category)
 
     # Преобразуем total_expenses к типу int
     total_expenses = int(total_expenses)
@@ -214,26 +521,28 @@ def get_expenses(transactions: pd.DataFrame, category: str, report_date: Optiona
         indent=4,
         ensure_ascii=False,
     )
-    logger.info(f"Результаты расчета: {result}")
+    logger.info("Результаты расчета: %s", result)
     return result
 
 
-def main_services() -> None:
+@profiled
+def main_services(dataset: Optional[TransactionDataset] = None) -> None:
     """
     Основная функция модуля, которая объединяет взаимодействие пользователя и функций.
     """
+    if dataset is None:
+        dataset = TransactionDataset.from_file(OPERATIONS_FILE)
+
     print("Введите слово для поиска. Например: Такси")
     search_term = input().strip()
-    json_result = get_transactions(search_term)
+    json_result = get_transactions(search_term, dataset=dataset)
     print(json_result)
 
-    transactions_df = read_xlsx("../data/operations.xls")
-
     print("Введите слово для поиска. Например: Супермаркет")
     category_to_check = input().strip()
     print("Введите дату для поиска. Например: 2021-12-31")
     report_date_to_check = input().strip()
-    json_expenses_result = get_expenses(transactions_df, category_to_check, report_date_to_check)
+    json_expenses_result = get_expenses(dataset, category_to_check, report_date_to_check)
     print(json_expenses_result)
 
 
@@ -0,0 +1,371 @@
+import argparse
+import os
+import sys
+from typing import Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from logging_config import get_logger
+from src.cache import FrameWriter, cache_path_for, file_fingerprint
+from src.dataset import restore_source_format
+from src.schema import CATEGORICAL_COLUMNS
+
+logger = get_logger(__name__)
+
+# Колонки выгрузки банка в порядке файла operations.xls
+OPERATION_COLUMNS = [
+    "Дата операции",
+    "Дата платежа",
+    "Номер карты",
+    "Статус",
+    "Сумма операции",
+    "Валюта операции",
+    "Сумма платежа",
+    "Валюта платежа",
+    "Кэшбэк",
+    "Категория",
+    "MCC",
+    "Описание",
+    "Бонусы (включая кэшбэк)",
+    "Округление на инвесткопилку",
+    "Сумма операции с округлением",
+]
+
+# Торговые точки и источники поступлений: категория, MCC, описание, типичная сумма и доля операций
+# (распределение по data/operations.xls)
+MERCHANTS: List[Tuple[str, Optional[int], str, float, float]] = [
+    ("Супермаркеты", 5411, "Колхоз", 160.0, 0.10),
+    ("Супермаркеты", 5411, "Магнит", 150.0, 0.10),
+    ("Супермаркеты", 5411, "SPAR", 250.0, 0.055),
+    ("Супермаркеты", 5499, "Перекрёсток", 400.0, 0.03),
+    ("Супермаркеты", 5411, "Дикси", 200.0, 0.02),
+    ("Супермаркеты", 5499, "Улыбка радуги", 300.0, 0.01),
+    ("Фастфуд", 5814, "McDonald's", 300.0, 0.045),
+    ("Фастфуд", 5814, "Rumyanyj Khleb", 120.0, 0.045),
+    ("Фастфуд", 5814, "Бургер Кинг", 350.0, 0.035),
+    ("Фастфуд", 5814, "Kofe s sobojj", 150.0, 0.045),
+    ("Фастфуд", 5814, "Pingvin Kofe I Chaj", 180.0, 0.02),
+    ("Такси", 4121, "Яндекс Такси", 350.0, 0.035),
+    ("Местный транспорт", 4111, "Метро Санкт-Петербург", 55.0, 0.035),
+    ("Каршеринг", 7512, "Ситидрайв", 400.0, 0.02),
+    ("Ж/д билеты", 4112, "РЖД", 1800.0, 0.025),
+    ("Связь", 4814, "МТС", 500.0, 0.02),
+    ("Аптеки", 5912, "Аптека Вита", 450.0, 0.02),
+    ("Аптеки", 5912, "Apteka 7", 350.0, 0.01),
+    ("Различные товары", 5399, "Ozon.ru", 1200.0, 0.03),
+    ("Топливо", 5541, "Circle K", 1500.0, 0.015),
+    ("Одежда и обувь", 5651, "Familia", 2500.0, 0.015),
+    ("Развлечения", 7941, "Кинотеатр Аврора", 600.0, 0.01),
+    ("Дом и ремонт", 5200, "Леруа Мерлен", 2000.0, 0.015),
+    ("Косметика", 5977, "Золотое Яблоко", 1500.0, 0.008),
+    ("Медицина", 8042, "Клиника Скандинавия", 3000.0, 0.005),
+    ("Госуслуги", 9402, "Госуслуги", 650.0, 0.003),
+    ("Цифровые товары", 5818, "Яндекс Плюс", 299.0, 0.008),
+    ("Сервис", 7311, "Плата за оповещения об операциях", 59.0, 0.008),
+    ("Переводы", 6012, "Перевод с карты", 3000.0, 0.03),
+    ("Переводы", None, "Перевод Кредитная карта. ТП 10.2 RUR", 5000.0, 0.018),
+    ("Наличные", 6011, "Снятие в банкомате Сбербанк", 5000.0, 0.01),
+    ("Пополнения", 6012, "Пополнение счета", 10000.0, 0.025),
+    ("Пополнения", None, "Пополнение через Сбербанк", 5000.0, 0.005),
+    ("Бонусы", None, "Кэшбэк за обычные покупки", 300.0, 0.01),
+    ("Бонусы", None, "Проценты на остаток", 150.0, 0.005),
+    ("Зарплата", None, "Зарплата", 60000.0, 0.002),
+]
+# Категории поступлений: сумма операции положительная
+INCOME_CATEGORIES = ["Пополнения", "Бонусы", "Зарплата"]
+# Номера карт и их доли; None — операции без карты (переводы и платежи по счету)
+CARDS: List[Tuple[Optional[str], float]] = [
+    ("*7197", 0.72),
+    ("*4556", 0.17),
+    ("*5091", 0.008),
+    ("*5441", 0.002),
+    (None, 0.1),
+]
+# Операции за границей: валюта, курс к рублю и доля среди трат
+FOREIGN_CURRENCIES: List[Tuple[str, float, float]] = [("TRY", 7.5, 0.011), ("EUR", 85.0, 0.004), ("USD", 75.0, 0.002)]
+# Оплата мобильной связи по номеру телефона и переводы физическим лицам (без карты и MCC)
+PHONE_OPERATORS = ["МТС", "Билайн", "МегаФон", "Tele2", "Тинькофф Мобайл"]
+PHONE_AMOUNTS = [100.0, 200.0, 300.0, 400.0, 500.0]
+PHONE_SHARE = 0.005
+PERSON_NAMES = ["Иван", "Сергей", "Артем", "Константин", "Николай", "Анна", "Мария", "Екатерина", "Ольга", "Дмитрий"]
+PERSON_INITIALS = "АБВГДЕЗИКЛМНОПРСТУФХЧШЭЮЯ"
+PERSON_TO_PERSON_SHARE = 0.01
+# Доли особых операций среди трат по карте
+REFUND_SHARE = 0.01
+FAILED_SHARE = 0.006
+CASHBACK_SHARE = 0.1
+CASHBACK_RATE = 0.05
+ROUNDING_SHARE = 0.01
+ROUNDING_LIMITS = [10, 50, 100]
+# Списание по операции: в тот же день или через 1-3 дня
+PAYMENT_DELAY_SHARES = [0.35, 0.45, 0.15, 0.05]
+# Разброс сумм вокруг типичной (сигма логнормального распределения)
+AMOUNT_SIGMA = 0.8
+START_DATE = "2018-01-01"
+END_DATE = "2022-01-01"
+CHUNK_SIZE = 100_000
+STATEMENT_FORMATS = (".csv", ".xlsx", ".npz")
+
+
+def _weights(values: Sequence[float]) -> np.ndarray:
+    weights = np.asarray(values, dtype=float)
+    normalized: np.ndarray = weights / weights.sum()
+    return normalized
+
+
+def _phone_descriptions(rng: np.random.Generator, size: int) -> np.ndarray:
+    """Возвращает описания оплаты связи с номером телефона: 'МТС +7 921 111-22-33'."""
+    operators = rng.choice(PHONE_OPERATORS, size)
+    digits = rng.integers(0, [100, 1000, 100, 100], (size, 4))
+    return np.array(
+        [f"{operator} +7 9{a:02d} {b:03d}-{c:02d}-{d:02d}" for operator, (a, b, c, d) in zip(operators, digits)],
+        dtype=object,
+    )
+
+
+def _person_names(rng: np.random.Generator, size: int) -> np.ndarray:
+    """Возвращает получателей переводов физическим лицам: 'Иван С.'."""
+    names = rng.choice(PERSON_NAMES, size).astype(object)
+    initials = rng.choice(list(PERSON_INITIALS), size).astype(object)
+    result: np.ndarray = names + " " + initials + "."
+    return result
+
+
+def _generate_chunk(rng: np.random.Generator, rows: int, start: pd.Timestamp, end: pd.Timestamp) -> pd.DataFrame:
+    """Генерирует rows операций между start и end по убыванию даты."""
+    span = max(1, int((end - start).total_seconds()))
+    operation_dates = start + pd.to_timedelta(np.sort(rng.integers(0, span, rows))[::-1], unit="s")
+    delay = rng.choice(len(PAYMENT_DELAY_SHARES), rows, p=_weights(PAYMENT_DELAY_SHARES))
+    payment_dates = (operation_dates + pd.to_timedelta(delay, unit="D")).normalize()
+
+    merchant = rng.choice(len(MERCHANTS), rows, p=_weights([m[4] for m in MERCHANTS]))
+    table = list(zip(*MERCHANTS))
+    categories = np.array(table[0], dtype=object)[merchant]
+    mcc = np.array([np.nan if code is None else code for code in table[1]], dtype=float)[merchant]
+    descriptions = np.array(table[2], dtype=object)[merchant]
+    magnitude = np.round(np.array(table[3])[merchant] * rng.lognormal(0.0, AMOUNT_SIGMA, rows), 2)
+    cards = np.array([card for card, _ in CARDS], dtype=object)[
+        rng.choice(len(CARDS), rows, p=_weights([share for _, share in CARDS]))
+    ]
+
+    kind = rng.random(rows)
+    phone = kind < PHONE_SHARE
+    person = (kind >= PHONE_SHARE) & (kind < PHONE_SHARE + PERSON_TO_PERSON_SHARE)
+    categories[phone] = "Мобильная связь"
+    descriptions[phone] = _phone_descriptions(rng, int(phone.sum()))
+    magnitude[phone] = rng.choice(PHONE_AMOUNTS, int(phone.sum()))
+    categories[person] = "Переводы"
+    descriptions[person] = _person_names(rng, int(person.sum()))
+    magnitude[person] = np.maximum(100.0, np.round(rng.lognormal(np.log(3000), 1.0, int(person.sum())), -2))
+    mcc[phone | person] = np.nan
+    cards[phone | person] = None
+
+    income = np.isin(categories, INCOME_CATEGORIES)
+    purchase = ~income & ~phone & ~person & ~np.isin(categories, ["Переводы", "Наличные"])
+    refund = purchase & (rng.random(rows) < REFUND_SHARE)
+    failed = rng.random(rows) < FAILED_SHARE
+    payment = np.where(income | refund, magnitude, -magnitude)
+
+    # Траты за границей: сумма операции в валюте, списание в рублях по курсу
+    operation_amount = payment.copy()
+    operation_currency = np.full(rows, "RUB", dtype=object)
+    currency_draw = rng.random(rows)
+    threshold = 0.0
+    for currency, rate, share in FOREIGN_CURRENCIES:
+        foreign = purchase & ~refund & (currency_draw >= threshold) & (currency_draw < threshold + share)
+        operation_currency[foreign] = currency
+        operation_amount[foreign] = np.round(payment[foreign] / rate, 2)
+        threshold += share
+
+    # Бонусы: 1 за каждые 50 рублей трат; при повышенном кэшбэке бонусы равны кэшбэку, возврат их списывает
+    spent = (payment < 0) & ~failed
+    bonuses = np.where(spent, magnitude // 50, 0.0)
+    with_cashback = spent & purchase & ~np.isnan(mcc) & (rng.random(rows) < CASHBACK_SHARE)
+    cashback = np.where(with_cashback, np.maximum(1.0, np.round(magnitude * CASHBACK_RATE)), np.nan)
+    bonuses = np.where(with_cashback, cashback, bonuses)
+    bonuses = np.where(refund & ~failed, -(magnitude // 50), bonuses)
+
+    # Инвесткопилка: трата округляется вверх до лимита, разница откладывается
+    rounded = spent & purchase & (rng.random(rows) < ROUNDING_SHARE)
+    limits = rng.choice(ROUNDING_LIMITS, rows)
+    rounding = np.where(rounded, np.ceil(magnitude / limits) * limits - magnitude, 0.0)
+
+    df = pd.DataFrame(
+        {
+            "Дата операции": operation_dates,
+            "Дата платежа": payment_dates,
+            "Номер карты": cards,
+            "Статус": np.where(failed, "FAILED", "OK").astype(object),
+            "Сумма операции": operation_amount,
+            "Валюта операции": operation_currency,
+            "Сумма платежа": payment,
+            "Валюта платежа": "RUB",
+            "Кэшбэк": cashback,
+            "Категория": categories,
+            "MCC": mcc,
+            "Описание": descriptions,
+            "Бонусы (включая кэшбэк)": bonuses.astype(np.int64),
+            "Округление на инвесткопилку": np.round(rounding).astype(np.int64),
+            "Сумма операции с округлением": np.round(magnitude + rounding, 2),
+        },
+        columns=OPERATION_COLUMNS,
+    )
+    return df.astype({column: "category" for column in CATEGORICAL_COLUMNS})
+
+
+def iter_operations(
+    rows: int, chunk_size: int = CHUNK_SIZE, seed: int = 0, start: str = START_DATE, end: str = END_DATE
+) -> Iterator[pd.DataFrame]:
+    """
+    Генерирует выгрузку операций потоком чанков по chunk_size строк (см. generate_operations).
+
+    Чанки идут по убыванию даты и покрывают последовательные отрезки периода, поэтому их
+    конкатенация — одна выгрузка. Каждый чанк генерируется независимо от остальных по (seed, номер
+    чанка); при chunk_size >= rows единственный чанк совпадает с generate_operations.
+    """
+    if chunk_size <= 0:
+        raise ValueError("chunk_size должен быть положительным")
+    start_ts, end_ts = pd.Timestamp(start), pd.Timestamp(end)
+    period = end_ts - start_ts
+    for index, offset in enumerate(range(0, rows, chunk_size)):
+        size = min(chunk_size, rows - offset)
+        chunk_end = end_ts - period * (offset / rows)
+        chunk_start = end_ts - period * ((offset + size) / rows)
+        yield _generate_chunk(np.random.default_rng([seed, index]), size, chunk_start, chunk_end)
+
+
+def generate_operations(rows: int, seed: int = 0, start: str = START_DATE, end: str = END_DATE) -> pd.DataFrame:
+    """
+    Генерирует выгрузку операций в схеме data/operations.xls (колонки OPERATION_COLUMNS).
+
+    Распределения повторяют реальную выгрузку: несколько карт и операции без карты, категории
+    с MCC, траты в валюте, кэшбэк и бонусы, неуспешные операции, возвраты, поступления,
+    оплата связи по номеру телефона и переводы физическим лицам, округления в инвесткопилку.
+    Строки идут по убыванию даты операции. Даты — datetime, текстовые колонки — категориальные
+    (как после normalize_frame), поэтому TransactionDataset принимает результат без разбора строк.
+
+    Args:
+        rows: Количество операций.
+        seed: Зерно генератора; при одинаковых аргументах результат одинаковый.
+        start: Начало периода операций.
+        end: Конец периода операций (не включая).
+
+    Returns:
+        DataFrame с операциями.
+    """
+    return _generate_chunk(np.random.default_rng([seed, 0]), rows, pd.Timestamp(start), pd.Timestamp(end))
+
+
+def _write_xlsx(path: str, chunks: Iterator[pd.DataFrame]) -> None:
+    """Записывает чанки на лист .xlsx в потоковом режиме openpyxl (write-only)."""
+    try:
+        import openpyxl
+    except ImportError as e:
+        raise ImportError("Для записи .xlsx нужна необязательная зависимость openpyxl") from e
+
+    workbook = openpyxl.Workbook(write_only=True)
+    sheet = workbook.create_sheet()
+    sheet.append(OPERATION_COLUMNS)
+    for chunk in chunks:
+        for row in chunk.astype(object).where(chunk.notna(), None).itertuples(index=False, name=None):
+            sheet.append(row)
+    workbook.save(path)
+
+
+def write_statement(
+    path: str,
+    rows: int,
+    seed: int = 0,
+    chunk_size: int = CHUNK_SIZE,
+    start: str = START_DATE,
+    end: str = END_DATE,
+    cache: bool = False,
+    cache_dir: Optional[str] = None,
+) -> int:
+    """
+    Записывает синтетическую выгрузку в файл потоком: в памяти только текущий чанк.
+
+    Формат определяется расширением: .csv, .xlsx (нужен openpyxl) или .npz — колоночный формат
+    кэша (читается src.cache.load_frame). Даты записываются строками, как в выгрузке банка.
+
+    Args:
+        path: Путь к файлу.
+        rows: Количество операций.
+        seed: Зерно генератора.
+        chunk_size: Размер чанка.
+        start: Начало периода операций.
+        end: Конец периода операций.
+        cache: Для .csv и .xlsx сразу записать и колоночный кэш файла, чтобы load_transactions
+            и TransactionDataset.from_file не разбирали его при первой загрузке.
+        cache_dir: Каталог кэша (по умолчанию — как у load_transactions).
+
+    Returns:
+        Количество записанных операций.
+    """
+    extension = os.path.splitext(path)[1].lower()
+    if rows <= 0:
+        raise ValueError("rows должен быть положительным")
+    if extension not in STATEMENT_FORMATS:
+        raise ValueError(f"Неподдерживаемый формат выгрузки {extension}: ожидается один из {STATEMENT_FORMATS}")
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+
+    writers: List[FrameWriter] = []
+    if extension == ".npz":
+        writers.append(FrameWriter(path, {"synthetic": {"rows": rows, "seed": seed}}))
+    elif cache:
+        writers.append(FrameWriter(cache_path_for(path, cache_dir)))
+
+    def source_chunks() -> Iterator[pd.DataFrame]:
+        for chunk in iter_operations(rows, chunk_size, seed, start, end):
+            # Категории становятся строками: в файле и в кэше выгрузки они хранятся как текст
+            formatted = restore_source_format(chunk).astype({column: object for column in CATEGORICAL_COLUMNS})
+            for writer in writers:
+                writer.write(formatted)
+            yield formatted
+
+    try:
+        if extension == ".csv":
+            for index, chunk in enumerate(source_chunks()):
+                chunk.to_csv(path, mode="w" if index == 0 else "a", header=index == 0, index=False)
+        elif extension == ".xlsx":
+            _write_xlsx(path, source_chunks())
+        else:
+            for _ in source_chunks():
+                pass
+    except BaseException:
+        for writer in writers:
+            writer.discard()
+        raise
+
+    for writer in writers:
+        if writer.path != path:
+            # Кэш привязан к отпечатку только что записанного файла (см. load_transactions)
+            writer.meta["source"] = file_fingerprint(path)
+        writer.close()
+    logger.info("Синтетическая выгрузка %s: %s операций", path, rows)
+    return rows
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    """
+    Генерирует выгрузку из командной строки (из каталога src, как main.py):
+
+        python synthetic.py ../data/synthetic_1m.csv --rows 1000000 --cache
+    """
+    parser = argparse.ArgumentParser(description="Синтетическая выгрузка операций в схеме operations.xls")
+    parser.add_argument("path", help="файл выгрузки: .csv, .xlsx или .npz")
+    parser.add_argument("--rows", type=int, default=CHUNK_SIZE)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE)
+    parser.add_argument("--start", default=START_DATE)
+    parser.add_argument("--end", default=END_DATE)
+    parser.add_argument("--cache", action="store_true", help="сразу записать колоночный кэш файла")
+    args = parser.parse_args(argv)
+    write_statement(args.path, args.rows, args.seed, args.chunk_size, args.start, args.end, args.cache)
+    print(f"Записано {args.rows} операций в {args.path}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,303 @@
+import re
+from collections import deque
+from typing import Dict, Iterable, List, Optional, Set
+
+import numpy as np
+import pandas as pd
+
+from logging_config import get_logger
+
+logger = get_logger(__name__)
+
+SEARCH_COLUMNS = ["Описание", "Категория"]
+VALUE_COLUMN = "value"
+# Списки вхождений хранятся плоской таблицей (терм, код значения), строки одного терма идут подряд
+TERM_COLUMN = "term"
+VALUE_ID_COLUMN = "value_id"
+POSTINGS = ["tokens", "trigrams"]
+TOKEN_PATTERN = re.compile(r"\w+")
+
+
+def normalize_text(text: str) -> str:
+    """Приводит строку к виду для поиска: без учета регистра, 'ё' равна 'е'."""
+    return text.casefold().replace("ё", "е")
+
+
+def trigrams(text: str) -> Set[str]:
+    """Возвращает множество триграмм нормализованной строки."""
+    return {text[i : i + 3] for i in range(len(text) - 2)}
+
+
+def tokens(text: str) -> List[str]:
+    """Возвращает слова нормализованной строки."""
+    return TOKEN_PATTERN.findall(text)
+
+
+def _intersect(postings: Iterable[Optional[Set[int]]]) -> Set[int]:
+    """Пересекает списки вхождений, начиная с самого короткого (None — терм не встречается)."""
+    sets = list(postings)
+    if not sets or any(items is None for items in sets):
+        return set()
+    ordered = sorted((items for items in sets if items is not None), key=len)
+    result = set(ordered[0])
+    for items in ordered[1:]:
+        result &= items
+        if not result:
+            break
+    return result
+
+
+def _postings_frame(postings: Dict[str, Set[int]]) -> pd.DataFrame:
+    """Раскладывает списки вхождений в таблицу (терм, код значения)."""
+    lengths = [len(items) for items in postings.values()]
+    return pd.DataFrame(
+        {
+            TERM_COLUMN: pd.Series(np.repeat(np.array(list(postings), dtype=object), lengths), dtype=object),
+            VALUE_ID_COLUMN: np.fromiter(
+                (value_id for items in postings.values() for value_id in items), dtype=np.int32, count=sum(lengths)
+            ),
+        }
+    )
+
+
+def _postings_from_frame(frame: pd.DataFrame) -> Dict[str, Set[int]]:
+    """Восстанавливает списки вхождений из таблицы _postings_frame без разбора значений на термы."""
+    terms = frame[TERM_COLUMN].to_numpy(dtype=object)
+    if not len(terms):
+        return {}
+    value_ids = frame[VALUE_ID_COLUMN].tolist()
+    starts = np.concatenate([[0], np.flatnonzero(terms[1:] != terms[:-1]) + 1]).tolist()
+    stops = starts[1:] + [len(terms)]
+    return {terms[start]: set(value_ids[start:stop]) for start, stop in zip(starts, stops)}
+
+
+class TermMatcher:
+    """
+    Автомат Ахо — Корасик для набора терминов: за один проход по строке находит все входящие в нее термины.
+
+    Термины нормализуются так же, как значения индекса.
+    """
+
+    def __init__(self, terms: Iterable[str]) -> None:
+        self.terms = [normalize_text(term) for term in terms]
+        self._goto: List[Dict[str, int]] = [{}]
+        self._output: List[Set[int]] = [set()]
+        for term_id, term in enumerate(self.terms):
+            state = 0
+            for char in term:
+                if char not in self._goto[state]:
+                    self._goto.append({})
+                    self._output.append(set())
+                    self._goto[state][char] = len(self._goto) - 1
+                state = self._goto[state][char]
+            self._output[state].add(term_id)
+
+        # Ссылки неудачи строятся обходом в ширину; выходы состояния дополняются выходами его ссылки
+        self._fail = [0] * len(self._goto)
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, target in self._goto[state].items():
+                fallback = self._fail[state]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                self._fail[target] = self._goto[fallback].get(char, 0)
+                self._output[target] |= self._output[self._fail[target]]
+                queue.append(target)
+
+    def find(self, text: str) -> Set[int]:
+        """Возвращает номера терминов, входящих в нормализованную строку text."""
+        found = set(self._output[0])
+        state = 0
+        for char in text:
+            while state and char not in self._goto[state]:
+                state = self._fail[state]
+            state = self._goto[state].get(char, 0)
+            found |= self._output[state]
+        return found
+
+
+class TextIndex:
+    """
+    Инвертированный индекс по текстовым колонкам операций (описание и категория).
+
+    Строки таблицы ссылаются на словарь уникальных нормализованных значений; по словарю
+    построены индекс слов (слово -> значения) и индекс триграмм для поиска подстроки.
+    Запрос проверяется только по значениям-кандидатам, а номера строк берутся из
+    отсортированных списков вхождений, поэтому время поиска не зависит от числа операций линейно.
+
+    Индексы слов и триграмм сохраняются вместе с таблицами кодов и значений (см. frames), поэтому
+    при загрузке из кэша значения заново не разбираются.
+    """
+
+    def __init__(
+        self, codes: pd.DataFrame, values: pd.DataFrame, postings: Optional[Dict[str, pd.DataFrame]] = None
+    ) -> None:
+        self.codes = codes
+        self.values: List[str] = values[VALUE_COLUMN].astype(str).tolist()
+        self._rows: Dict[str, Dict[str, np.ndarray]] = {}
+        if postings is not None and all(name in postings for name in POSTINGS):
+            self._ids: Dict[str, int] = {value: value_id for value_id, value in enumerate(self.values)}
+            self._tokens: Dict[str, Set[int]] = _postings_from_frame(postings["tokens"])
+            self._trigrams: Dict[str, Set[int]] = _postings_from_frame(postings["trigrams"])
+        else:
+            self._ids, self._tokens, self._trigrams = {}, {}, {}
+            for value_id, value in enumerate(self.values):
+                self._index_value(value_id, value)
+        logger.debug("Текстовый индекс: %s строк, %s уникальных значений", len(codes), len(self.values))
+
+    def _index_value(self, value_id: int, value: str) -> None:
+        """Добавляет значение словаря в индексы триграмм и слов."""
+        self._ids[value] = value_id
+        for trigram in trigrams(value):
+            self._trigrams.setdefault(trigram, set()).add(value_id)
+        for token in tokens(value):
+            self._tokens.setdefault(token, set()).add(value_id)
+
+    def _value_id(self, value: str) -> int:
+        """Возвращает код нормализованного значения, добавляя его в словарь при первом появлении."""
+        value_id = self._ids.get(value)
+        if value_id is None:
+            value_id = len(self.values)
+            self.values.append(value)
+            self._index_value(value_id, value)
+        return value_id
+
+    @classmethod
+    def build_frames(cls, df: pd.DataFrame, columns: Optional[List[str]] = None) -> Dict[str, pd.DataFrame]:
+        """
+        Строит таблицы индекса: коды значений по строкам ('codes'), словарь значений ('values')
+        и списки вхождений слов и триграмм ('tokens', 'trigrams').
+        """
+        tables = cls._table_frames(df, columns)
+        return cls(tables["codes"], tables["values"]).frames()
+
+    @staticmethod
+    def _table_frames(df: pd.DataFrame, columns: Optional[List[str]] = None) -> Dict[str, pd.DataFrame]:
+        """
+        Строит коды значений по строкам ('codes') и словарь значений ('values').
+
+        Нормализация выполняется один раз на уникальное значение, а не на строку.
+        """
+        columns = [column for column in (columns or SEARCH_COLUMNS) if column in df.columns]
+        raw = pd.Series(
+            np.concatenate([df[column].to_numpy(dtype=object) for column in columns]) if columns else [], dtype=object
+        )
+        raw_codes, uniques = pd.factorize(raw)
+        normalized_codes, values = pd.factorize(
+            pd.Series([normalize_text(str(value)) for value in uniques], dtype=object)
+        )
+        codes = np.where(raw_codes >= 0, normalized_codes[raw_codes] if len(uniques) else raw_codes, -1)
+        return {
+            "codes": pd.DataFrame(
+                {column: codes[i * len(df) : (i + 1) * len(df)].astype(np.int32) for i, column in enumerate(columns)}
+            ),
+            "values": pd.DataFrame({VALUE_COLUMN: pd.Series(values, dtype=object)}),
+        }
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame, columns: Optional[List[str]] = None) -> "TextIndex":
+        """Строит индекс по DataFrame с операциями."""
+        tables = cls._table_frames(df, columns)
+        return cls(tables["codes"], tables["values"])
+
+    def append(self, df: pd.DataFrame, prepend: bool = False) -> None:
+        """
+        Добавляет в индекс новые операции: нормализуются и индексируются только новые значения.
+
+        Args:
+            df: DataFrame с новыми операциями.
+            prepend: Новые строки стоят в наборе перед существующими (иначе — после).
+        """
+        delta: Dict[str, np.ndarray] = {}
+        for column in self.codes.columns:
+            if column not in df.columns:
+                delta[column] = np.full(len(df), -1, dtype=np.int32)
+                continue
+            raw_codes, uniques = pd.factorize(df[column])
+            # Код -1 (пропуск) указывает на последний элемент
+            mapped = np.array([self._value_id(normalize_text(str(value))) for value in uniques] + [-1], dtype=np.int32)
+            delta[column] = mapped[raw_codes]
+        parts = [pd.DataFrame(delta), self.codes]
+        self.codes = pd.concat(parts if prepend else parts[::-1], ignore_index=True)
+        self._rows.clear()
+        logger.debug("В текстовый индекс добавлено строк: %s, словарь: %s значений", len(df), len(self.values))
+
+    def frames(self) -> Dict[str, pd.DataFrame]:
+        """Возвращает таблицы индекса в виде build_frames (для сохранения в кэш)."""
+        return {
+            "codes": self.codes,
+            "values": pd.DataFrame({VALUE_COLUMN: pd.Series(self.values, dtype=object)}),
+            "tokens": _postings_frame(self._tokens),
+            "trigrams": _postings_frame(self._trigrams),
+        }
+
+    def _postings(self, column: str) -> Dict[str, np.ndarray]:
+        """Возвращает строки колонки, сгруппированные по коду значения (вычисляется один раз)."""
+        if column not in self._rows:
+            codes = self.codes[column].to_numpy()
+            order = np.argsort(codes, kind="stable")
+            bounds = np.searchsorted(codes[order], np.arange(len(self.values) + 1))
+            self._rows[column] = {"order": order, "bounds": bounds}
+        return self._rows[column]
+
+    def _rows_for(self, value_ids: Set[int], columns: Optional[List[str]]) -> np.ndarray:
+        """Возвращает отсортированные номера строк, где в колонках встречается одно из значений."""
+        parts: List[np.ndarray] = []
+        for column in columns or list(self.codes.columns):
+            if column not in self.codes.columns:
+                continue
+            postings = self._postings(column)
+            order, bounds = postings["order"], postings["bounds"]
+            parts.extend(order[bounds[value_id] : bounds[value_id + 1]] for value_id in value_ids)
+        if not parts:
+            return np.array([], dtype=np.intp)
+        return np.unique(np.concatenate(parts))
+
+    def matching_values(self, query: str) -> Set[int]:
+        """Возвращает коды значений, содержащих query как подстроку."""
+        query = normalize_text(query)
+        if len(query) < 3:
+            # Для коротких запросов триграмм нет — просматривается словарь, а не все строки
+            return {value_id for value_id, value in enumerate(self.values) if query in value}
+        candidates = _intersect(self._trigrams.get(trigram) for trigram in trigrams(query))
+        return {value_id for value_id in candidates if query in self.values[value_id]}
+
+    def search(self, query: str, columns: Optional[List[str]] = None) -> np.ndarray:
+        """
+        Ищет строки, где query входит в значение одной из колонок (без учета регистра, 'ё' = 'е').
+
+        Args:
+            query: Подстрока для поиска.
+            columns: Колонки для поиска (по умолчанию все проиндексированные).
+
+        Returns:
+            Номера строк в исходном порядке.
+        """
+        return self._rows_for(self.matching_values(query), columns)
+
+    def search_tokens(self, query: str, columns: Optional[List[str]] = None) -> np.ndarray:
+        """Ищет строки, где значение одной из колонок содержит все слова query целиком."""
+        words = tokens(normalize_text(query))
+        if not words:
+            return np.array([], dtype=np.intp)
+        return self._rows_for(_intersect(self._tokens.get(word) for word in words), columns)
+
+    def search_many(self, queries: Iterable[str], columns: Optional[List[str]] = None) -> Dict[str, np.ndarray]:
+        """
+        Ищет сразу несколько подстрок за один проход по словарю значений.
+
+        Args:
+            queries: Подстроки для поиска.
+            columns: Колонки для поиска (по умолчанию все проиндексированные).
+
+        Returns:
+            Словарь запрос -> номера строк в исходном порядке.
+        """
+        queries = list(queries)
+        matcher = TermMatcher(queries)
+        matches: List[Set[int]] = [set() for _ in queries]
+        for value_id, value in enumerate(self.values):
+            for term_id in matcher.find(value):
+                matches[term_id].add(value_id)
+        return {query: self._rows_for(value_ids, columns) for query, value_ids in zip(queries, matches)}
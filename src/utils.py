@@ -1,14 +1,17 @@
 import json
 import os
 from datetime import datetime
-from typing import Any, Dict
-from venv import logger
+from typing import Any, Collection, Dict, Iterator, List, Optional
 
+import numpy as np
 import pandas as pd
 import requests
+import xlrd
 from dotenv import load_dotenv
 
-from logging_config import get_logger
+from logging_config import Payload, get_logger
+from src.profiling import profiled
+from src.serialization import dumps, frame_to_json
 
 utils_logger = get_logger(__name__)
 
@@ -17,39 +20,47 @@ load_dotenv()
 
 API_KEY = os.getenv("api_key")
 if not API_KEY:
-    logger.error("API-ключ не установлен. Пожалуйста, установите ключ в переменной окружения 'api_key'.")
+    utils_logger.error("API-ключ не установлен. Пожалуйста, установите ключ в переменной окружения 'api_key'.")
     raise ValueError("API-ключ не установлен.")
 
 
+@profiled
 def fetch_data_from_api(api_url: str) -> Dict[str, Any]:
     """Fetches data from the specified API URL."""
-    utils_logger.debug(f"Fetching data from API: {api_url}")
+    utils_logger.debug("Fetching data from API: %s", api_url)
     try:
         response = requests.get(api_url)
         response.raise_for_status()
-        utils_logger.debug(f"API response: {response.json()}")
-        return response.json()
+        data: Dict[str, Any] = response.json()
+        utils_logger.debug("API response: %s", Payload(data))
+        return data
     except requests.RequestException as e:
-        utils_logger.error(f"Error fetching data from API: {e}")
+        utils_logger.error("Error fetching data from API: %s", e)
         raise
 
 
+@profiled
 def read_transactions_json(file_path: str) -> Any:
     with open(file_path, "r", encoding="utf-8") as f:
         return json.load(f)
 
 
+@profiled
 def dataframe_to_json(dataframe: pd.DataFrame) -> str:
     """Converts DataFrame to JSON string."""
-    return dataframe.to_json(orient="records")
+    text: str = dataframe.to_json(orient="records")
+    return text
 
 
-def write_json(file_path: str, data: Dict) -> None:
-    """Writes data to a JSON file."""
+@profiled
+def write_json(file_path: str, data: Any, indent: Optional[int] = 4) -> None:
+    """Writes data to a JSON file (indent=None for compact output); DataFrames are written as records directly."""
+    text = frame_to_json(data, indent) if isinstance(data, pd.DataFrame) else dumps(data, indent)
     with open(file_path, "w", encoding="utf-8") as f:
-        json.dump(data, f, indent=4, ensure_ascii=False)
+        f.write(text)
 
 
+@profiled
 def read_xlsx(file_path: str) -> pd.DataFrame:
     """Reads an xlsx file into a DataFrame."""
     df = pd.read_excel(file_path)
@@ -57,6 +68,116 @@ def read_xlsx(file_path: str) -> pd.DataFrame:
     return df
 
 
+# Number of rows per chunk for streaming readers
+DEFAULT_CHUNK_SIZE = 50_000
+
+
+def _rows_to_frame(rows: List[List[Any]], columns: List[str], int_columns: Collection[str] = ()) -> pd.DataFrame:
+    """Builds a chunk DataFrame from spreadsheet rows (None for empty cells).
+
+    Float columns listed in int_columns become int64. The caller decides them once for the whole sheet,
+    so every chunk of a file gets the same dtypes.
+    """
+    df = pd.DataFrame(rows, columns=columns)
+    text_columns = df.select_dtypes("object").columns
+    df[text_columns] = df[text_columns].where(df[text_columns].notna(), np.nan)
+    for column in df.select_dtypes("float").columns.intersection(list(int_columns)):
+        df[column] = df[column].astype(np.int64)
+    return df
+
+
+def _xls_int_columns(sheet: Any, columns: List[str]) -> List[str]:
+    """Returns the columns that pd.read_excel would read as int64: whole numbers without empty cells."""
+    int_columns = []
+    for j, column in enumerate(columns):
+        types = sheet.col_types(j, start_rowx=1)
+        if types and all(cell_type == xlrd.XL_CELL_NUMBER for cell_type in types):
+            if all(float(value) % 1 == 0 for value in sheet.col_values(j, start_rowx=1)):
+                int_columns.append(column)
+    return int_columns
+
+
+def _iter_xls_chunks(file_path: str, chunk_size: int) -> Iterator[pd.DataFrame]:
+    """Yields chunks of the first sheet of an .xls file.
+
+    BIFF workbooks are parsed by xlrd as a whole, but rows are converted to DataFrames one chunk at a time.
+    As in pd.read_excel, whole-number columns without gaps are int64; this is decided once for the whole sheet.
+    """
+    workbook = xlrd.open_workbook(file_path, on_demand=True)
+    try:
+        sheet = workbook.sheet_by_index(0)
+        columns = [str(value) for value in sheet.row_values(0)]
+        int_columns = _xls_int_columns(sheet, columns)
+        for start in range(1, sheet.nrows, chunk_size):
+            rows = []
+            for i in range(start, min(start + chunk_size, sheet.nrows)):
+                values = sheet.row_values(i)
+                for j, cell_type in enumerate(sheet.row_types(i)):
+                    if cell_type in (xlrd.XL_CELL_EMPTY, xlrd.XL_CELL_BLANK):
+                        values[j] = None
+                    elif cell_type == xlrd.XL_CELL_DATE:
+                        values[j] = xlrd.xldate_as_datetime(values[j], workbook.datemode)
+                rows.append(values)
+            yield _rows_to_frame(rows, columns, int_columns)
+    finally:
+        workbook.release_resources()
+
+
+def _iter_xlsx_chunks(file_path: str, chunk_size: int) -> Iterator[pd.DataFrame]:
+    """Yields chunks of the first sheet of an .xlsx file read in openpyxl read-only (streaming) mode.
+
+    Later rows are not known in advance, so number columns with float cells stay float64 in every chunk.
+    """
+    try:
+        import openpyxl
+    except ImportError as e:
+        raise ImportError("Streaming .xlsx files requires the optional dependency 'openpyxl'") from e
+
+    workbook = openpyxl.load_workbook(file_path, read_only=True, data_only=True)
+    try:
+        rows_iter = workbook.worksheets[0].iter_rows(values_only=True)
+        header = next(rows_iter, None)
+        if header is None:
+            return
+        columns = [str(value) for value in header]
+        rows: List[List[Any]] = []
+        for row in rows_iter:
+            rows.append(list(row))
+            if len(rows) == chunk_size:
+                yield _rows_to_frame(rows, columns)
+                rows = []
+        if rows:
+            yield _rows_to_frame(rows, columns)
+    finally:
+        workbook.close()
+
+
+@profiled
+def iter_transaction_chunks(
+    file_path: str, chunk_size: int = DEFAULT_CHUNK_SIZE, **read_csv_kwargs: Any
+) -> Iterator[pd.DataFrame]:
+    """Yields transactions from an .xls/.xlsx/.csv file in DataFrame chunks of at most chunk_size rows.
+
+    Only the current chunk is materialised as a DataFrame, so consumers that aggregate chunk by chunk
+    keep peak memory bounded by the chunk size. Extra keyword arguments are passed to pd.read_csv.
+    """
+    if chunk_size <= 0:
+        raise ValueError("chunk_size must be positive")
+    extension = os.path.splitext(file_path)[1].lower()
+    utils_logger.debug("Streaming %s in chunks of %s rows", file_path, chunk_size)
+    if extension == ".csv":
+        for chunk in pd.read_csv(file_path, chunksize=chunk_size, **read_csv_kwargs):
+            chunk.columns = [str(col) for col in chunk.columns]
+            yield chunk
+    elif extension == ".xls":
+        yield from _iter_xls_chunks(file_path, chunk_size)
+    elif extension in (".xlsx", ".xlsm"):
+        yield from _iter_xlsx_chunks(file_path, chunk_size)
+    else:
+        raise ValueError(f"Unsupported file format: {file_path}")
+
+
+@profiled
 def welcome_message(data_time: str) -> str:
     """Returns a greeting message based on the time of day."""
     data_time = data_time.strip()
@@ -1,15 +1,31 @@
 import json
 import os
 from datetime import datetime
-from typing import Any, Callable, Dict, List, Tuple
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple, overload
 
+import numpy as np
 import pandas as pd
 import requests
-import yfinance as yf
 from dotenv import load_dotenv
 
-from logging_config import get_logger
-from src.utils import read_transactions_json, read_xlsx, welcome_message, write_json
+from logging_config import Payload, get_logger
+from src.dataset import (
+    CARD_COLUMN,
+    OPERATION_DATE_FORMAT,
+    OPERATIONS_FILE,
+    Frame,
+    TransactionDataset,
+    Transactions,
+    as_frame,
+    card_suffix,
+    register_rollup,
+    restore_source_format,
+)
+from src.market import MarketDataClient, QuoteStore, load_user_settings
+from src.profiling import profiled, stage
+from src.ranking import top_frame, top_records
+from src.serialization import dumps
+from src.utils import read_transactions_json, welcome_message, write_json
 
 logger = get_logger(__name__)
 
@@ -21,7 +37,15 @@ if not API_KEY:
     logger.error("API-ключ не установлен. Пожалуйста, установите ключ в переменной окружения 'api_key'.")
     raise ValueError("API-ключ не установлен.")
 
+CARD_SUMMARY_COLUMNS = ["total_spent", "cashback", "operations_count"]
+# Имя сводки по картам, которую TransactionDataset поддерживает при добавлении операций
+CARDS_ROLLUP = "cards"
 
+# Общий клиент рыночных данных: одна HTTP-сессия на процесс, котировки кэшируются на диске для всех процессов
+market_client = MarketDataClient(store=QuoteStore())
+
+
+@profiled
 def get_utils() -> Tuple[
     Callable[[str], pd.DataFrame],
     Callable[[str], str],
@@ -34,39 +58,161 @@ def get_utils() -> Tuple[
     return read_xlsx, welcome_message, write_json, read_transactions_json
 
 
-def card_data(operations: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+@profiled
+def round_amounts(amounts: pd.Series, ndigits: int = 1) -> pd.Series:
+    """
+    Округляет суммы так же, как встроенный round.
+
+    np.round сдвигает запятую умножением и на половинных значениях (160.85 и т.п.) может
+    округлить иначе, чем round по точному двоичному значению. Такие строки досчитываются через round.
+    """
+    values = amounts.to_numpy(dtype=float)
+    rounded = np.round(values, ndigits)
+    scaled = values * 10**ndigits
+    near_half = np.abs(np.abs(scaled - np.trunc(scaled)) - 0.5) < 1e-6
+    if near_half.any():
+        rounded[near_half] = [round(float(value), ndigits) for value in values[near_half]]
+    return pd.Series(rounded, index=amounts.index)
+
+
+@profiled
+def card_summary(transactions: Frame) -> pd.DataFrame:
+    """
+    Возвращает сводку по картам одним группированием по колонкам DataFrame.
+
+    Индекс — последние 4 цифры карты в порядке первого появления, колонки:
+    total_spent (сумма расходов, каждая операция округлена до 0.1), cashback (сумма бонусов)
+    и operations_count (число операций). Операции без номера карты пропускаются.
+    """
+    df = as_frame(transactions)
+    if CARD_COLUMN in df.columns:
+        cards = df[CARD_COLUMN]
+    elif "Номер карты" in df.columns:
+        cards = card_suffix(df["Номер карты"])
+    else:
+        return pd.DataFrame(columns=CARD_SUMMARY_COLUMNS, index=pd.Index([], name=CARD_COLUMN), dtype=float)
+
+    has_card = cards.notna() & (cards != "")
+    amounts = df["Сумма операции"]
+    bonuses = df["Бонусы (включая кэшбэк)"] if "Бонусы (включая кэшбэк)" in df.columns else 0.0
+    rows = pd.DataFrame(
+        {
+            "total_spent": round_amounts((-amounts).where(amounts < 0, 0.0)),
+            "cashback": bonuses,
+            "operations_count": 1,
+        },
+        index=df.index,
+    )[has_card]
+    summary = rows.groupby(cards[has_card].rename(CARD_COLUMN), sort=False, observed=True).sum()
+    logger.debug("Сводка по %s картам, пропущено операций без карты: %s", len(summary), int((~has_card).sum()))
+    return summary
+
+
+@profiled
+def merge_card_summaries(first: pd.DataFrame, second: pd.DataFrame) -> pd.DataFrame:
+    """Сливает сводки по картам двух частей набора (first идет в наборе раньше second)."""
+    return pd.concat([first, second]).groupby(level=0, sort=False, observed=True).sum()
+
+
+register_rollup(CARDS_ROLLUP, card_summary, merge_card_summaries)
+
+
+@profiled
+def card_summary_chunks(chunks: Iterable[pd.DataFrame]) -> pd.DataFrame:
+    """
+    Возвращает сводку по картам (см. card_summary) для потока DataFrame-чанков.
+
+    В памяти держатся только текущий чанк и частичная сводка (одна строка на карту).
+    """
+    summary: Optional[pd.DataFrame] = None
+    for chunk in chunks:
+        part = card_summary(chunk)
+        summary = part if summary is None else merge_card_summaries(summary, part)
+    if summary is None:
+        return pd.DataFrame(columns=CARD_SUMMARY_COLUMNS, index=pd.Index([], name=CARD_COLUMN), dtype=float)
+    return summary
+
+
+@profiled
+def card_currency_totals(transactions: Frame) -> pd.DataFrame:
+    """Возвращает суммы операций по картам (строки) и валютам операции (колонки)."""
+    df = as_frame(transactions)
+    cards = df[CARD_COLUMN] if CARD_COLUMN in df.columns else card_suffix(df["Номер карты"])
+    has_card = cards.notna() & (cards != "")
+    return (
+        df.loc[has_card, "Сумма операции"]
+        .groupby([cards[has_card].rename(CARD_COLUMN), df.loc[has_card, "Валюта операции"]], sort=False, observed=True)
+        .sum()
+        .unstack(fill_value=0.0)
+    )
+
+
+def _summary_to_cards(summary: pd.DataFrame) -> List[Dict[str, Any]]:
+    """Преобразует сводку по картам в список словарей для JSON-ответа."""
+    return [
+        {"last_digits": str(last_digits), "total_spent": float(total_spent), "cashback": float(cashback)}
+        for last_digits, total_spent, cashback in zip(summary.index, summary["total_spent"], summary["cashback"])
+    ]
+
+
+def _operations_frame(operations: Transactions) -> pd.DataFrame:
+    """Возвращает операции в виде DataFrame без построчной обработки в Python."""
+    if isinstance(operations, TransactionDataset):
+        return operations.frame
+    return pd.DataFrame.from_records(operations)
+
+
+def _card_summary_before(dataset: TransactionDataset, end: datetime) -> pd.DataFrame:
+    """
+    Возвращает сводку по картам для операций раньше end, не строя нового набора.
+
+    Строки находятся по индексу дат набора. Если отброшенных операций меньше, чем оставшихся,
+    из готовой сводки набора (CARDS_ROLLUP) вычитается сводка отброшенных операций.
+    """
+    positions = dataset.date_index().positions(end=end)
+    if not isinstance(positions, slice):
+        return card_summary(dataset.frame.iloc[positions])
+    size = len(dataset)
+    start, stop, _ = positions.indices(size)
+    if stop - start == size:
+        return dataset.rollup(CARDS_ROLLUP)
+    kept = dataset.frame.iloc[start:stop]
+    if stop - start <= size - (stop - start):
+        return card_summary(kept)
+
+    full = dataset.rollup(CARDS_ROLLUP)
+    if start == 0 or stop == size:
+        excluded_rows = dataset.frame.iloc[stop:] if start == 0 else dataset.frame.iloc[:start]
+    else:
+        excluded_rows = pd.concat([dataset.frame.iloc[:start], dataset.frame.iloc[stop:]])
+    summary = full - card_summary(excluded_rows).reindex(full.index, fill_value=0)
+    # Расходы — суммы значений, округленных до 0.1, бонусы — в копейках: округление убирает погрешность вычитания
+    summary["total_spent"] = round_amounts(summary["total_spent"])
+    summary["cashback"] = round_amounts(summary["cashback"], 2)
+    summary = summary[summary["operations_count"] > 0]
+    if start == 0:
+        return summary
+    # Как и в card_summary, карты идут в порядке первого появления среди оставшихся операций
+    order = pd.Index(pd.unique(kept[CARD_COLUMN].to_numpy()))
+    return summary.reindex(order[order.isin(summary.index)])
+
+
+def _card_summary(operations: Transactions) -> pd.DataFrame:
+    """Возвращает сводку по картам; для TransactionDataset — сводку набора, которая обновляется при append."""
+    if isinstance(operations, TransactionDataset):
+        return operations.rollup(CARDS_ROLLUP)
+    return card_summary(_operations_frame(operations))
+
+
+@profiled
+def card_data(operations: Transactions) -> List[Dict[str, Any]]:
     """Обрабатывает данные карт из транзакций."""
-    card_data = {}
-    for operation in operations:
-        card_number = operation.get("Номер карты")
-        cashback = operation.get("Бонусы (включая кэшбэк)")
-        logger.debug("Операция: %s", operation)
-        if card_number:
-            logger.debug("Обработка транзакции с номером карты: %s", card_number)
-        else:
-            logger.warning("Пропущена операция без номера карты: %s", operation)
-            continue
-
-        # Преобразование номера карты в строку
-        card_number = str(card_number)
-        last_digits = card_number[-4:]
-
-        if last_digits not in card_data:
-            card_data[last_digits] = {"last_digits": last_digits, "total_spent": 0.0, "cashback": 0.0}
-
-        if operation["Сумма операции"] < 0:
-            card_data[last_digits]["total_spent"] += round(operation["Сумма операции"] * -1, 1)
-
-        if cashback is not None:
-            card_data[last_digits]["cashback"] += cashback
-        else:
-            logger.debug("Кэшбэк отсутствует для операции: %s", operation)
-
-    cards = list(card_data.values())
-    logger.debug("Обработанные данные карт: %s", cards)
+    cards = _summary_to_cards(_card_summary(operations))
+    logger.debug("Обработанные данные карт: %s", Payload(cards))
     return cards
 
 
+@profiled
 def cashback(total_sum: int) -> int:
     """Рассчитывает кэшбэк."""
     result_cashback = total_sum // 100
@@ -74,6 +220,7 @@ def cashback(total_sum: int) -> int:
     return result_cashback
 
 
+@profiled
 def calculate_cashback(cards: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
     """Рассчитывает кэшбэк для каждой карты."""
     for card in cards:
@@ -86,131 +233,161 @@ def calculate_cashback(cards: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
     return cards
 
 
-def filter_transactions_by_date(transactions: List[Dict[str, Any]], filter_date: datetime) -> List[Dict[str, Any]]:
-    """Фильтрует транзакции по дате."""
-    filtered_transactions: List[Dict[str, Any]] = []
-    for transaction in transactions:
-        transaction_date_str: Any = transaction.get("Дата операции")
-        if transaction_date_str:
-            transaction_date: datetime = datetime.strptime(transaction_date_str, "%d.%m.%Y %H:%M:%S")
-            logger.debug("Сравнение дат: транзакция %s, фильтр %s", transaction_date, filter_date)
-            if transaction_date < filter_date:
-                filtered_transactions.append(transaction)
-    logger.debug("Отфильтрованные транзакции: %s", filtered_transactions)
+@overload
+def filter_transactions_by_date(transactions: List[Dict[str, Any]], filter_date: datetime) -> List[Dict[str, Any]]: ...
+
+
+@overload
+def filter_transactions_by_date(transactions: TransactionDataset, filter_date: datetime) -> TransactionDataset: ...
+
+
+@profiled
+def filter_transactions_by_date(transactions: Transactions, filter_date: datetime) -> Transactions:
+    """Фильтрует транзакции по дате: оставляет операции раньше filter_date."""
+    if isinstance(transactions, TransactionDataset):
+        return transactions.between(end=filter_date)
+
+    # Даты разбираются одним векторным вызовом с фиксированным форматом вместо strptime на каждую строку
+    dates = pd.to_datetime(
+        [transaction.get("Дата операции") or None for transaction in transactions], format=OPERATION_DATE_FORMAT
+    )
+    filtered_transactions: List[Dict[str, Any]] = [
+        transaction for transaction, keep in zip(transactions, dates < filter_date) if keep
+    ]
+    logger.debug("Отфильтровано транзакций: %s из %s", len(filtered_transactions), len(transactions))
     return filtered_transactions
 
 
-def index_page(data_time: str, sample_transactions: List[Dict[str, Any]]) -> str:
+@profiled
+def index_page(data_time: str, sample_transactions: Transactions) -> str:
     """Обрабатывает главную страницу."""
     try:
         logger.info("Начало обработки данных для главной страницы")
 
-        greeting: str = welcome_message("User")
-        logger.debug("Приветственное сообщение: %s", greeting)
-
         try:
             filter_date: datetime = datetime.strptime(data_time, "%Y-%m-%d %H:%M:%S")
-            filtered_transactions: List[Dict[str, Any]] = filter_transactions_by_date(sample_transactions, filter_date)
-            logger.debug("Транзакции после фильтрации по дате: %s", filtered_transactions)
+            greeting: str = welcome_message(data_time)
+            logger.debug("Приветственное сообщение: %s", greeting)
         except ValueError:
             logger.error("Неправильный формат даты: %s", data_time)
             return json.dumps({"error": "Invalid date format. Please use 'YYYY-MM-DD HH:MM:SS'."})
 
-        cards: List[Dict[str, Any]] = process_card_data(filtered_transactions)
-        logger.debug("Данные карт после обработки: %s", cards)
+        cards: List[Dict[str, Any]]
+        if isinstance(sample_transactions, TransactionDataset):
+            # Для набора сводка берется по индексу дат и готовой сводке по картам, без нового набора
+            cards = _summary_to_cards(_card_summary_before(sample_transactions, filter_date))
+        else:
+            filtered_transactions = filter_transactions_by_date(sample_transactions, filter_date)
+            logger.debug("Транзакций после фильтрации по дате: %s", len(filtered_transactions))
+            cards = process_card_data(filtered_transactions)
+        logger.debug("Данные карт после обработки: %s", Payload(cards))
 
         response: Dict[str, Any] = {"greeting": greeting, "cards": cards}
         logger.info("Успешная обработка данных для главной страницы")
 
-        return json.dumps(response, ensure_ascii=False, indent=4)
+        return dumps(response, indent=4)
     except Exception as e:
         logger.error("Ошибка при обработке главной страницы: %s", e)
         return json.dumps({"error": "An error occurred while processing the request."})
 
 
-def get_currency_rate(currency: str) -> float:
-    """Возвращает текущий курс валюты."""
+@profiled
+def get_currency_rate(currency: str) -> Optional[float]:
+    """
+    Возвращает текущий курс валюты (котировки кэшируются, см. MarketDataClient).
+
+    Если API недоступен и последнего известного курса нет, возвращает None.
+    """
     try:
-        response = requests.get(f"https://api.exchangerate-api.com/v4/latest/{currency}")
-        response.raise_for_status()
-        data = response.json()
-        rate = data["rates"]["RUB"]
+        rate = market_client.currency_rate(currency)
         logger.info("Текущий курс для %s: %s", currency, rate)
-        return float(rate)
-    except requests.RequestException as e:
+        return rate
+    except (requests.RequestException, KeyError, ValueError) as e:
         logger.error("Ошибка при запросе курса валют: %s", e)
-        return 0.0
+        return None
 
 
-def get_stock_currency(stock_symbol: str) -> float:
-    """Возвращает текущую цену акции."""
+@profiled
+def get_stock_currency(stock_symbol: str) -> Optional[float]:
+    """
+    Возвращает текущую цену акции (котировки кэшируются, см. MarketDataClient).
+
+    Если цена недоступна и последней известной цены нет, возвращает None.
+    """
     try:
-        stock = yf.Ticker(stock_symbol)
-        history = stock.history(period="1d")
-        price = history["High"].iloc[0]
+        price = market_client.stock_price(stock_symbol)
         logger.info("Текущая цена акции %s: %s", stock_symbol, price)
-        return float(price)  # Убедитесь, что возвращаете float
+        return price
     except Exception as e:
         logger.error("Ошибка при запросе цены акции: %s", e)
-        return 0.0
+        return None
 
 
-def process_card_data(operations: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+@profiled
+def process_card_data(operations: Transactions) -> List[Dict[str, Any]]:
     """Обрабатывает данные операций и возвращает список данных по картам."""
-    card_data: Dict[str, Any] = {}
-    for operation in operations:
-        card_number = operation.get("Номер карты")
-        if not card_number:
-            continue
-
-        # Преобразование номера карты в строку
-        card_number = str(card_number)
-        last_digits: str = card_number[-4:]
-
-        if last_digits not in card_data:
-            card_data[last_digits] = {"last_digits": last_digits, "total_spent": 0.0, "cashback": 0.0}
+    return _summary_to_cards(_card_summary(operations))
 
-        if operation["Сумма операции"] < 0:
-            card_data[last_digits]["total_spent"] += round(operation["Сумма операции"] * -1, 1)
 
-        card_data[last_digits]["cashback"] += operation.get("Бонусы (включая кэшбэк)", 0.0)
-
-    return list(card_data.values())
-
-
-def total_costs(transactions: List[Dict[str, Any]]) -> float:
+@profiled
+def total_costs(transactions: Transactions) -> float:
     """Возвращает общую сумму всех операций."""
+    if isinstance(transactions, TransactionDataset):
+        return float(transactions.frame["Сумма операции"].abs().sum())
     return float(
         sum(abs(transaction["Сумма операции"]) for transaction in transactions)
     )  # Убедитесь, что возвращаете float
 
 
-def top_transactions(transactions: List[Dict[str, Any]], n: int = 10) -> List[Dict[str, Any]]:
-    """Возвращает топ-N транзакций по сумме."""
-    return sorted(transactions, key=lambda x: abs(x["Сумма операции"]), reverse=True)[:n]
+@profiled
+def total_costs_chunks(chunks: Iterable[pd.DataFrame]) -> float:
+    """Возвращает общую сумму всех операций (по модулю) для потока DataFrame-чанков."""
+    return float(sum(chunk["Сумма операции"].abs().sum() for chunk in chunks))
+
 
+@profiled
+def top_transactions(transactions: Transactions, n: int = 10, group_by: Optional[str] = None) -> List[Dict[str, Any]]:
+    """
+    Возвращает топ-N транзакций по сумме (по модулю) без полной сортировки.
 
-def main_views() -> None:
+    При равных суммах выше более поздняя операция. Если задан group_by
+    (например, 'Номер карты' или 'Категория'), топ-N отбирается внутри каждой группы.
+    """
+    if isinstance(transactions, TransactionDataset):
+        top: List[Dict[str, Any]] = restore_source_format(top_frame(transactions.frame, n, group_by)).to_dict(
+            orient="records"
+        )
+        return top
+    return top_records(transactions, n, group_by)
+
+
+@profiled
+def main_views(dataset: Optional[TransactionDataset] = None) -> None:
     """Основная функция для обработки транзакций."""
     user_input = input("Введите дату и время в формате YYYY-MM-DD HH:MM:SS: ")
     greeting = welcome_message(user_input if user_input else "User")  # Убедитесь, что передаете строку
     print(greeting)
 
-    transactions_df = read_xlsx("../data/operations.xls")  # Используйте другое имя для переменной
-    transactions = transactions_df.to_dict(orient="records")
-    logger.debug("Прочитанные транзакции: %s", transactions)
+    transactions = dataset if dataset is not None else TransactionDataset.from_file(OPERATIONS_FILE)
+    logger.debug("Прочитано транзакций: %s", len(transactions))
 
     total_expenses = total_costs(transactions)
     logger.debug("Общие расходы: %s", total_expenses)
     print(f"Total expenses: {total_expenses}")
 
     cards_data = process_card_data(transactions)
-    logger.debug("Данные карт: %s", cards_data)
+    logger.debug("Данные карт: %s", Payload(cards_data))
 
     top_expenses = top_transactions(transactions)
-    logger.debug("Топ транзакций: %s", top_expenses)
+    logger.debug("Топ транзакций: %s", Payload(top_expenses))
     print(f"Top transactions: {top_expenses}")
 
+    # Все валюты и акции из настроек запрашиваются параллельно; дальше котировки берутся из кэша
+    settings = load_user_settings()
+    with stage("views.market_quotes"):
+        quotes = market_client.fetch_all(settings.get("user_currencies", []), settings.get("user_stocks", []))
+    logger.debug("Котировки из настроек: %s", quotes)
+
     currency_rate = None  # Инициализация переменной
 
     if not API_KEY:
@@ -236,13 +413,14 @@ def main_views() -> None:
         "top_expenses": top_expenses,
         "currency_rate": currency_rate,
         "stock_price": stock_price,
+        "currency_rates": quotes["currency_rates"],
+        "stock_prices": quotes["stock_prices"],
     }
 
     write_json("result.json", result)
-    logger.debug("Результат JSON: %s", result)
 
-    result_json = json.dumps(result, indent=2, ensure_ascii=False)
-    logger.debug("Результат JSON: %s", result_json)
+    result_json = dumps(result, indent=2)
+    logger.debug("Результат JSON: %s", Payload(result_json))
     print(result_json)
 
 
@@ -0,0 +1,92 @@
+import os
+from typing import Any, Dict
+from unittest.mock import patch
+
+import pytest
+
+from src.benchmark import (
+    BENCHMARKS,
+    DATASET_BENCHMARK,
+    compare,
+    format_results,
+    load_baseline,
+    main,
+    run_benchmarks,
+    save_baseline,
+)
+
+
+@pytest.fixture
+def results() -> Dict[str, Dict[str, Dict[str, float]]]:
+    return {"1000": {"top_transactions": {"cold_s": 0.1, "warm_s": 0.05, "peak_mb": 10.0}}}
+
+
+def test_run_benchmarks_reports_metrics() -> None:
+    measured = run_benchmarks([300], [DATASET_BENCHMARK, "top_transactions", "get_transactions"], repeat=1)
+
+    assert list(measured) == ["300"]
+    assert set(measured["300"]) == {DATASET_BENCHMARK, "top_transactions", "get_transactions"}
+    for metrics in measured["300"].values():
+        assert set(metrics) == {"cold_s", "warm_s", "peak_mb"}
+        assert all(value >= 0 for value in metrics.values())
+
+
+def test_run_benchmarks_all_functions_without_memory() -> None:
+    measured = run_benchmarks([200], repeat=0, memory=False)
+
+    assert set(measured["200"]) == {DATASET_BENCHMARK, *BENCHMARKS}
+    assert all("peak_mb" not in metrics for metrics in measured["200"].values())
+
+
+def test_run_benchmarks_unknown_name() -> None:
+    with pytest.raises(ValueError):
+        run_benchmarks([100], ["unknown"])
+
+
+def test_compare_detects_regressions(results: Dict[str, Dict[str, Dict[str, float]]]) -> None:
+    baseline: Dict[str, Any] = {"results": {"1000": {"top_transactions": {"cold_s": 0.05, "warm_s": 0.049}}}}
+
+    regressions = compare(results, baseline, tolerance=0.25)
+
+    assert len(regressions) == 1
+    assert "top_transactions" in regressions[0] and "cold_s" in regressions[0]
+    assert compare(results, {"results": {}}) == []
+
+
+def test_compare_ignores_tiny_differences() -> None:
+    baseline = {"results": {"1000": {"top_transactions": {"warm_s": 0.0001}}}}
+
+    assert compare({"1000": {"top_transactions": {"warm_s": 0.001}}}, baseline) == []
+
+
+def test_save_baseline_merges(tmp_path: str, results: Dict[str, Dict[str, Dict[str, float]]]) -> None:
+    path = os.path.join(tmp_path, "benchmarks", "baseline.json")
+    save_baseline({"1000": {"get_expenses": {"cold_s": 0.2}}}, path)
+    save_baseline(results, path)
+
+    baseline = load_baseline(path)
+
+    assert set(baseline["results"]["1000"]) == {"get_expenses", "top_transactions"}
+    assert baseline["environment"]["python"]
+    assert load_baseline(os.path.join(tmp_path, "missing.json")) == {"environment": {}, "results": {}}
+
+
+@patch("src.benchmark.run_benchmarks")
+def test_main_compare_exit_code(
+    mock_run: Any, tmp_path: str, results: Dict[str, Dict[str, Dict[str, float]]], capsys: Any
+) -> None:
+    mock_run.return_value = results
+    path = os.path.join(tmp_path, "baseline.json")
+    save_baseline({"1000": {"top_transactions": {"cold_s": 0.01}}}, path)
+
+    assert main(["--rows", "1000", "--baseline", path, "--compare"]) == 1
+    assert main(["--rows", "1000", "--baseline", path, "--save-baseline"]) == 0
+    assert main(["--rows", "1000", "--baseline", path, "--compare"]) == 0
+    assert "top_transactions" in capsys.readouterr().out
+
+
+def test_format_results(results: Dict[str, Dict[str, Dict[str, float]]]) -> None:
+    table = format_results(results).splitlines()
+
+    assert table[0].split() == ["rows", "benchmark", "cold_s", "warm_s", "peak_mb"]
+    assert table[1].split() == ["1000", "top_transactions", "0.1000", "0.0500", "10.0000"]
@@ -0,0 +1,179 @@
+import os
+from typing import Any
+from unittest.mock import Mock, patch
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.cache import (
+    FrameWriter,
+    cache_path_for,
+    drop_overlaps,
+    load_frame,
+    load_statements,
+    load_transactions,
+    save_frame,
+    statement_files,
+)
+
+
+@pytest.fixture
+def sample_df() -> pd.DataFrame:
+    return pd.DataFrame(
+        {
+            "Дата операции": ["31.12.2021 16:44:00", "30.12.2021 10:00:00"],
+            "Номер карты": ["*7197", np.nan],
+            "Сумма операции": [-160.89, 50.0],
+            "Бонусы (включая кэшбэк)": [3, 0],
+            "Дата платежа": pd.to_datetime(["2021-12-31", None]),
+        }
+    )
+
+
+@pytest.fixture
+def source_file(tmp_path: Any) -> str:
+    path = tmp_path / "operations.xls"
+    path.write_bytes(b"original content")
+    return str(path)
+
+
+def test_save_and_load_frame_roundtrip(tmp_path: Any, sample_df: pd.DataFrame) -> None:
+    path = str(tmp_path / "frame.npz")
+    save_frame(sample_df, path, {"source": {}})
+    loaded, meta = load_frame(path)
+    pd.testing.assert_frame_equal(loaded, sample_df)
+    assert meta["rows"] == 2
+
+
+def test_frame_writer_matches_save_frame(tmp_path: Any, sample_df: pd.DataFrame) -> None:
+    sample_df.loc[1, "Номер карты"] = "*4556 (доп.)"
+    path = str(tmp_path / "frames" / "chunked.npz")
+    with FrameWriter(path, {"source": {}}) as writer:
+        writer.write(sample_df.iloc[:1])
+        writer.write(sample_df.iloc[1:])
+
+    loaded, meta = load_frame(path)
+
+    pd.testing.assert_frame_equal(loaded, sample_df)
+    assert meta["rows"] == 2
+    assert os.listdir(tmp_path / "frames") == ["chunked.npz"]
+
+
+def test_frame_writer_discards_on_error(tmp_path: Any, sample_df: pd.DataFrame) -> None:
+    path = str(tmp_path / "chunked.npz")
+    with pytest.raises(ValueError):
+        with FrameWriter(path) as writer:
+            writer.write(sample_df)
+            writer.write(sample_df.drop(columns=["Номер карты"]))
+
+    assert os.listdir(tmp_path) == []
+
+
+@patch("src.cache.read_xlsx")
+def test_load_transactions_uses_cache(
+    mock_read_xlsx: Mock, tmp_path: Any, source_file: str, sample_df: pd.DataFrame
+) -> None:
+    mock_read_xlsx.return_value = sample_df
+    cache_dir = str(tmp_path / "cache")
+
+    first = load_transactions(source_file, cache_dir)
+    second = load_transactions(source_file, cache_dir)
+
+    mock_read_xlsx.assert_called_once_with(source_file)
+    assert os.path.exists(cache_path_for(source_file, cache_dir))
+    pd.testing.assert_frame_equal(first, second)
+
+
+@patch("src.cache.read_xlsx")
+def test_load_transactions_touched_file_same_content(
+    mock_read_xlsx: Mock, tmp_path: Any, source_file: str, sample_df: pd.DataFrame
+) -> None:
+    mock_read_xlsx.return_value = sample_df
+    cache_dir = str(tmp_path / "cache")
+
+    load_transactions(source_file, cache_dir)
+    os.utime(source_file, ns=(0, 0))
+    load_transactions(source_file, cache_dir)
+
+    mock_read_xlsx.assert_called_once()
+
+
+@patch("src.cache.read_xlsx")
+def test_load_transactions_rebuilds_on_change(
+    mock_read_xlsx: Mock, tmp_path: Any, source_file: str, sample_df: pd.DataFrame
+) -> None:
+    mock_read_xlsx.return_value = sample_df
+    cache_dir = str(tmp_path / "cache")
+
+    load_transactions(source_file, cache_dir)
+    with open(source_file, "wb") as f:
+        f.write(b"changed content!")
+    load_transactions(source_file, cache_dir)
+
+    assert mock_read_xlsx.call_count == 2
+
+
+@patch("src.cache.read_xlsx")
+def test_load_transactions_missing_file(mock_read_xlsx: Mock) -> None:
+    mock_read_xlsx.side_effect = FileNotFoundError
+    with pytest.raises(FileNotFoundError):
+        load_transactions("missing.xls")
+
+
+def make_statement(rows: list) -> pd.DataFrame:
+    return pd.DataFrame(rows, columns=["Дата операции", "Номер карты", "Сумма операции", "Описание"])
+
+
+@pytest.fixture
+def statements_dir(tmp_path: Any) -> Any:
+    for user in ("alice", "bob"):
+        (tmp_path / user).mkdir()
+    december = [
+        ["30.12.2021 10:00:00", "*7197", -100.0, "Магнит"],
+        ["30.12.2021 10:00:00", "*7197", -100.0, "Магнит"],
+        ["31.12.2021 12:00:00", "*7197", -50.0, "Пятерочка"],
+    ]
+    # Январская выгрузка повторяет часть декабрьской: одна из двух одинаковых покупок и покупка 31.12
+    january = [december[0], december[2], ["01.01.2022 09:00:00", "*7197", -30.0, "Кофе"]]
+    make_statement(december).to_csv(tmp_path / "alice" / "2021-12.csv", index=False)
+    make_statement(january).to_csv(tmp_path / "alice" / "2022-01.csv", index=False)
+    make_statement([["01.01.2022 10:00:00", np.nan, -10.0, "Такси"]]).to_csv(
+        tmp_path / "bob" / "2022-01.csv", index=False
+    )
+    (tmp_path / "notes.txt").write_text("not a statement")
+    return tmp_path
+
+
+def test_statement_files(statements_dir: Any) -> None:
+    files = statement_files(str(statements_dir))
+    assert [os.path.relpath(path, statements_dir) for path in files] == [
+        os.path.join("alice", "2021-12.csv"),
+        os.path.join("alice", "2022-01.csv"),
+        os.path.join("bob", "2022-01.csv"),
+    ]
+    assert statement_files(str(statements_dir / "*" / "2022-01.csv")) == files[1:]
+    assert statement_files(["b.xls", "a.xls"]) == ["b.xls", "a.xls"]
+
+
+def test_drop_overlaps_keeps_repeats_within_file() -> None:
+    first = make_statement([["d1", "*1", -1.0, "x"], ["d1", "*1", -1.0, "x"]])
+    second = make_statement([["d1", "*1", -1.0, "x"], ["d1", "*1", -1.0, "x"], ["d1", "*1", -1.0, "x"]])
+    assert len(drop_overlaps([first, second])) == 3
+    assert drop_overlaps([]).empty
+
+
+@pytest.mark.parametrize("max_workers", [1, 2])
+def test_load_statements(statements_dir: Any, max_workers: int) -> None:
+    df = load_statements(str(statements_dir), str(statements_dir / "cache"), max_workers=max_workers)
+    assert df["Описание"].tolist() == ["Магнит", "Магнит", "Пятерочка", "Кофе", "Такси"]
+    assert df["user"].tolist() == ["alice", "alice", "alice", "alice", "bob"]
+    assert df["source"].iloc[-1] == str(statements_dir / "bob" / "2022-01.csv")
+    # Одноименные выгрузки разных пользователей кэшируются раздельно
+    again = load_statements(str(statements_dir), str(statements_dir / "cache"), max_workers=max_workers)
+    pd.testing.assert_frame_equal(again, df)
+
+
+def test_load_statements_no_files(tmp_path: Any) -> None:
+    with pytest.raises(FileNotFoundError):
+        load_statements(str(tmp_path / "*.xls"))
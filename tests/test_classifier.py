@@ -0,0 +1,82 @@
+from typing import Any
+from unittest.mock import Mock, patch
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.classifier import TransactionClassifier
+from src.dataset import TransactionDataset
+
+
+@pytest.fixture
+def operations() -> pd.DataFrame:
+    return pd.DataFrame(
+        {
+            "Описание": [
+                "МТС Mobile +7 921 111-22-33",
+                "Иван С.",
+                "Перевод с карты",
+                "Снятие в банкомате Сбербанк",
+                "Оплата СБП Перевод с карты",
+                "Яндекс.Плюс",
+                "SPb Trk Atmosfera",
+                np.nan,
+            ]
+        }
+    )
+
+
+def test_classify_text() -> None:
+    classifier = TransactionClassifier()
+    assert classifier.labels(classifier.classify_text("Перевод на карту через СБП")) == ["card_to_card", "sbp"]
+    assert classifier.labels(classifier.classify_text("Билайн +79627170852")) == ["phone"]
+    assert classifier.labels(classifier.classify_text("Перевод физическому лицу")) == ["person_to_person"]
+    assert classifier.classify_text("иван с.") == 0
+    assert classifier.classify_text("Магнит") == 0
+
+
+def test_classify_column(operations: pd.DataFrame) -> None:
+    classifier = TransactionClassifier()
+    tags = classifier.classify(operations["Описание"])
+    assert [classifier.labels(int(value)) for value in tags] == [
+        ["phone"],
+        ["person_to_person"],
+        ["card_to_card"],
+        ["atm"],
+        ["card_to_card", "sbp"],
+        ["subscription"],
+        [],
+        [],
+    ]
+    assert np.flatnonzero(classifier.mask(tags, "card_to_card")).tolist() == [2, 4]
+
+
+def test_custom_detectors() -> None:
+    classifier = TransactionClassifier({"taxi": r"такси", "yandex": r"яндекс"})
+    assert classifier.labels(classifier.classify_text("Яндекс Такси")) == ["taxi", "yandex"]
+    assert classifier.fingerprint() != TransactionClassifier().fingerprint()
+    with pytest.raises(KeyError):
+        classifier.mask(np.array([1]), "atm")
+
+
+def test_classify_frame_description_key() -> None:
+    classifier = TransactionClassifier()
+    frame = classifier.classify_frame(pd.DataFrame({"description": ["+79211112233", "Магнит"]}))
+    assert frame["tags"].tolist() == [1, 0]
+
+
+@patch("src.cache.read_xlsx")
+def test_dataset_tags_persisted(mock_read_xlsx: Mock, tmp_path: Any, operations: pd.DataFrame) -> None:
+    source = tmp_path / "operations.xls"
+    source.write_bytes(b"content")
+    mock_read_xlsx.side_effect = lambda path: operations.copy()
+    cache_dir = str(tmp_path / "cache")
+
+    first = TransactionDataset.from_file(str(source), cache_dir)
+    assert first.tagged("atm").frame["Описание"].tolist() == ["Снятие в банкомате Сбербанк"]
+
+    with patch.object(TransactionClassifier, "classify") as mock_classify:
+        second = TransactionDataset.from_file(str(source), cache_dir)
+        assert second.tags().tolist() == first.tags().tolist()
+        mock_classify.assert_not_called()
@@ -0,0 +1,88 @@
+from datetime import datetime
+from typing import Any
+from unittest.mock import Mock, patch
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.cache import cache_path_for
+from src.cube import ExpenseCube
+from src.dataset import TransactionDataset
+
+
+@pytest.fixture
+def operations() -> pd.DataFrame:
+    return pd.DataFrame(
+        {
+            "Дата платежа": pd.to_datetime(
+                ["2022-01-03", "2022-01-03", "2022-01-08", "2022-01-10", None, "2022-02-01"]
+            ),
+            "Категория": ["Еда", "Еда", "Еда", "Такси", "Еда", np.nan],
+            "Сумма операции": [-10.10, -20.20, -5.0, -100.0, -1.0, 7.0],
+            "Сумма платежа": [-10.10, -20.20, -5.0, -100.0, -1.0, 7.0],
+        }
+    )
+
+
+def test_cube_rows(operations: pd.DataFrame) -> None:
+    cube = ExpenseCube.from_frame(operations)
+    first = cube.rows.iloc[0]
+    assert (first["category"], first["count"], first["operation_sum"]) == ("Еда", 2, -3030)
+    assert (first["operation_min"], first["operation_max"]) == (-2020, -1010)
+    assert len(cube.rows) == 4
+
+
+def test_cube_total(operations: pd.DataFrame) -> None:
+    cube = ExpenseCube.from_frame(operations)
+    assert cube.total(datetime(2022, 1, 1), datetime(2022, 1, 8), "Еда") == -35.3
+    assert cube.total(datetime(2022, 1, 4), datetime(2022, 1, 31)) == -105.0
+    assert cube.total(category=" еда ", measure="payment_sum", case_insensitive=True) == -35.3
+    assert cube.total(category="Нет такой") == 0.0
+
+
+def test_cube_summary(operations: pd.DataFrame) -> None:
+    cube = ExpenseCube.from_frame(operations)
+    assert cube.summary(category="Еда") == {"count": 3, "sum": -35.3, "min": -20.2, "max": -5.0}
+    assert cube.summary(datetime(2023, 1, 1)) == {"count": 0, "sum": 0.0, "min": None, "max": None}
+
+
+def test_cube_by_weekday(operations: pd.DataFrame) -> None:
+    cube = ExpenseCube.from_frame(operations)
+    # 2022-01-03 и 2022-01-10 — понедельники, 2022-01-08 — суббота, 2022-02-01 — вторник
+    assert cube.by_weekday() == {"Monday": -130.3, "Tuesday": 7.0, "Saturday": -5.0}
+
+
+def test_cube_append(operations: pd.DataFrame) -> None:
+    cube = ExpenseCube.from_frame(operations.iloc[:3])
+    assert cube.total(category="Такси") == 0.0
+    cube.append(operations.iloc[3:])
+    full = ExpenseCube.from_frame(operations)
+    assert cube.total(category="Такси") == -100.0
+    pd.testing.assert_frame_equal(
+        cube.rows.sort_values(["day", "operation_sum"]).reset_index(drop=True),
+        full.rows.sort_values(["day", "operation_sum"]).reset_index(drop=True),
+    )
+
+
+@patch("src.cache.read_xlsx")
+def test_dataset_cube_persisted(mock_read_xlsx: Mock, tmp_path: Any, operations: pd.DataFrame) -> None:
+    source = tmp_path / "operations.xls"
+    source.write_bytes(b"content")
+    mock_read_xlsx.side_effect = lambda path: operations.copy()
+    cache_dir = str(tmp_path / "cache")
+
+    first = TransactionDataset.from_file(str(source), cache_dir).cube()
+    second = TransactionDataset.from_file(str(source), cache_dir).cube()
+
+    assert cache_path_for(str(source), cache_dir, "cube").endswith("operations.xls.cube.npz")
+    pd.testing.assert_frame_equal(first.rows, second.rows)
+    assert second.total(category="Еда") == -35.3
+
+
+def test_cube_from_chunks(operations: pd.DataFrame) -> None:
+    chunked = ExpenseCube.from_chunks(operations.iloc[i : i + 2] for i in range(0, len(operations), 2))
+    full = ExpenseCube.from_frame(operations)
+    assert chunked.summary() == full.summary()
+    assert chunked.by_weekday() == full.by_weekday()
+    assert ExpenseCube.from_chunks([]).total() == 0.0
@@ -0,0 +1,224 @@
+from datetime import datetime
+from typing import Any
+from unittest.mock import Mock, patch
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.dataset import (
+    DateIndex,
+    TransactionDataset,
+    as_frame,
+    as_records,
+    format_dates,
+    payment_window,
+    register_rollup,
+    restore_source_format,
+)
+
+
+@pytest.fixture
+def raw_df() -> pd.DataFrame:
+    return pd.DataFrame(
+        {
+            "Дата операции": ["31.12.2021 16:44:00", "30.12.2021 10:00:00"],
+            "Дата платежа": ["31.12.2021", "30.12.2021"],
+            "Номер карты": ["*7197", np.nan],
+            "Категория": [" Супермаркеты ", "Переводы"],
+            "Сумма операции": [-160.89, 50.0],
+        }
+    )
+
+
+def test_dataset_normalizes_frame(raw_df: pd.DataFrame) -> None:
+    dataset = TransactionDataset(raw_df)
+    frame = dataset.frame
+    assert frame["Дата операции"].iloc[0] == pd.Timestamp(2021, 12, 31, 16, 44)
+    assert frame["Дата платежа"].iloc[1] == pd.Timestamp(2021, 12, 30)
+    assert frame["category_lower"].tolist() == ["супермаркеты", "переводы"]
+    assert frame["last_digits"].iloc[0] == "7197"
+    assert pd.isna(frame["last_digits"].iloc[1])
+
+
+@pytest.mark.parametrize("date_format", ["%d.%m.%Y %H:%M:%S", "%d.%m.%Y", "%Y-%m", "Дата %d/%m", "%b %d"])
+def test_format_dates_matches_strftime(date_format: str) -> None:
+    dates = pd.Series(
+        pd.to_datetime(["2021-12-31 16:44:05", None, "2021-12-31 16:44:05", "2018-01-02 00:00:00"]), name="d"
+    )
+
+    expected = dates.dt.strftime(date_format).astype(object)
+
+    pd.testing.assert_series_equal(format_dates(dates, date_format), expected)
+
+
+def test_dataset_records_restore_source_format(raw_df: pd.DataFrame) -> None:
+    dataset = TransactionDataset(raw_df)
+    records = dataset.records()
+    assert records[0]["Дата операции"] == "31.12.2021 16:44:00"
+    assert records[0]["Дата платежа"] == "31.12.2021"
+    assert "category_lower" not in records[0]
+    assert dataset.records() is records
+
+
+def test_dataset_subset(raw_df: pd.DataFrame) -> None:
+    dataset = TransactionDataset(raw_df)
+    subset = dataset.subset(dataset.frame["Сумма операции"] < 0)
+    assert len(subset) == 1
+    assert restore_source_format(subset.frame)["Номер карты"].tolist() == ["*7197"]
+
+
+def test_as_frame_and_as_records(raw_df: pd.DataFrame) -> None:
+    records = [{"Сумма операции": 1.0}]
+    assert as_records(records) is records
+    assert as_frame(raw_df) is raw_df
+    dataset = TransactionDataset(raw_df)
+    assert as_frame(dataset) is dataset.frame
+
+
+@patch("src.dataset.load_transactions")
+def test_dataset_from_file(mock_load_transactions: Mock, raw_df: pd.DataFrame) -> None:
+    mock_load_transactions.return_value = raw_df
+    dataset = TransactionDataset.from_file("operations.xls")
+    mock_load_transactions.assert_called_once_with("operations.xls", None)
+    assert len(dataset) == 2
+
+
+@pytest.mark.parametrize("ascending", [True, False])
+def test_date_index_monotonic_slice(ascending: bool) -> None:
+    dates = pd.Series(pd.date_range("2022-01-01", periods=5, freq="D")).sort_values(ascending=ascending)
+    index = DateIndex(dates.reset_index(drop=True))
+    positions = index.positions(datetime(2022, 1, 2), datetime(2022, 1, 4))
+    assert isinstance(positions, slice)
+    selected = dates.reset_index(drop=True).iloc[positions]
+    assert sorted(selected.dt.day.tolist()) == [2, 3]
+
+
+def test_date_index_unsorted_keeps_row_order() -> None:
+    dates = pd.Series(pd.to_datetime(["2022-01-03", "2022-01-01", None, "2022-01-02", "2022-01-05"]))
+    index = DateIndex(dates)
+    for start, end, expected in [
+        (None, datetime(2022, 1, 3), [1, 3]),
+        (datetime(2022, 1, 3), None, [0, 4]),
+        (datetime(2022, 1, 9), datetime(2022, 1, 1), []),
+    ]:
+        positions = index.positions(start, end)
+        assert isinstance(positions, np.ndarray)
+        assert positions.tolist() == expected
+
+
+def test_dataset_between(raw_df: pd.DataFrame) -> None:
+    dataset = TransactionDataset(raw_df)
+    assert len(dataset.between(end=datetime(2021, 12, 31))) == 1
+    assert len(dataset.between(start=datetime(2021, 12, 31), column="Дата платежа")) == 1
+    assert dataset.date_index() is dataset.date_index()
+
+
+@pytest.fixture
+def payments_df() -> pd.DataFrame:
+    return pd.DataFrame(
+        {
+            "Дата платежа": ["03.01.2022", "01.01.2022", None, "02.01.2022", "01.02.2022", "31.01.2022"],
+            "Категория": ["Еда", "Еда", "Еда", "Такси", "Еда", "Такси"],
+            "Сумма операции": [-1.0, -2.0, -4.0, -8.0, -16.0, -32.0],
+        }
+    )
+
+
+def test_store_window(payments_df: pd.DataFrame) -> None:
+    store = TransactionDataset(payments_df).store()
+    window = store.window(datetime(2022, 1, 1), datetime(2022, 1, 3))
+    assert window["Сумма операции"].tolist() == [-2.0, -8.0, -1.0]
+    assert store.window(datetime(2022, 1, 1), datetime(2022, 1, 3), include_end=False)["Сумма операции"].sum() == -10.0
+    assert len(store.window()) == 5
+
+
+def test_store_window_by_category(payments_df: pd.DataFrame) -> None:
+    store = TransactionDataset(payments_df).store()
+    window = store.window(datetime(2022, 1, 1), datetime(2022, 1, 31), category="Еда")
+    assert window["Сумма операции"].tolist() == [-2.0, -1.0]
+    lowered = store.window(category="такси", category_column="category_lower")
+    assert lowered["Сумма операции"].tolist() == [-8.0, -32.0]
+    assert store.window(category="Нет такой").empty
+
+
+def test_store_window_source_order(payments_df: pd.DataFrame) -> None:
+    store = TransactionDataset(payments_df).store()
+    window = store.window(datetime(2022, 1, 1), datetime(2022, 1, 31), category="Еда", source_order=True)
+    assert window["Сумма операции"].tolist() == [-1.0, -2.0]
+
+
+def test_store_month(payments_df: pd.DataFrame) -> None:
+    store = TransactionDataset(payments_df).store()
+    assert store.month(2022, 1)["Сумма операции"].sum() == -43.0
+    assert store.month(2022, 2)["Сумма операции"].tolist() == [-16.0]
+    assert store.month(2021, 12).empty
+
+
+def test_payment_window_dataframe_matches_dataset(payments_df: pd.DataFrame) -> None:
+    expected = payment_window(payments_df.copy(), datetime(2022, 1, 1), datetime(2022, 1, 31), "Еда")
+    dataset = TransactionDataset(payments_df)
+    actual = payment_window(dataset, datetime(2022, 1, 1), datetime(2022, 1, 31), "Еда", source_order=True)
+    assert actual["Сумма операции"].tolist() == expected["Сумма операции"].tolist()
+
+
+def test_dataset_from_files(tmp_path: Any, raw_df: pd.DataFrame) -> None:
+    for user in ("alice", "bob"):
+        (tmp_path / user).mkdir()
+        raw_df.to_csv(tmp_path / user / "2021-12.csv", index=False)
+    dataset = TransactionDataset.from_files(str(tmp_path / "*" / "*.csv"), max_workers=1)
+    # Выгрузка bob полностью совпадает с выгрузкой alice
+    assert len(dataset) == 2
+    assert dataset.frame["user"].tolist() == ["alice", "alice"]
+    assert dataset.frame["Дата операции"].iloc[0] == pd.Timestamp(2021, 12, 31, 16, 44)
+    assert len(dataset.search("супер")) == 1
+
+
+def statement(rows: int) -> pd.DataFrame:
+    """Выгрузка по убыванию даты: каждая операция на день раньше предыдущей."""
+    dates = pd.date_range("2021-12-31 12:00", periods=rows, freq="-1D")
+    return pd.DataFrame(
+        {
+            "Дата операции": dates.strftime("%d.%m.%Y %H:%M:%S"),
+            "Дата платежа": dates.strftime("%d.%m.%Y"),
+            "Номер карты": ["*7197", "*5091", np.nan] * (rows // 3) + ["*7197"] * (rows % 3),
+            "Категория": ["Супермаркеты", "Такси", "Переводы", "Фастфуд"] * (rows // 4) + ["Такси"] * (rows % 4),
+            "Описание": [f"Магазин {i % 5}" for i in range(rows)],
+            "Сумма операции": -np.arange(1, rows + 1, dtype=float),
+            "Сумма платежа": -np.arange(1, rows + 1, dtype=float),
+        }
+    )
+
+
+@patch.dict("src.dataset.ROLLUPS")
+def test_dataset_append_updates_structures() -> None:
+    register_rollup("count", lambda df: pd.DataFrame({"rows": [len(df)]}), lambda a, b: a + b)
+    full = statement(30)
+    dataset = TransactionDataset(full.iloc[10:].copy())
+    records, cube, index, tags = dataset.records(), dataset.cube(), dataset.text_index(), dataset.tags()
+    assert dataset.rollup("count")["rows"].iloc[0] == 20
+    dataset.between(end=datetime(2021, 12, 1))
+
+    assert dataset.append(full.iloc[:10]) is dataset
+    expected = TransactionDataset(full.copy())
+    # Выгрузка идет по убыванию даты — новые операции встают в начало
+    pd.testing.assert_frame_equal(dataset.frame, expected.frame)
+    assert dataset.records() is not records and dataset.records() == expected.records()
+    assert dataset.cube() is cube and cube.total() == expected.cube().total()
+    assert dataset.text_index() is index
+    assert dataset.search("магазин 3").frame.index.tolist() == expected.search("магазин 3").frame.index.tolist()
+    assert len(tags) == 20 and dataset.tags().tolist() == expected.tags().tolist()
+    assert dataset.rollup("count")["rows"].iloc[0] == 30
+    assert len(dataset.between(end=datetime(2021, 12, 1))) == len(expected.between(end=datetime(2021, 12, 1)))
+
+
+def test_dataset_derived_frames_roundtrip() -> None:
+    dataset = TransactionDataset(statement(12))
+    dataset.cube(), dataset.text_index(), dataset.tags()
+    frames = dataset.derived_frames()
+    assert {"cube", "text_codes", "text_values", "text_tokens", "text_trigrams"} <= set(frames)
+
+    restored = TransactionDataset(statement(12))
+    restored.restore_derived(frames)
+    assert restored.cube().total() == dataset.cube().total()
+    assert restored.search("магазин 1").frame.index.tolist() == dataset.search("магазин 1").frame.index.tolist()
@@ -0,0 +1,98 @@
+from typing import Any
+from unittest.mock import patch
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src import views
+from src.cache import load_frame, save_frame
+from src.dataset import TransactionDataset
+from src.ingest import IncrementalStore, advance_watermark, new_rows, row_fingerprints
+
+
+@pytest.fixture
+def full_statement() -> pd.DataFrame:
+    return pd.DataFrame(
+        {
+            "Дата операции": [
+                "02.01.2022 10:00:00",
+                "01.01.2022 12:00:00",
+                "01.01.2022 12:00:00",
+                "01.01.2022 12:00:00",
+                "31.12.2021 09:00:00",
+            ],
+            "Дата платежа": ["02.01.2022", "01.01.2022", "01.01.2022", "01.01.2022", "31.12.2021"],
+            "Номер карты": ["*7197", "*7197", "*7197", "*5091", np.nan],
+            "Категория": ["Такси", "Супермаркеты", "Супермаркеты", "Фастфуд", "Переводы"],
+            "Описание": ["Яндекс Такси", "Магнит", "Магнит", "Теремок", "Иван С."],
+            "Сумма операции": [-300.0, -100.0, -100.0, -250.0, -1000.0],
+            "Сумма платежа": [-300.0, -100.0, -100.0, -250.0, -1000.0],
+            "Бонусы (включая кэшбэк)": [6, 2, 2, 5, 0],
+        }
+    )
+
+
+def test_row_fingerprints_ignore_column_types(full_statement: pd.DataFrame) -> None:
+    cards = full_statement.iloc[4:]
+    # Пустая колонка карты читается из файла как float
+    assert row_fingerprints(cards) == row_fingerprints(cards.astype({"Номер карты": float}))
+
+
+def test_new_rows_after_watermark(full_statement: pd.DataFrame) -> None:
+    assert new_rows(full_statement, None).all()
+    # Старая выгрузка заканчивалась одной из двух одинаковых покупок в 12:00
+    old = full_statement.iloc[[2, 4]]
+    watermark = advance_watermark(None, old)
+    assert watermark is not None and watermark["last"] == "2022-01-01T12:00:00"
+    # Из двух одинаковых покупок новая только одна
+    assert new_rows(full_statement, watermark).tolist() == [True, False, True, True, False]
+
+    advanced = advance_watermark(watermark, full_statement.iloc[[1, 3]])
+    assert advanced is not None and len(advanced["fingerprints"]) == 3
+    assert new_rows(full_statement, advanced).tolist() == [True, False, False, False, False]
+
+
+def test_incremental_store(tmp_path: Any, full_statement: pd.DataFrame) -> None:
+    statement = str(tmp_path / "operations.csv")
+    full_statement.iloc[2:].to_csv(statement, index=False)
+    store = IncrementalStore(str(tmp_path / "state"))
+    dataset = store.ingest(statement)
+    assert len(dataset) == 3
+    cards = views.process_card_data(dataset)
+    dataset.cube(), dataset.text_index(), dataset.tags()
+    store.save()
+
+    # Следующий запуск: выгрузка дополнилась двумя операциями
+    full_statement.to_csv(statement, index=False)
+    store = IncrementalStore(str(tmp_path / "state"))
+    with patch("src.dataset.build_cube_rows") as build:
+        dataset = store.ingest(statement)
+        cube = dataset.cube()
+        # Куб из сохраненного состояния не перестраивается по всей истории
+        build.assert_not_called()
+    expected = TransactionDataset(full_statement.copy())
+    assert cube.total() == expected.cube().total()
+    assert len(dataset) == 5
+    assert views.process_card_data(dataset) == views.process_card_data(expected) != cards
+    assert dataset.records() == expected.records()
+    assert dataset.search("такси").records() == expected.search("такси").records()
+    assert dataset.tags().tolist() == expected.tags().tolist()
+    store.save()
+
+    # Повторный запуск без новых операций ничего не добавляет
+    assert len(IncrementalStore(str(tmp_path / "state")).ingest(statement)) == 5
+
+
+def test_incremental_store_ignores_other_generation(tmp_path: Any, full_statement: pd.DataFrame) -> None:
+    statement = str(tmp_path / "operations.csv")
+    full_statement.to_csv(statement, index=False)
+    store = IncrementalStore(str(tmp_path / "state"))
+    store.ingest(statement).cube()
+    store.save()
+    # Куб от прерванного сохранения (другое поколение) не используется
+    cube_path = str(tmp_path / "state" / "cube.npz")
+    rows, _ = load_frame(cube_path)
+    save_frame(rows.iloc[:0], cube_path, {"generation": "other"})
+    dataset = IncrementalStore(str(tmp_path / "state")).load()
+    assert dataset is not None and dataset.cube().total() == -1750.0
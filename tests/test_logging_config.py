@@ -0,0 +1,88 @@
+import logging
+import os
+from typing import Iterator
+from unittest.mock import patch
+
+import pytest
+
+import logging_config
+from logging_config import PAYLOAD_ITEMS, PAYLOAD_LIMIT, Payload, configure_logging, get_logger, shutdown_logging
+
+
+@pytest.fixture
+def log_file(tmp_path: str) -> Iterator[str]:
+    path = os.path.join(tmp_path, "test.log")
+    configure_logging(path, "DEBUG", sample_every=3)
+    yield path
+    configure_logging()
+
+
+def read_log(path: str) -> str:
+    shutdown_logging()
+    with open(path, encoding="utf-8") as f:
+        return f.read()
+
+
+def test_get_logger_registers_handler_once(log_file: str) -> None:
+    logger = get_logger("test_once")
+    get_logger("test_once")
+
+    logger.info("Сообщение %s", 1)
+
+    assert len(logger.handlers) == 1
+    assert read_log(log_file).count("Сообщение 1") == 1
+
+
+def test_messages_below_level_are_not_formatted(tmp_path: str) -> None:
+    path = os.path.join(tmp_path, "info.log")
+    configure_logging(path, "INFO")
+    try:
+        logger = get_logger("test_level")
+        with patch.object(Payload, "__str__", side_effect=AssertionError("formatted")):
+            logger.debug("Данные: %s", Payload([1, 2, 3]))
+        logger.info("Записано")
+        assert "Записано" in read_log(path)
+        assert "Данные" not in read_log(path)
+    finally:
+        configure_logging()
+
+
+def test_payload_sampling(log_file: str) -> None:
+    logger = get_logger("test_sampling")
+    for number in range(7):
+        logger.debug("Данные %s: %s", number, Payload([number]))
+    logger.debug("Без данных")
+    logger.debug("Без данных")
+
+    text = read_log(log_file)
+
+    assert [number for number in range(7) if f"Данные {number}:" in text] == [0, 3, 6]
+    assert text.count("Без данных") == 2
+
+
+def test_payload_truncates_items_and_length() -> None:
+    items = str(Payload(list(range(100))))
+    long_text = str(Payload("x" * (PAYLOAD_LIMIT + 10)))
+
+    assert items == f"{list(range(PAYLOAD_ITEMS))} ... (всего 100)"
+    assert long_text == "x" * PAYLOAD_LIMIT + f" ... ({PAYLOAD_LIMIT + 10} символов)"
+    assert str(Payload({"a": 1})) == "{'a': 1}"
+
+
+def test_records_after_shutdown_are_written_synchronously(log_file: str) -> None:
+    logger = get_logger("test_shutdown")
+    shutdown_logging()
+
+    logger.warning("После остановки")
+
+    assert "WARNING - После остановки" in read_log(log_file)
+
+
+def test_configure_logging_updates_existing_loggers(log_file: str) -> None:
+    logger = get_logger("test_reconfigure")
+    assert logger.level == logging.DEBUG
+
+    configure_logging(log_file, "WARNING")
+
+    assert logger.level == logging.WARNING
+    assert logging_config._queue_handler in logger.handlers
@@ -3,14 +3,42 @@ from unittest.mock import Mock, patch
 from src.main import main
 
 
+@patch("src.main.TransactionDataset")
 @patch("src.main.main_views")
 @patch("src.main.main_reports")
 @patch("src.main.main_services")
-def test_main(mock_main_services: Mock, mock_main_reports: Mock, mock_main_views: Mock) -> None:
+def test_main(
+    mock_main_services: Mock, mock_main_reports: Mock, mock_main_views: Mock, mock_dataset_cls: Mock
+) -> None:
     # Вызываем главную функцию
     main()
 
-    # Проверяем, что все три функции были вызваны
-    mock_main_views.assert_called_once()
-    mock_main_reports.assert_called_once()
-    mock_main_services.assert_called_once()
+    # Набор транзакций загружается один раз и передается во все три функции
+    dataset = mock_dataset_cls.from_file.return_value
+    mock_dataset_cls.from_file.assert_called_once()
+    mock_main_views.assert_called_once_with(dataset)
+    mock_main_reports.assert_called_once_with(dataset)
+    mock_main_services.assert_called_once_with(dataset)
+
+
+@patch("src.main.IncrementalStore")
+@patch("src.main.TransactionDataset")
+@patch("src.main.main_views")
+@patch("src.main.main_reports")
+@patch("src.main.main_services")
+def test_main_incremental(
+    mock_main_services: Mock,
+    mock_main_reports: Mock,
+    mock_main_views: Mock,
+    mock_dataset_cls: Mock,
+    mock_store_cls: Mock,
+) -> None:
+    main(incremental=True)
+
+    # Из выгрузки добавляются только новые операции, а накопленный набор сохраняется после обработки
+    store = mock_store_cls.return_value
+    dataset = store.ingest.return_value
+    mock_dataset_cls.from_file.assert_not_called()
+    mock_main_views.assert_called_once_with(dataset)
+    mock_main_services.assert_called_once_with(dataset)
+    store.save.assert_called_once_with(dataset)
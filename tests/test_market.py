@@ -0,0 +1,221 @@
+import json
+import sqlite3
+import threading
+import time
+from contextlib import closing
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Iterator, List
+from unittest.mock import Mock
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.market import (
+    MarketDataClient,
+    QuoteStore,
+    RatesSnapshot,
+    TTLCache,
+    convert_amounts,
+    load_user_settings,
+)
+
+DELAY = 0.2
+
+
+class StubRatesHandler(BaseHTTPRequestHandler):
+    """Локальная заглушка API курсов: /v4/latest/<базовая валюта>, знает только USD, отвечает с задержкой."""
+
+    requests_seen: List[str] = []
+
+    def do_GET(self) -> None:
+        currency = self.path.rsplit("/", 1)[-1]
+        self.requests_seen.append(currency)
+        time.sleep(DELAY)
+        if currency != "USD":
+            self.send_response(500)
+            self.end_headers()
+            return
+        body = json.dumps({"base": "USD", "rates": {"USD": 1, "RUB": 90.5, "EUR": 0.5, "CNY": 8.0}})
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.end_headers()
+        self.wfile.write(body.encode("utf-8"))
+
+    def log_message(self, format: str, *args: Any) -> None:
+        pass
+
+
+@pytest.fixture
+def stub_url() -> Iterator[str]:
+    StubRatesHandler.requests_seen = []
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubRatesHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}/v4/latest/{{currency}}"
+    server.shutdown()
+    server.server_close()
+
+
+def slow_stock_price(symbol: str) -> float:
+    time.sleep(DELAY)
+    return {"AAPL": 150.0, "TSLA": 250.0}.get(symbol, 100.0)
+
+
+def test_ttl_cache() -> None:
+    now = [0.0]
+    cache = TTLCache(ttl=10.0, clock=lambda: now[0])
+    cache.set("USD", 90.0)
+    assert cache.get("USD") == 90.0
+    now[0] = 10.0
+    assert cache.get("USD") is None
+
+
+def test_currency_rate_cached(stub_url: str) -> None:
+    client = MarketDataClient(stub_url, ttl=60.0)
+    assert client.currency_rate("USD") == 90.5
+    assert client.currency_rate("USD") == 90.5
+    assert StubRatesHandler.requests_seen == ["USD"]
+    client.close()
+
+
+def test_fetch_all_concurrent(stub_url: str) -> None:
+    client = MarketDataClient(stub_url, stock_fetcher=slow_stock_price)
+    started = time.perf_counter()
+    quotes = client.fetch_all(["USD", "EUR"], ["AAPL", "AMZN", "GOOGL", "MSFT", "TSLA"])
+    elapsed = time.perf_counter() - started
+
+    assert quotes["currency_rates"] == [{"currency": "USD", "rate": 90.5}, {"currency": "EUR", "rate": 181.0}]
+    # Все курсы получены из одного снимка
+    assert StubRatesHandler.requests_seen == ["USD"]
+    assert quotes["stock_prices"][0] == {"stock": "AAPL", "price": 150.0}
+    assert len(quotes["stock_prices"]) == 5
+    # Последовательно вышло бы 7 * DELAY
+    assert elapsed < 4 * DELAY
+    client.close()
+
+
+def test_fetch_all_uses_cache_and_skips_failures(stub_url: str) -> None:
+    fetcher = Mock(return_value=150.0)
+    client = MarketDataClient(stub_url, stock_fetcher=fetcher)
+    first = client.fetch_all(["USD", "XXX"], ["AAPL"])
+    assert first["currency_rates"][1] == {"currency": "XXX", "rate": None}
+
+    second = client.fetch_all(["USD", "XXX"], ["AAPL"])
+    assert second == first
+    # Курсы (и отсутствие XXX) берутся из закэшированного снимка, повторных запросов нет
+    assert StubRatesHandler.requests_seen == ["USD"]
+    fetcher.assert_called_once_with("AAPL")
+    client.close()
+
+
+def test_load_user_settings(tmp_path: Any) -> None:
+    settings_file = tmp_path / "user_settings.json"
+    settings_file.write_text(json.dumps({"user_currencies": ["USD"], "user_stocks": ["AAPL"]}), encoding="utf-8")
+    assert load_user_settings(str(settings_file)) == {"user_currencies": ["USD"], "user_stocks": ["AAPL"]}
+    assert load_user_settings(str(tmp_path / "missing.json")) == {}
+
+
+def test_quote_store(tmp_path: Any) -> None:
+    now = [1000.0]
+    store = QuoteStore(str(tmp_path / "cache" / "quotes.sqlite3"), clock=lambda: now[0])
+    assert store.get("currency", "USD") is None
+    store.put("currency", "USD", 90.5)
+    now[0] = 1060.0
+    assert store.get("currency", "USD") == (90.5, 60.0)
+
+    # Новая котировка заменяет прежнюю: строки не накапливаются
+    now[0] = 1000.0 + 2 * 24 * 3600
+    store.put("currency", "USD", 91.0)
+    assert store.get("currency", "USD") == (91.0, 0.0)
+    with closing(sqlite3.connect(store.path)) as connection:
+        assert connection.execute("SELECT COUNT(*) FROM quotes").fetchone() == (1,)
+
+
+def test_quote_store_migrates_daily_table(tmp_path: Any) -> None:
+    path = str(tmp_path / "quotes.sqlite3")
+    with closing(sqlite3.connect(path)) as connection, connection:
+        connection.execute(
+            "CREATE TABLE quotes (kind TEXT NOT NULL, symbol TEXT NOT NULL, day TEXT NOT NULL, "
+            "value REAL NOT NULL, fetched_at REAL NOT NULL, PRIMARY KEY (kind, symbol, day))"
+        )
+        connection.executemany(
+            "INSERT INTO quotes VALUES (?, ?, ?, ?, ?)",
+            [("currency", "USD", "2024-01-01", 90.0, 100.0), ("currency", "USD", "2024-01-02", 91.0, 200.0)],
+        )
+
+    store = QuoteStore(path, clock=lambda: 260.0)
+
+    assert store.get("currency", "USD") == (91.0, 60.0)
+    store.put("currency", "USD", 92.0)
+    assert store.get("currency", "USD") == (92.0, 0.0)
+
+
+def test_store_shared_between_clients(stub_url: str, tmp_path: Any) -> None:
+    path = str(tmp_path / "quotes.sqlite3")
+    first = MarketDataClient(stub_url, store=QuoteStore(path))
+    assert first.currency_rate("USD") == 90.5
+    first.close()
+
+    # Новый клиент (например, другой процесс) берет свежую котировку с диска, без запроса к API
+    second = MarketDataClient(stub_url, store=QuoteStore(path))
+    assert second.currency_rate("USD") == 90.5
+    assert StubRatesHandler.requests_seen == ["USD"]
+    second.close()
+
+
+def test_stale_quote_served_and_refreshed(tmp_path: Any) -> None:
+    now = [0.0]
+    store = QuoteStore(str(tmp_path / "quotes.sqlite3"), clock=lambda: now[0])
+    store.put("stock", "AAPL", 100.0)
+    now[0] = 400.0
+    refreshed = threading.Event()
+
+    def fetcher(symbol: str) -> float:
+        refreshed.set()
+        return 150.0
+
+    client = MarketDataClient(stock_fetcher=fetcher, store=store, ttl=300.0, stale_ttl=3600.0)
+    assert client.stock_price("AAPL") == 100.0
+    assert refreshed.wait(5)
+    client.close()
+    for _ in range(50):
+        if store.get("stock", "AAPL") == (150.0, 0.0):
+            break
+        time.sleep(0.02)
+    assert store.get("stock", "AAPL") == (150.0, 0.0)
+
+
+def test_last_known_good_on_failure(tmp_path: Any) -> None:
+    now = [0.0]
+    store = QuoteStore(str(tmp_path / "quotes.sqlite3"), clock=lambda: now[0])
+    store.put("stock", "AAPL", 100.0)
+    now[0] = 10 * 24 * 3600.0
+
+    client = MarketDataClient(stock_fetcher=Mock(side_effect=ConnectionError("timeout")), store=store)
+    assert client.stock_price("AAPL") == 100.0
+    assert client.fetch_all([], ["AAPL", "TSLA"])["stock_prices"] == [
+        {"stock": "AAPL", "price": 100.0},
+        {"stock": "TSLA", "price": None},
+    ]
+    client.close()
+
+
+def test_rates_snapshot() -> None:
+    snapshot = RatesSnapshot("USD", {"RUB": 90.0, "EUR": 0.9})
+    assert snapshot.rate("USD") == 90.0
+    assert snapshot.rate("EUR") == pytest.approx(100.0)
+    assert snapshot.rate("RUB", "USD") == pytest.approx(1 / 90.0)
+    with pytest.raises(KeyError):
+        snapshot.rate("XXX")
+
+
+def test_convert_amounts() -> None:
+    snapshot = RatesSnapshot("USD", {"RUB": 90.0, "EUR": 0.9})
+    df = pd.DataFrame(
+        {"Сумма операции": [-100.0, -10.0, -9.0, -5.0, -1.0], "Валюта операции": ["RUB", "USD", "EUR", "XXX", None]}
+    )
+    converted = convert_amounts(df, snapshot)
+    assert converted.iloc[:3].tolist() == pytest.approx([-100.0, -900.0, -900.0])
+    assert np.isnan(converted.iloc[3]) and np.isnan(converted.iloc[4])
+    assert convert_amounts(df, snapshot, "USD").iloc[0] == pytest.approx(-100 / 90.0)
@@ -0,0 +1,153 @@
+import json
+import os
+import pstats
+from typing import Any, Dict, Iterator, List
+from unittest.mock import patch
+
+import numpy as np
+import pandas as pd
+
+from src.profiling import ProfileRun, format_report, main, profile_run, profiled, stage
+
+
+def stages(run: ProfileRun) -> Dict[str, Dict[str, Any]]:
+    return {stats["name"]: stats for stats in run.report()["stages"]}
+
+
+def test_profiled_returns_function_when_disabled() -> None:
+    def function() -> int:
+        return 1
+
+    with patch("src.profiling.PROFILE", False), patch("src.profiling._run", None):
+        assert profiled(function) is function
+        assert stage("first") is stage("second")
+        with profile_run("test") as run:
+            assert run is None
+
+
+@patch("src.profiling.PROFILE", True)
+def test_profiled_records_nested_stages(tmp_path: str) -> None:
+    @profiled
+    def inner(df: pd.DataFrame) -> List[int]:
+        return list(range(len(df) // 2))
+
+    @profiled
+    def outer(df: pd.DataFrame) -> pd.DataFrame:
+        inner(df)
+        inner(df)
+        return df.head(3)
+
+    with profile_run("test", str(tmp_path)) as run:
+        assert run is not None
+        outer(pd.DataFrame({"a": range(10)}))
+        with stage("block"):
+            inner(pd.DataFrame({"a": range(4)}))
+
+    result = stages(run)
+    inner_stats = result["test_profiling.test_profiled_records_nested_stages.<locals>.inner"]
+    outer_stats = result["test_profiling.test_profiled_records_nested_stages.<locals>.outer"]
+    assert inner_stats["calls"] == 3
+    assert inner_stats["rows_in"] == 24
+    assert inner_stats["rows_out"] == 12
+    assert outer_stats["calls"] == 1
+    assert outer_stats["rows_in"] == 10
+    assert outer_stats["rows_out"] == 3
+    # Собственное время внешнего этапа не включает время вложенных
+    assert 0 <= outer_stats["self_wall_s"] <= outer_stats["wall_s"]
+    assert result["block"]["calls"] == 1
+    assert "rows_in" not in result["block"]
+
+    (name,) = os.listdir(tmp_path)
+    with open(os.path.join(tmp_path, name), encoding="utf-8") as f:
+        report = json.load(f)
+    assert report["run"] == "test"
+    assert {stats["name"] for stats in report["stages"]} == set(result)
+
+
+@patch("src.profiling.PROFILE", True)
+def test_profiled_records_exceptions() -> None:
+    @profiled
+    def failing() -> None:
+        raise ValueError("ошибка")
+
+    run = ProfileRun("test", memory=False, cprofile=False)
+    with patch("src.profiling._run", run):
+        try:
+            failing()
+        except ValueError:
+            pass
+
+    assert stages(run)["test_profiling.test_profiled_records_exceptions.<locals>.failing"]["calls"] == 1
+
+
+@patch("src.profiling.PROFILE", True)
+def test_profiled_generator_counts_yielded_rows() -> None:
+    @profiled
+    def chunks(count: int) -> Iterator[pd.DataFrame]:
+        for _ in range(count):
+            yield pd.DataFrame({"a": range(5)})
+
+    run = ProfileRun("test", memory=False, cprofile=False)
+    with patch("src.profiling._run", run):
+        assert len(list(chunks(3))) == 3
+
+    stats = stages(run)["test_profiling.test_profiled_generator_counts_yielded_rows.<locals>.chunks"]
+    assert stats["calls"] == 1
+    assert stats["rows_out"] == 15
+
+
+def test_memory_deltas_of_nested_stages() -> None:
+    run = ProfileRun("test", memory=True, cprofile=False)
+    run.start()
+    with patch("src.profiling._run", run):
+        with stage("outer"):
+            kept = np.ones(2**20)  # 8 МБ остаются после этапа
+            with stage("inner"):
+                temporary = np.ones(2**21)  # 16 МБ освобождаются внутри этапа
+                del temporary
+    run.stop()
+
+    result = stages(run)
+    assert 7.5 < result["outer"]["alloc_mb"] < 9
+    assert abs(result["inner"]["alloc_mb"]) < 1
+    assert result["inner"]["peak_mb"] >= 15.5
+    # Пик внешнего этапа включает пик вложенного
+    assert result["outer"]["peak_mb"] >= result["inner"]["peak_mb"] + 7.5
+    assert len(kept) == 2**20
+
+
+def test_cprofile_output(tmp_path: str) -> None:
+    with patch("src.profiling.PROFILE_CPROFILE", True):
+        with profile_run("cprofile", str(tmp_path), enabled=True):
+            sorted(range(1000))
+
+    (name,) = [name for name in os.listdir(tmp_path) if name.endswith(".json")]
+    with open(os.path.join(tmp_path, name), encoding="utf-8") as f:
+        report = json.load(f)
+    assert report["pstats"].endswith(".pstats")
+    assert "<built-in method builtins.sorted>" in pstats.Stats(report["pstats"]).get_stats_profile().func_profiles
+
+
+def test_format_report_and_main(tmp_path: str, capsys: Any) -> None:
+    report = {
+        "run": "main",
+        "started": "2024-01-01T12:00:00",
+        "wall_s": 1.5,
+        "cpu_s": 1.25,
+        "stages": [
+            {"name": "utils.read_xlsx", "calls": 1, "wall_s": 1.0, "self_wall_s": 1.0, "rows_out": 100},
+            {"name": "views.cashback", "calls": 4, "wall_s": 0.001, "self_wall_s": 0.001},
+        ],
+    }
+    path = os.path.join(tmp_path, "report.json")
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(report, f)
+
+    table = format_report(report, limit=1)
+    assert len(table.splitlines()) == 2
+    assert "utils.read_xlsx" in table and "views.cashback" not in table
+
+    assert main([path]) == 0
+    output = capsys.readouterr().out
+    assert "main (2024-01-01T12:00:00): wall 1.5000 с" in output
+    assert "views.cashback" in output
@@ -0,0 +1,59 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.ranking import top_chunks, top_frame, top_positions, top_records
+
+
+@pytest.fixture
+def operations() -> list[dict]:
+    return [
+        {"Дата операции": "01.01.2022 12:00:00", "Номер карты": "*1111", "Сумма операции": -100.0},
+        {"Дата операции": "02.01.2022 12:00:00", "Номер карты": "*2222", "Сумма операции": -300.0},
+        {"Дата операции": "03.01.2022 12:00:00", "Номер карты": "*1111", "Сумма операции": 300.0},
+        {"Дата операции": "04.01.2022 12:00:00", "Номер карты": "*2222", "Сумма операции": -50.0},
+        {"Дата операции": "05.01.2022 12:00:00", "Номер карты": "*1111", "Сумма операции": -200.0},
+    ]
+
+
+def test_top_positions_partial_selection() -> None:
+    amounts = np.array([5.0, -9.0, 1.0, 7.0, np.nan])
+    assert top_positions(amounts, 2).tolist() == [1, 3]
+    assert top_positions(amounts, 10).tolist() == [1, 3, 0, 2, 4]
+    assert top_positions(amounts, 0).tolist() == []
+
+
+def test_top_records_tie_break_by_date(operations: list[dict]) -> None:
+    result = top_records(operations, 3)
+    assert [r["Сумма операции"] for r in result] == [300.0, -300.0, -200.0]
+
+
+def test_top_records_grouped(operations: list[dict]) -> None:
+    result = top_records(iter(operations), 1, group_by="Номер карты")
+    assert [(r["Номер карты"], r["Сумма операции"]) for r in result] == [("*1111", 300.0), ("*2222", -300.0)]
+
+
+def test_top_frame_matches_records(operations: list[dict]) -> None:
+    df = pd.DataFrame(operations)
+    assert top_frame(df, 3).to_dict(orient="records") == top_records(operations, 3)
+    grouped = top_frame(df, 2, group_by="Номер карты").to_dict(orient="records")
+    assert grouped == top_records(operations, 2, group_by="Номер карты")
+
+
+def test_top_frame_categorical_groups(operations: list[dict]) -> None:
+    operations[3]["Номер карты"] = None
+    df = pd.DataFrame(operations).astype({"Номер карты": "category"})
+    grouped = top_frame(df, 1, group_by="Номер карты")
+    # Группы в порядке первого появления, операции без карты — отдельная группа
+    assert grouped["Сумма операции"].tolist() == [300.0, -300.0, -50.0]
+
+
+def test_top_chunks(operations: list[dict]) -> None:
+    df = pd.DataFrame(operations)
+    chunks = (df.iloc[i : i + 2] for i in range(0, len(df), 2))
+    result = top_chunks(chunks, 2)
+    assert result["Сумма операции"].tolist() == [300.0, -300.0]
+
+
+def test_top_chunks_empty() -> None:
+    assert top_chunks([], 5).empty
@@ -1,12 +1,13 @@
 import json
 import logging
 from datetime import datetime
-from typing import Any
+from typing import Any, Callable, List, Tuple
 from unittest.mock import patch
 
 import pandas as pd
 import pytest
 
+from src.cube import ExpenseCube
 from src.reports import category_expenses_report, weekday_expenses_report, weekday_vs_weekend_expenses_report
 
 # Настройка логирования для тестирования
@@ -53,3 +54,16 @@ def test_weekday_vs_weekend_expenses_report(mock_logger: Any, sample_df: pd.Data
     result = weekday_vs_weekend_expenses_report(sample_df, start_date)
     assert json.loads(result) == expected_result
     mock_logger.debug.assert_called()
+
+
+# Тест отчетов по кубу, собранному из потока чанков
+@patch("src.reports.reports_logger")
+def test_reports_from_chunked_cube(mock_logger: Any, sample_df: pd.DataFrame) -> None:
+    cube = ExpenseCube.from_chunks([sample_df.iloc[:2], sample_df.iloc[2:]])
+    reports: List[Tuple[Callable[..., str], Tuple[str, ...]]] = [
+        (category_expenses_report, ("food", "2020-01-01")),
+        (weekday_expenses_report, ("2020-01-01",)),
+        (weekday_vs_weekend_expenses_report, ("2020-01-01",)),
+    ]
+    for report, args in reports:
+        assert json.loads(report(cube, *args)) == json.loads(report(sample_df, *args))
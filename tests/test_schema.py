@@ -0,0 +1,56 @@
+import numpy as np
+import pandas as pd
+
+from src.dataset import TransactionDataset
+from src.schema import compact_frame, memory_report
+
+
+def make_frame(rows: int = 100) -> pd.DataFrame:
+    return pd.DataFrame(
+        {
+            "Статус": ["OK", "FAILED"] * (rows // 2),
+            "Описание": [f"Операция {i}" for i in range(rows)],
+            "Категория": ["Супермаркеты", None] * (rows // 2),
+            "Бонусы (включая кэшбэк)": np.arange(rows, dtype=np.int64),
+            "Сумма операции": np.linspace(-100.0, 100.0, rows),
+        }
+    )
+
+
+def test_compact_frame_types() -> None:
+    df = make_frame()
+    compact = compact_frame(df)
+    assert isinstance(compact["Статус"].dtype, pd.CategoricalDtype)
+    assert isinstance(compact["Категория"].dtype, pd.CategoricalDtype)
+    assert pd.isna(compact["Категория"].iloc[1])
+    # Почти все описания уникальны — колонка остается строковой
+    assert compact["Описание"].dtype == object
+    assert compact["Бонусы (включая кэшбэк)"].dtype == np.int8
+    assert compact["Сумма операции"].dtype == np.float64
+    assert compact["Статус"].tolist() == df["Статус"].tolist()
+    # Исходный DataFrame не меняется
+    assert df["Статус"].dtype == object
+
+
+def test_compact_frame_no_changes() -> None:
+    df = pd.DataFrame({"Сумма операции": [1.5, 2.5]})
+    assert compact_frame(df) is df
+
+
+def test_memory_report() -> None:
+    df = make_frame(1000)
+    before = memory_report(df)
+    assert before["total_bytes"] == int(df.memory_usage(deep=True).sum())
+    after = memory_report(compact_frame(df))
+    assert before["rows"] == after["rows"] == 1000
+    assert after["columns"]["Статус"]["dtype"] == "category"
+    assert after["columns"]["Статус"]["bytes"] < before["columns"]["Статус"]["bytes"] / 5
+    assert after["total_bytes"] < before["total_bytes"]
+
+
+def test_dataset_memory_usage() -> None:
+    dataset = TransactionDataset(make_frame().assign(**{"Номер карты": "*7197"}))
+    report = dataset.memory_usage()
+    assert report["columns"]["Номер карты"]["dtype"] == "category"
+    assert report["columns"]["last_digits"]["dtype"] == "category"
+    assert dataset.frame["last_digits"].iloc[0] == "7197"
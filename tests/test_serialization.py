@@ -0,0 +1,108 @@
+import json
+from datetime import datetime
+from unittest.mock import patch
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.serialization import dumps, frame_to_json
+
+
+@pytest.fixture
+def operations() -> pd.DataFrame:
+    return pd.DataFrame(
+        {
+            "Дата операции": ["01.01.2024 10:00:00", "02.01.2024 11:00:00"],
+            "Сумма операции": [-100.5, np.nan],
+            "Описание": ['Оплата "кафе": 1/2', "Перевод\\"],
+            "Кэшбэк": [1, 2],
+        }
+    )
+
+
+@pytest.mark.parametrize("use_orjson", [True, False])
+def test_dumps_converts_special_values(use_orjson: bool) -> None:
+    data = {
+        "date": datetime(2024, 1, 2, 3, 4, 5),
+        "nan": float("nan"),
+        "nat": pd.NaT,
+        "int": np.int64(5),
+        "float": np.float64(1.5),
+        "array": np.array([1, 2]),
+    }
+    with patch("src.serialization.orjson", None) if not use_orjson else patch.dict({}):
+        result = json.loads(dumps(data))
+    assert result == {
+        "date": "2024-01-02T03:04:05",
+        "nan": None,
+        "nat": None,
+        "int": 5,
+        "float": 1.5,
+        "array": [1, 2],
+    }
+
+
+def test_dumps_keeps_nan_inside_strings() -> None:
+    with patch("src.serialization.orjson", None):
+        assert json.loads(dumps({"NaN": "NaN", "value": float("inf")})) == {"NaN": "NaN", "value": None}
+
+
+@pytest.mark.parametrize("indent", [None, 2, 4])
+@pytest.mark.parametrize("ensure_ascii", [False, True])
+def test_dumps_matches_json_format(indent: int, ensure_ascii: bool) -> None:
+    data = [{"Категория": "Супермаркеты", "Сумма": 10.25, "Теги": ["а/б"]}]
+    expected = json.dumps(data, indent=indent, ensure_ascii=ensure_ascii)
+    if indent is None and not ensure_ascii:
+        # Компактный вывод orjson — без пробелов после разделителей
+        expected = json.dumps(data, ensure_ascii=ensure_ascii, separators=(",", ":"))
+    assert dumps(data, indent=indent, ensure_ascii=ensure_ascii) == expected
+
+
+@pytest.mark.parametrize("indent", [None, 2, 4])
+@pytest.mark.parametrize("ensure_ascii", [False, True])
+def test_frame_to_json_matches_json_format(operations: pd.DataFrame, indent: int, ensure_ascii: bool) -> None:
+    result = frame_to_json(operations, indent=indent, ensure_ascii=ensure_ascii)
+
+    records = json.loads(result)
+    separators = (",", ":") if indent is None else None
+    assert result == json.dumps(records, indent=indent, ensure_ascii=ensure_ascii, separators=separators)
+    assert records[0]["Описание"] == 'Оплата "кафе": 1/2'
+    assert records[1]["Сумма операции"] is None
+    assert records[1]["Кэшбэк"] == 2
+
+
+def test_frame_to_json_column_ending_with_backslash(operations: pd.DataFrame) -> None:
+    operations["Примечание\\"] = ['":', "x"]
+
+    result = frame_to_json(operations, indent=4)
+
+    assert result == json.dumps(json.loads(result), indent=4, ensure_ascii=False)
+
+
+@pytest.mark.parametrize("indent", [2, 4])
+def test_frame_to_json_indented_nested_values(indent: int) -> None:
+    df = pd.DataFrame(
+        {
+            "Теги{0}": [["а", {"б": [1]}], [], None],
+            "Флаг": [True, False, None],
+            "Сумма": [1e-05, -0.0, np.nan],
+            "Смешанное": [1, "x", 2.5],
+        }
+    )
+
+    result = frame_to_json(df, indent=indent)
+
+    assert result == json.dumps(json.loads(result), indent=indent, ensure_ascii=False)
+    assert json.loads(result) == json.loads(frame_to_json(df))
+
+
+def test_frame_to_json_empty() -> None:
+    assert frame_to_json(pd.DataFrame({"a": []}), indent=4) == "[]"
+    assert frame_to_json(pd.DataFrame(index=range(2)), indent=4) == frame_to_json(pd.DataFrame(index=range(2)))
+
+
+def test_frame_to_json_dates_iso() -> None:
+    df = pd.DataFrame({"date": pd.to_datetime(["2024-01-02 03:04:05", None])})
+
+    assert json.loads(frame_to_json(df)) == [{"date": "2024-01-02T03:04:05"}, {"date": None}]
@@ -0,0 +1,190 @@
+import asyncio
+import json
+from typing import Any, Dict, List, Tuple
+from unittest.mock import Mock, patch
+from urllib.parse import quote
+
+import pytest
+
+from src.dataset import TransactionDataset
+from src.reports import category_expenses_report
+from src.server import TransactionService, start_server, warm_up
+from src.services import get_expenses, invest_piggy_bank
+from src.synthetic import generate_operations
+
+
+@pytest.fixture(scope="module")
+def dataset() -> TransactionDataset:
+    dataset = TransactionDataset(generate_operations(2000, seed=1))
+    warm_up(dataset)
+    return dataset
+
+
+@pytest.fixture
+def service(dataset: TransactionDataset) -> TransactionService:
+    return TransactionService(dataset)
+
+
+def request(service: TransactionService, target: str, method: str = "GET") -> Tuple[int, Any]:
+    status, body = asyncio.run(service.handle(method, target))
+    return status, json.loads(body)
+
+
+def test_endpoints_match_functions(service: TransactionService, dataset: TransactionDataset) -> None:
+    category = quote("Супермаркеты")
+
+    assert request(service, f"/expenses?category={category}&date=2021-06-01") == (
+        200,
+        json.loads(get_expenses(dataset, "Супермаркеты", "2021-06-01")),
+    )
+    assert request(service, f"/reports/category/?category={category}&start_date=2021-01-01") == (
+        200,
+        json.loads(category_expenses_report(dataset, "Супермаркеты", "2021-01-01")),
+    )
+    assert request(service, "/cashback/piggy-bank?limit=10&limit=100&year=2021") == (
+        200,
+        json.loads(invest_piggy_bank(None, dataset, [10.0, 100.0], 2021)),
+    )
+    assert request(service, "/health") == (200, {"status": "ok", "transactions": 2000})
+
+    status, page = request(service, "/index?date=" + quote("2021-06-01 10:00:00"))
+    assert status == 200
+    assert page["greeting"] == "Доброе утро!"
+    assert page["cards"]
+
+    status, found = request(service, "/transactions?q=" + quote("магнит"))
+    assert status == 200
+    assert found and all("Магнит" in operation["Описание"] for operation in found)
+
+    status, ranking = request(service, "/cashback/categories?year=2021&month=6")
+    assert status == 200
+    assert ranking["month"] == 6 and ranking["categories"]
+
+    status, report = request(service, "/reports/weekday-vs-weekend?start_date=2021-01-01")
+    assert status == 200 and set(report) == {"weekday_expenses", "weekend_expenses", "period"}
+    assert request(service, "/reports/weekday")[0] == 200
+
+
+@pytest.mark.parametrize(
+    "target, method, status",
+    [
+        ("/expenses", "GET", 400),
+        ("/index?date=2021-06-01", "GET", 400),
+        ("/reports/category?category=x&start_date=01.01.2021", "GET", 400),
+        ("/cashback/categories?year=2021&month=июнь", "GET", 400),
+        ("/cashback/piggy-bank?limit=много", "GET", 400),
+        ("/cashback/piggy-bank?limit=10&month=6", "GET", 400),
+        ("/unknown", "GET", 404),
+        ("/health", "POST", 405),
+    ],
+)
+def test_request_errors(service: TransactionService, target: str, method: str, status: int) -> None:
+    result_status, body = request(service, target, method)
+    assert result_status == status
+    assert "error" in body
+
+
+def test_responses_are_cached(dataset: TransactionDataset) -> None:
+    service = TransactionService(dataset, cache_size=1)
+    with patch("src.server.get_expenses", return_value='{"total_expenses": 1}') as mock_get_expenses:
+        request(service, "/expenses?category=a&date=2021-06-01")
+        request(service, "/expenses?date=2021-06-01&category=a")
+        assert mock_get_expenses.call_count == 1
+
+        # Кэш хранит cache_size последних ответов
+        request(service, "/expenses?category=b&date=2021-06-01")
+        request(service, "/expenses?category=a&date=2021-06-01")
+        assert mock_get_expenses.call_count == 3
+
+        service.clear_cache()
+        request(service, "/expenses?category=a&date=2021-06-01")
+        assert mock_get_expenses.call_count == 4
+
+        # Без даты траты считаются до текущего момента, поэтому ответ не кэшируется
+        request(service, "/expenses?category=a")
+        request(service, "/expenses?category=a")
+        assert mock_get_expenses.call_count == 6
+
+
+@patch("src.server.load_user_settings", return_value={"user_currencies": ["USD"], "user_stocks": []})
+@patch("src.server.market_client")
+def test_quotes_are_not_cached(mock_client: Mock, mock_settings: Mock, service: TransactionService) -> None:
+    mock_client.fetch_all.return_value = {"currency_rates": [{"currency": "USD", "rate": 75.0}], "stock_prices": []}
+
+    assert request(service, "/quotes") == (200, mock_client.fetch_all.return_value)
+    request(service, "/quotes")
+
+    assert mock_client.fetch_all.call_count == 2
+    mock_client.fetch_all.assert_called_with(["USD"], [])
+
+
+@patch("src.server.get_expenses", side_effect=RuntimeError("сбой"))
+def test_internal_error(mock_get_expenses: Mock, service: TransactionService) -> None:
+    assert request(service, "/expenses?category=a") == (500, {"error": "Внутренняя ошибка сервиса"})
+
+
+@patch("src.server.index_page", return_value='{"error": "An error occurred while processing the request."}')
+def test_index_error_is_not_cached(mock_index_page: Mock, service: TransactionService) -> None:
+    target = "/index?date=" + quote("2021-06-01 10:00:00")
+
+    assert request(service, target)[0] == 500
+    assert request(service, target)[0] == 500
+    assert mock_index_page.call_count == 2
+
+
+async def _exchange(service: TransactionService, payload: bytes) -> List[Tuple[int, Dict[str, str], bytes]]:
+    """Отправляет запросы одним соединением и читает ответы до закрытия соединения сервером."""
+    server = await start_server(service, "127.0.0.1", 0)
+    port = server.sockets[0].getsockname()[1]
+    async with server:
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        writer.write(payload)
+        await writer.drain()
+        responses = []
+        while True:
+            try:
+                head = await reader.readuntil(b"\r\n\r\n")
+            except asyncio.IncompleteReadError:
+                break
+            lines = head.decode("latin-1").split("\r\n")
+            headers = dict(line.split(": ", 1) for line in lines[1:] if line)
+            body = b"" if payload.startswith(b"HEAD") else await reader.readexactly(int(headers["Content-Length"]))
+            responses.append((int(lines[0].split(" ")[1]), headers, body))
+        writer.close()
+    return responses
+
+
+def test_http_keep_alive(service: TransactionService) -> None:
+    payload = (
+        b"GET /health HTTP/1.1\r\nHost: localhost\r\n\r\n"
+        b"GET /nope HTTP/1.1\r\nHost: localhost\r\n\r\n"
+        b"GET /health HTTP/1.1\r\nHost: localhost\r\nConnection: close\r\n\r\n"
+    )
+
+    responses = asyncio.run(_exchange(service, payload))
+
+    assert [status for status, _, _ in responses] == [200, 404, 200]
+    assert json.loads(responses[0][2]) == {"status": "ok", "transactions": 2000}
+    assert responses[0][1]["Content-Type"] == "application/json; charset=utf-8"
+    assert responses[0][1]["Connection"] == "keep-alive"
+    assert responses[2][1]["Connection"] == "close"
+
+
+def test_http_raw_utf8_target(service: TransactionService, dataset: TransactionDataset) -> None:
+    target = "/expenses?category=Супермаркеты&date=2021-06-01"
+    payload = f"GET {target} HTTP/1.1\r\nConnection: close\r\n\r\n".encode("utf-8")
+
+    ((status, _, body),) = asyncio.run(_exchange(service, payload))
+
+    assert status == 200
+    assert json.loads(body) == json.loads(get_expenses(dataset, "Супермаркеты", "2021-06-01"))
+
+
+def test_http_head_and_http_1_0(service: TransactionService) -> None:
+    responses = asyncio.run(_exchange(service, b"HEAD /health HTTP/1.0\r\n\r\n"))
+
+    ((status, headers, body),) = responses
+    assert status == 200
+    assert int(headers["Content-Length"]) > 0
+    assert headers["Connection"] == "close"
+    assert body == b""
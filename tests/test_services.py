@@ -1,11 +1,25 @@
 import json
 from datetime import datetime
+from typing import Any, Dict, List
 from unittest.mock import MagicMock, mock_open, patch
 
 import pandas as pd
 import pytest
 
-from src.services import get_expenses, get_transactions, main_services
+from src.dataset import TransactionDataset
+from src.services import (
+    beneficial_cashback_categories,
+    get_expenses,
+    get_transactions,
+    get_transactions_batch,
+    invest_piggy_bank,
+    main_services,
+    person_to_person_search,
+    phone_number_search,
+    piggy_bank_savings,
+    search_by_tag,
+    simple_search,
+)
 
 
 # Фикстура для имитации данных Excel
@@ -167,16 +181,13 @@ def mock_transactions_data() -> dict:
 @patch("builtins.input", side_effect=["Такси", "Супермаркет", "2021-12-31"])
 @patch("src.services.get_transactions")
 @patch("src.services.get_expenses")
-@patch("src.services.read_xlsx")
+@patch("src.services.TransactionDataset")
 def test_main_services(
-    mock_read_xlsx: MagicMock,  # mock для функции чтения Excel
+    mock_dataset_cls: MagicMock,  # mock для загрузки набора транзакций
     mock_get_expenses: MagicMock,  # mock для функции получения расходов
     mock_get_transactions: MagicMock,  # mock для функции получения транзакций
-    mock_transactions_data: dict,  # имитация данных транзакций
+    mock_input: MagicMock,
 ) -> None:
-    # Задаем возвращаемое значение для функции read_xlsx
-    mock_read_xlsx.return_value = pd.DataFrame(mock_transactions_data)  # Исправлено, убраны скобки
-
     # Задаем ожидаемые результаты для мока функций
     mock_get_transactions.return_value = json.dumps([{"Описание": "Поездка на такси", "Категория": "Транспорт"}])
     mock_get_expenses.return_value = json.dumps(
@@ -186,9 +197,197 @@ def test_main_services(
     # Запускаем основную функцию
     main_services()
 
-    # Проверяем, что функции были вызваны с ожидаемыми аргументами
-    mock_get_transactions.assert_called_once_with("Такси")
-    mock_get_expenses.assert_called_once_with(mock_read_xlsx.return_value, "Супермаркет", "2021-12-31")
+    # Проверяем, что функции были вызваны с ожидаемыми аргументами и одним и тем же набором транзакций
+    dataset = mock_dataset_cls.from_file.return_value
+    mock_get_transactions.assert_called_once_with("Такси", dataset=dataset)
+    mock_get_expenses.assert_called_once_with(dataset, "Супермаркет", "2021-12-31")
+
+
+def test_main_services_uses_given_dataset(mock_transactions_data: dict) -> None:
+    dataset = TransactionDataset(pd.DataFrame(mock_transactions_data))
+    with (
+        patch("builtins.input", side_effect=["Такси", "Продукты", "2023-08-31"]),
+        patch("src.services.get_transactions") as mock_get_transactions,
+        patch("src.services.load_transactions") as mock_load_transactions,
+    ):
+        mock_get_transactions.return_value = "[]"
+        main_services(dataset)
+
+    mock_load_transactions.assert_not_called()
+    mock_get_transactions.assert_called_once_with("Такси", dataset=dataset)
+
+
+def test_get_expenses_with_dataset(transactions_data: pd.DataFrame) -> None:
+    dataset = TransactionDataset(transactions_data)
+    result_data = json.loads(get_expenses(dataset, "Продукты", "2023-08-31"))
+    assert result_data["total_expenses"] == 250
+
+
+def test_simple_search_list_and_dataset() -> None:
+    records: List[Dict[str, Any]] = [
+        {"Описание": "Ёлки-Палки", "Категория": "Рестораны"},
+        {"Описание": "Яндекс Такси", "Категория": "Такси"},
+        {"Описание": None, "Категория": "Наличные"},
+    ]
+    expected = [{"Описание": "Ёлки-Палки", "Категория": "Рестораны"}]
+    assert json.loads(simple_search("ЕЛКИ", records)) == expected
+    assert json.loads(simple_search("елки", TransactionDataset(pd.DataFrame(records)))) == expected
+    assert json.loads(simple_search("такси", TransactionDataset(pd.DataFrame(records)))) == [records[1]]
+
+
+def test_get_transactions_with_dataset(mock_data: pd.DataFrame, tmp_path: Any) -> None:
+    output_file = str(tmp_path / "result.json")
+    result = json.loads(get_transactions("ПЕРЕВОД", output_file=output_file, dataset=TransactionDataset(mock_data)))
+    assert result == [{"Описание": "Перевод физическому лицу", "Категория": "Переводы"}]
+
+
+def test_get_transactions_without_output_file(mock_data: pd.DataFrame, tmp_path: Any, monkeypatch: Any) -> None:
+    monkeypatch.chdir(tmp_path)
+    result = json.loads(
+        get_transactions("ПЕРЕВОД", output_file=None, dataset=TransactionDataset(mock_data), indent=None)
+    )
+    assert result == [{"Описание": "Перевод физическому лицу", "Категория": "Переводы"}]
+    assert list(tmp_path.iterdir()) == []
+
+
+@pytest.fixture
+def search_data() -> pd.DataFrame:
+    return pd.DataFrame(
+        {
+            "Дата операции": ["01.06.2023 10:00:00", "15.07.2023 12:00:00", "30.07.2023 18:30:00"],
+            "Описание": ["Яндекс Такси", "Магнит", "Такси Максим"],
+            "Категория": ["Такси", "Супермаркеты", "Такси"],
+        }
+    )
+
+
+def test_get_transactions_batch(search_data: pd.DataFrame) -> None:
+    result = get_transactions_batch(["такси", "МАГНИТ", "нет такого"], search_data)
+    assert [row["Описание"] for row in result["такси"]] == ["Яндекс Такси", "Такси Максим"]
+    assert result["МАГНИТ"] == [
+        {"Дата операции": "15.07.2023 12:00:00", "Описание": "Магнит", "Категория": "Супермаркеты"}
+    ]
+    assert result["нет такого"] == []
+
+
+def test_get_transactions_batch_filters(search_data: pd.DataFrame) -> None:
+    dataset = TransactionDataset(search_data.copy())
+    result = get_transactions_batch(["такси", "магнит"], dataset, start_date="2023-07-01", end_date="2023-08-01")
+    assert [row["Описание"] for row in result["такси"]] == ["Такси Максим"]
+    assert result["такси"][0]["Дата операции"] == "30.07.2023 18:30:00"
+    result = get_transactions_batch(["а"], search_data, category=" такси ")
+    assert [row["Описание"] for row in result["а"]] == ["Яндекс Такси", "Такси Максим"]
+
+
+def test_phone_and_person_to_person_search() -> None:
+    records = [
+        {"Описание": "МТС +7 981 976-14-20", "Категория": "Мобильная связь"},
+        {"Описание": "Иван С.", "Категория": "Переводы"},
+        {"Описание": "Магнит", "Категория": "Супермаркеты"},
+    ]
+    assert json.loads(phone_number_search(records)) == [records[0]]
+    assert json.loads(person_to_person_search(records)) == [records[1]]
+    dataset = TransactionDataset(pd.DataFrame(records))
+    assert json.loads(phone_number_search(dataset)) == [records[0]]
+    assert json.loads(search_by_tag("person_to_person", dataset)) == [records[1]]
+
+
+@pytest.fixture
+def cashback_data() -> List[Dict[str, Any]]:
+    return [
+        {
+            "Дата операции": "05.01.2022 10:00:00",
+            "Статус": "OK",
+            "Категория": "Супермаркеты",
+            "Сумма платежа": -1000.0,
+        },
+        {"Дата операции": "06.01.2022 10:00:00", "Статус": "OK", "Категория": "Супермаркеты", "Сумма платежа": -500.5},
+        {"Дата операции": "07.01.2022 10:00:00", "Статус": "OK", "Категория": "Такси", "Сумма платежа": -2000.0},
+        {"Дата операции": "08.01.2022 10:00:00", "Статус": "FAILED", "Категория": "Такси", "Сумма платежа": -9000.0},
+        {"Дата операции": "09.01.2022 10:00:00", "Статус": "OK", "Категория": "Бонусы", "Сумма платежа": 300.0},
+        {"Дата операции": "01.02.2022 10:00:00", "Статус": "OK", "Категория": "Аптеки", "Сумма платежа": -100.0},
+    ]
+
+
+def test_beneficial_cashback_categories(cashback_data: List[Dict[str, Any]]) -> None:
+    result = json.loads(beneficial_cashback_categories(2022, 1, cashback_data, rates={"Супермаркеты": 0.1}))
+    assert result == {
+        "year": 2022,
+        "month": 1,
+        "categories": ["Супермаркеты", "Такси"],
+        "cashback": {"Супермаркеты": 150.05, "Такси": 100.0},
+    }
+    dataset_result = beneficial_cashback_categories(2022, 1, TransactionDataset(pd.DataFrame(cashback_data)))
+    assert json.loads(dataset_result)["categories"] == ["Такси", "Супермаркеты"]
+
+
+def test_beneficial_cashback_categories_all_months(cashback_data: List[Dict[str, Any]]) -> None:
+    result = json.loads(beneficial_cashback_categories(2022, None, pd.DataFrame(cashback_data)))
+    assert [month["month"] for month in result["months"]] == [1, 2]
+    assert result["months"][1] == {"month": 2, "categories": ["Аптеки"], "cashback": {"Аптеки": 5.0}}
+    assert json.loads(beneficial_cashback_categories(2023, 5, cashback_data))["categories"] == []
+
+
+@pytest.fixture
+def piggy_bank_data() -> pd.DataFrame:
+    return pd.DataFrame(
+        {
+            "Дата операции": [
+                "05.01.2022 10:00:00",
+                "06.01.2022 10:00:00",
+                "07.01.2022 10:00:00",
+                "08.01.2022 10:00:00",
+                "01.02.2022 10:00:00",
+                "03.01.2023 10:00:00",
+            ],
+            "Статус": ["OK", "OK", "OK", "FAILED", "OK", "OK"],
+            "Сумма платежа": [-1712.0, -100.0, 500.0, -1.0, -0.01, -49.9],
+        }
+    )
+
+
+def test_invest_piggy_bank(piggy_bank_data: pd.DataFrame) -> None:
+    result = json.loads(invest_piggy_bank(1, piggy_bank_data, 50, year=2022))
+    assert result == {"month": 1, "rounding_limit": 50, "saved_amount": 38.0}
+    # Январь другого года не смешивается с январем 2022
+    assert json.loads(invest_piggy_bank(1, piggy_bank_data.to_dict("records"), 10, year=2023))["saved_amount"] == 0.1
+    with pytest.raises(ValueError):
+        invest_piggy_bank(1, piggy_bank_data, 10)
+
+
+def test_piggy_bank_savings_month_of_two_years(piggy_bank_data: pd.DataFrame) -> None:
+    dataset = TransactionDataset(piggy_bank_data.copy())
+    assert piggy_bank_savings(dataset, [10], month=1, year=2022).to_dict() == {10: {"2022-01": 8.0}}
+    assert piggy_bank_savings(dataset, [10], month=1, year=2023).to_dict() == {10: {"2023-01": 0.1}}
+    assert piggy_bank_savings(dataset, [10], year=2023).index.tolist() == ["2023-01"]
+    with pytest.raises(ValueError):
+        piggy_bank_savings(dataset, [10], month=1)
+
+
+def test_piggy_bank_savings_several_limits(piggy_bank_data: pd.DataFrame) -> None:
+    savings = piggy_bank_savings(TransactionDataset(piggy_bank_data.copy()), [10, 50, 100])
+    assert savings.index.tolist() == ["2022-01", "2022-02", "2023-01"]
+    assert savings.loc["2022-01"].tolist() == [8.0, 38.0, 88.0]
+    assert savings.loc["2022-02"].tolist() == [9.99, 49.99, 99.99]
+    assert savings.loc["2023-01"].tolist() == [0.1, 0.1, 50.1]
+
+
+def test_invest_piggy_bank_all_months(piggy_bank_data: pd.DataFrame) -> None:
+    result = json.loads(invest_piggy_bank(None, piggy_bank_data, [10, 100], year=2022))
+    assert result["saved_amount"] == {"10": 17.99, "100": 187.99}
+    assert result["by_month"]["2022-02"] == {"10": 9.99, "100": 99.99}
+    with pytest.raises(ValueError):
+        invest_piggy_bank(1, piggy_bank_data, 0)
+
+
+def test_get_transactions_streaming(mock_data: pd.DataFrame, tmp_path: Any) -> None:
+    source = tmp_path / "operations.csv"
+    mock_data.to_csv(source, index=False)
+    output_file = str(tmp_path / "result.json")
+
+    result = json.loads(get_transactions("у", str(source), output_file, chunk_size=1))
+
+    assert [row["Описание"] for row in result] == ["Оплата услуг", "Покупка в магазине", "Перевод физическому лицу"]
 
 
 if __name__ == "__main__":
@@ -0,0 +1,129 @@
+import os
+import sys
+from typing import Any
+from unittest.mock import patch
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.cache import cache_path_for, load_frame, load_transactions
+from src.dataset import TransactionDataset
+from src.synthetic import (
+    CARDS,
+    INCOME_CATEGORIES,
+    OPERATION_COLUMNS,
+    generate_operations,
+    iter_operations,
+    main,
+    write_statement,
+)
+
+
+@pytest.fixture(scope="module")
+def operations() -> pd.DataFrame:
+    return generate_operations(20000, seed=1)
+
+
+def test_generate_operations_schema(operations: pd.DataFrame) -> None:
+    assert list(operations.columns) == OPERATION_COLUMNS
+    assert len(operations) == 20000
+    assert operations["Дата операции"].is_monotonic_decreasing
+    delay = operations["Дата платежа"] - operations["Дата операции"].dt.normalize()
+    assert delay.between(pd.Timedelta(0), pd.Timedelta(days=3)).all()
+    assert set(operations["Номер карты"].dropna()) <= {card for card, _ in CARDS}
+
+
+def test_generate_operations_distributions(operations: pd.DataFrame) -> None:
+    amounts = operations["Сумма операции"]
+    income = operations["Категория"].isin(INCOME_CATEGORIES)
+
+    assert (amounts[income] > 0).all()
+    assert 0.005 < (amounts[~income] > 0).mean() < 0.02
+    assert set(operations["Статус"]) == {"OK", "FAILED"}
+    assert {"RUB", "TRY", "EUR", "USD"} <= set(operations["Валюта операции"])
+    assert (operations["Валюта платежа"] == "RUB").all()
+    with_cashback = operations["Кэшбэк"].notna()
+    assert 0.05 < with_cashback.mean() < 0.15
+    assert (operations.loc[with_cashback, "Бонусы (включая кэшбэк)"] == operations.loc[with_cashback, "Кэшбэк"]).all()
+    assert (operations["Округление на инвесткопилку"] > 0).any()
+
+
+def test_generate_operations_tags(operations: pd.DataFrame) -> None:
+    dataset = TransactionDataset(operations.copy())
+
+    for tag in ["phone", "person_to_person", "card_to_card", "atm", "subscription"]:
+        assert len(dataset.tagged(tag)) > 0
+    phone = dataset.tagged("phone").frame
+    assert phone["MCC"].isna().all() and phone["Номер карты"].isna().all()
+
+
+def test_generate_operations_deterministic() -> None:
+    pd.testing.assert_frame_equal(generate_operations(500, seed=3), generate_operations(500, seed=3))
+    assert not generate_operations(500, seed=3).equals(generate_operations(500, seed=4))
+
+
+def test_iter_operations_chunks() -> None:
+    chunks = list(iter_operations(2500, chunk_size=1000, seed=2))
+    dates = pd.concat([chunk["Дата операции"] for chunk in chunks], ignore_index=True)
+
+    assert [len(chunk) for chunk in chunks] == [1000, 1000, 500]
+    assert dates.is_monotonic_decreasing
+    pd.testing.assert_frame_equal(next(iter_operations(2500, 5000, seed=2)), generate_operations(2500, seed=2))
+
+
+def test_write_statement_csv_with_cache(tmp_path: Any) -> None:
+    path = str(tmp_path / "statement.csv")
+
+    assert write_statement(path, 1200, chunk_size=500, cache=True) == 1200
+
+    raw = pd.read_csv(path)
+    assert list(raw.columns) == OPERATION_COLUMNS
+    assert raw["Дата операции"].iloc[0].count(".") == 2
+    assert os.path.exists(cache_path_for(path))
+    with patch("src.cache.read_statement") as mock_read:
+        cached = load_transactions(path)
+    mock_read.assert_not_called()
+    pd.testing.assert_frame_equal(cached, raw)
+
+
+def test_write_statement_npz(tmp_path: Any) -> None:
+    path = str(tmp_path / "statement.npz")
+    write_statement(path, 1200, chunk_size=500)
+    csv_path = str(tmp_path / "statement.csv")
+    write_statement(csv_path, 1200, chunk_size=500)
+
+    frame, meta = load_frame(path)
+
+    assert meta["synthetic"] == {"rows": 1200, "seed": 0}
+    pd.testing.assert_frame_equal(frame, pd.read_csv(csv_path))
+    assert len(TransactionDataset(frame)) == 1200
+
+
+def test_write_statement_xlsx_requires_openpyxl(tmp_path: Any) -> None:
+    with patch.dict(sys.modules, {"openpyxl": None}):
+        with pytest.raises(ImportError, match="openpyxl"):
+            write_statement(str(tmp_path / "statement.xlsx"), 10)
+
+
+def test_write_statement_xlsx(tmp_path: Any) -> None:
+    pytest.importorskip("openpyxl")
+    path = str(tmp_path / "statement.xlsx")
+
+    write_statement(path, 300, chunk_size=100)
+
+    assert len(load_transactions(path)) == 300
+
+
+def test_write_statement_unsupported_format(tmp_path: Any) -> None:
+    with pytest.raises(ValueError):
+        write_statement(str(tmp_path / "statement.xls"), 10)
+
+
+def test_main(tmp_path: Any, capsys: Any) -> None:
+    path = str(tmp_path / "statement.csv")
+
+    assert main([path, "--rows", "50", "--seed", "7"]) == 0
+
+    assert len(pd.read_csv(path)) == 50
+    assert np.isclose(pd.read_csv(path)["Сумма платежа"].sum(), generate_operations(50, seed=7)["Сумма платежа"].sum())
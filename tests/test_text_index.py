@@ -0,0 +1,132 @@
+from typing import Any
+from unittest.mock import Mock, patch
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.dataset import TransactionDataset
+from src.text_index import TermMatcher, TextIndex, normalize_text, trigrams
+
+
+@pytest.fixture
+def operations() -> pd.DataFrame:
+    return pd.DataFrame(
+        {
+            "Описание": ["Яндекс Такси", "Ёлки-Палки", "Перевод физическому лицу", np.nan, "такси Максим"],
+            "Категория": ["Такси", "Рестораны", "Переводы", "Наличные", "Такси"],
+        }
+    )
+
+
+def test_normalize_text() -> None:
+    assert normalize_text("ЁЛКИ Ещё") == "елки еще"
+    assert trigrams("такси") == {"так", "акс", "кси"}
+
+
+def test_search_substring(operations: pd.DataFrame) -> None:
+    index = TextIndex.from_frame(operations)
+    assert index.search("ТАКС").tolist() == [0, 4]
+    assert index.search("елки").tolist() == [1]
+    assert index.search("ёлки").tolist() == [1]
+    assert index.search("вод").tolist() == [2]
+    assert index.search("нет такого").tolist() == []
+
+
+def test_search_short_query(operations: pd.DataFrame) -> None:
+    index = TextIndex.from_frame(operations)
+    assert index.search("ли").tolist() == [2, 3]
+    assert index.search("лк").tolist() == [1]
+
+
+def test_search_columns(operations: pd.DataFrame) -> None:
+    index = TextIndex.from_frame(operations)
+    assert index.search("наличные").tolist() == [3]
+    assert index.search("наличные", ["Описание"]).tolist() == []
+
+
+def test_search_tokens(operations: pd.DataFrame) -> None:
+    index = TextIndex.from_frame(operations)
+    assert index.search_tokens("такси").tolist() == [0, 4]
+    assert index.search_tokens("Максим такси").tolist() == [4]
+    assert index.search_tokens("так").tolist() == []
+
+
+def test_search_matches_str_contains(operations: pd.DataFrame) -> None:
+    index = TextIndex.from_frame(operations)
+    for query in ["а", "такси", "физ", "лиц", "ки-"]:
+        expected = np.flatnonzero(
+            (
+                operations["Описание"].str.contains(query, case=False, regex=False, na=False)
+                | operations["Категория"].str.contains(query, case=False, regex=False, na=False)
+            ).to_numpy()
+        )
+        assert index.search(query).tolist() == expected.tolist()
+
+
+@patch("src.cache.read_xlsx")
+def test_dataset_text_index_persisted(mock_read_xlsx: Mock, tmp_path: Any, operations: pd.DataFrame) -> None:
+    source = tmp_path / "operations.xls"
+    source.write_bytes(b"content")
+    mock_read_xlsx.side_effect = lambda path: operations.copy()
+    cache_dir = str(tmp_path / "cache")
+
+    first = TransactionDataset.from_file(str(source), cache_dir)
+    assert first.search("такси").frame["Описание"].tolist() == ["Яндекс Такси", "такси Максим"]
+
+    # Списки вхождений загружаются из кэша: значения заново не разбираются на слова и триграммы
+    with patch.object(TextIndex, "_index_value", side_effect=AssertionError("индекс перестроен")):
+        second = TransactionDataset.from_file(str(source), cache_dir)
+        assert second.text_index().values == first.text_index().values
+        assert second.text_index().search("елки").tolist() == [1]
+        assert second.text_index().search_tokens("такси").tolist() == [0, 4]
+    assert sorted(path.name for path in (tmp_path / "cache").iterdir()) == [
+        "operations.xls.npz",
+        "operations.xls.text_codes.npz",
+        "operations.xls.text_tokens.npz",
+        "operations.xls.text_trigrams.npz",
+        "operations.xls.text_values.npz",
+    ]
+
+
+def test_frames_roundtrip(operations: pd.DataFrame) -> None:
+    index = TextIndex.from_frame(operations.iloc[:3])
+    index.append(operations.iloc[3:])
+    frames = index.frames()
+
+    restored = TextIndex(frames["codes"], frames["values"], frames)
+
+    for query in ["такси", "ёлки", "нал", "максим"]:
+        assert restored.search(query).tolist() == index.search(query).tolist()
+        assert restored.search_tokens(query).tolist() == index.search_tokens(query).tolist()
+    # Новое значение получает следующий код и после восстановления
+    restored.append(pd.DataFrame({"Описание": ["Новая кофейня"], "Категория": ["Такси"]}))
+    assert restored.search("кофейн").tolist() == [5]
+
+
+def test_term_matcher() -> None:
+    matcher = TermMatcher(["he", "she", "hers", "Ёж", "x"])
+    assert matcher.find("ushers") == {0, 1, 2}
+    assert matcher.find(normalize_text("ЕЖИК")) == {3}
+    assert matcher.find("") == set()
+
+
+def test_search_many_matches_search(operations: pd.DataFrame) -> None:
+    index = TextIndex.from_frame(operations)
+    queries = ["такси", "ли", "ПЕРЕВОД", "нет такого", "а"]
+    found = index.search_many(queries)
+    assert list(found) == queries
+    for query in queries:
+        assert found[query].tolist() == index.search(query).tolist()
+    assert index.search_many(["наличные"], ["Описание"])["наличные"].tolist() == []
+
+
+@pytest.mark.parametrize("prepend", [False, True])
+def test_append_matches_rebuild(operations: pd.DataFrame, prepend: bool) -> None:
+    index = TextIndex.from_frame(operations.iloc[2:] if prepend else operations.iloc[:3])
+    index.search("такси")
+    index.append(operations.iloc[:2] if prepend else operations.iloc[3:], prepend=prepend)
+    rebuilt = TextIndex.from_frame(operations)
+    for query in ["такси", "ёлки", "нал", "вод", "максим"]:
+        assert index.search(query).tolist() == rebuilt.search(query).tolist()
+    assert sorted(index.values) == sorted(rebuilt.values)
@@ -1,10 +1,18 @@
 from typing import Any, Dict, List
 from unittest.mock import Mock, mock_open, patch
 
+import numpy as np
 import pandas as pd
 import pytest
 
-from src.utils import dataframe_to_json, fetch_data_from_api, read_xlsx, welcome_message, write_json
+from src.utils import (
+    dataframe_to_json,
+    fetch_data_from_api,
+    iter_transaction_chunks,
+    read_xlsx,
+    welcome_message,
+    write_json,
+)
 
 
 # Фикстура для тестовых данных API
@@ -83,3 +91,62 @@ def test_read_xlsx(mock_read_excel: Mock, test_file_data: List[Dict[str, Any]])
 )
 def test_welcome_message(input_time: str, expected_output: str) -> None:
     assert welcome_message(input_time) == expected_output
+
+
+@pytest.fixture
+def statement_frame() -> pd.DataFrame:
+    return pd.DataFrame(
+        {
+            "Дата операции": ["01.01.2022 10:00:00", "02.01.2022 11:00:00", "03.01.2022 12:00:00"],
+            "Номер карты": ["*1234", np.nan, "*5678"],
+            "Сумма операции": [-100.5, 200.0, -50.0],
+            "MCC": [5411, 4121, 5812],
+        }
+    )
+
+
+def test_iter_transaction_chunks_csv(tmp_path: Any, statement_frame: pd.DataFrame) -> None:
+    csv_file = tmp_path / "operations.csv"
+    statement_frame.to_csv(csv_file, index=False)
+
+    chunks = list(iter_transaction_chunks(str(csv_file), chunk_size=2))
+
+    assert [len(chunk) for chunk in chunks] == [2, 1]
+    pd.testing.assert_frame_equal(pd.concat(chunks, ignore_index=True), statement_frame)
+
+
+@patch("src.utils.xlrd.open_workbook")
+def test_iter_transaction_chunks_xls(mock_open_workbook: Mock, statement_frame: pd.DataFrame) -> None:
+    import xlrd
+
+    rows = [list(statement_frame.columns)] + [
+        ["" if pd.isna(value) else value for value in row] for row in statement_frame.itertuples(index=False)
+    ]
+
+    def cell_type(value: Any) -> int:
+        if value == "":
+            return int(xlrd.XL_CELL_EMPTY)
+        return int(xlrd.XL_CELL_NUMBER if isinstance(value, (int, float)) else xlrd.XL_CELL_TEXT)
+
+    sheet = Mock(nrows=len(rows))
+    sheet.row_values.side_effect = lambda i: list(rows[i])
+    sheet.row_types.side_effect = lambda i: [cell_type(value) for value in rows[i]]
+    sheet.col_values.side_effect = lambda j, start_rowx: [row[j] for row in rows[start_rowx:]]
+    sheet.col_types.side_effect = lambda j, start_rowx: [cell_type(row[j]) for row in rows[start_rowx:]]
+    mock_open_workbook.return_value.sheet_by_index.return_value = sheet
+
+    chunks = list(iter_transaction_chunks("operations.xls", chunk_size=2))
+
+    assert [len(chunk) for chunk in chunks] == [2, 1]
+    # Последний чанк из целых сумм не становится int64: типы колонок одни для всего листа
+    for chunk in chunks:
+        pd.testing.assert_series_equal(chunk.dtypes, statement_frame.dtypes)
+    pd.testing.assert_frame_equal(pd.concat(chunks, ignore_index=True), statement_frame)
+    mock_open_workbook.return_value.release_resources.assert_called_once()
+
+
+def test_iter_transaction_chunks_errors() -> None:
+    with pytest.raises(ValueError):
+        list(iter_transaction_chunks("operations.txt"))
+    with pytest.raises(ValueError):
+        list(iter_transaction_chunks("operations.csv", chunk_size=0))
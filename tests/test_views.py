@@ -1,21 +1,31 @@
 import json
 from datetime import datetime
+from typing import Any, Optional
 from unittest.mock import Mock, patch
 
 import pandas as pd
 import pytest
+import requests
 
+from src.dataset import TransactionDataset
+from src.market import MarketDataClient
+from src.synthetic import generate_operations
 from src.views import (
     calculate_cashback,
+    card_currency_totals,
     card_data,
+    card_summary,
+    card_summary_chunks,
     cashback,
     filter_transactions_by_date,
     get_currency_rate,
     get_stock_currency,
     index_page,
     process_card_data,
+    round_amounts,
     top_transactions,
     total_costs,
+    total_costs_chunks,
 )
 
 
@@ -45,6 +55,39 @@ def test_card_data(sample_operations: list[dict[str, str | float | None]]) -> No
     assert result[0]["cashback"] == 1.0
 
 
+def test_card_data_empty() -> None:
+    assert card_data([]) == []
+    assert process_card_data([]) == []
+
+
+def test_card_summary(sample_operations: list[dict[str, str | float | None]]) -> None:
+    df = pd.DataFrame(sample_operations + [{"Номер карты": "*1234", "Сумма операции": 30.0}])
+    summary = card_summary(df)
+    assert summary.index.tolist() == ["1234", "5678"]
+    assert summary.loc["1234", "total_spent"] == 100.0
+    assert summary.loc["1234", "cashback"] == 1.0
+    assert summary.loc["1234", "operations_count"] == 2
+
+
+def test_card_currency_totals() -> None:
+    df = pd.DataFrame(
+        {
+            "Номер карты": ["*1234", "*1234", "*5678", None],
+            "Сумма операции": [-100.0, -10.0, -5.0, -1.0],
+            "Валюта операции": ["RUB", "USD", "RUB", "RUB"],
+        }
+    )
+    totals = card_currency_totals(df)
+    assert totals.loc["1234", "RUB"] == -100.0
+    assert totals.loc["1234", "USD"] == -10.0
+    assert totals.loc["5678", "USD"] == 0.0
+
+
+def test_round_amounts_matches_builtin_round() -> None:
+    values = [1738.65, 90.65, 1.15, 0.25, 160.89, 2.55, 100.0]
+    assert round_amounts(pd.Series(values)).tolist() == [round(value, 1) for value in values]
+
+
 def test_cashback() -> None:
     assert cashback(150) == 1
     assert cashback(250) == 2
@@ -64,17 +107,14 @@ def test_filter_transactions_by_date(sample_transactions: list[dict[str, str | f
     assert result[0]["Дата операции"] == "01.01.2022 12:00:00"
 
 
-@patch("src.views.read_xlsx")
 @patch("src.views.welcome_message")
 @patch("src.views.write_json")
 def test_index_page(
     mock_write_json: Mock,
     mock_welcome_message: Mock,
-    mock_read_xlsx: Mock,
     sample_transactions: list[dict[str, str | float]],
 ) -> None:
     mock_welcome_message.return_value = "Welcome!"
-    mock_read_xlsx.return_value = pd.DataFrame(sample_transactions)
 
     data_time: str = "2022-01-02 12:00:00"
     result: str = index_page(data_time, sample_transactions)
@@ -84,24 +124,90 @@ def test_index_page(
     assert len(result_dict["cards"]) == 0
 
 
-@patch("src.views.requests.get")
-def test_get_currency_rate(mock_get: Mock) -> None:
+@patch("src.views.welcome_message")
+def test_index_page_with_dataset(mock_welcome_message: Mock, sample_operations: list) -> None:
+    mock_welcome_message.return_value = "Welcome!"
+    dates = ["01.01.2022 12:00:00", "02.01.2022 12:00:00", "03.01.2022 12:00:00"]
+    dataset = TransactionDataset(pd.DataFrame(sample_operations).assign(**{"Дата операции": dates}))
+
+    result_dict: dict = json.loads(index_page("2022-01-03 00:00:00", dataset))
+    assert result_dict["cards"] == [
+        {"last_digits": "1234", "total_spent": 100.0, "cashback": 1.0},
+        {"last_digits": "5678", "total_spent": 200.0, "cashback": 2.0},
+    ]
+
+
+@pytest.mark.parametrize(
+    "data_time", ["2018-03-01 00:00:00", "2020-06-15 12:00:00", "2021-12-20 00:00:00", "2030-01-01 00:00:00"]
+)
+def test_index_page_dataset_matches_filtered_operations(data_time: str) -> None:
+    dataset = TransactionDataset(generate_operations(500, seed=3))
+    filtered = filter_transactions_by_date(dataset, datetime.strptime(data_time, "%Y-%m-%d %H:%M:%S"))
+
+    with patch("src.views.write_json"):
+        cards = json.loads(index_page(data_time, dataset))["cards"]
+
+    expected = process_card_data(filtered)
+    assert [card["last_digits"] for card in cards] == [card["last_digits"] for card in expected]
+    assert cards == [pytest.approx(card) for card in expected]
+
+
+def test_index_page_greets_by_requested_time(sample_transactions: list[dict[str, str | float]]) -> None:
+    assert json.loads(index_page("2022-01-02 08:00:00", sample_transactions))["greeting"] == "Доброе утро!"
+    assert json.loads(index_page("2022-01-02 20:00:00", sample_transactions))["greeting"] == "Добрый вечер!"
+
+
+def test_filter_transactions_by_date_skips_missing_dates(sample_transactions: list[dict[str, str | float]]) -> None:
+    transactions: list[dict[str, Any]] = [
+        *sample_transactions,
+        {"Дата операции": None, "Сумма операции": -1.0},
+        {"Сумма операции": -2.0},
+    ]
+    result = filter_transactions_by_date(transactions, datetime(2022, 1, 3, 0, 0))
+    assert [t["Сумма операции"] for t in result] == [-100.0, -200.0]
+
+
+def test_filter_transactions_by_date_dataset(sample_transactions: list[dict[str, str | float]]) -> None:
+    dataset = TransactionDataset(pd.DataFrame(sample_transactions))
+    result = filter_transactions_by_date(dataset, datetime(2022, 1, 2, 12))
+    assert isinstance(result, TransactionDataset)
+    assert result.records() == sample_transactions[:1]
+
+
+def test_total_costs_dataset(sample_transactions: list[dict[str, str | float]]) -> None:
+    assert total_costs(TransactionDataset(pd.DataFrame(sample_transactions))) == 600.0
+
+
+def test_get_currency_rate() -> None:
     mock_response: Mock = Mock()
     mock_response.json.return_value = {"rates": {"RUB": 74.0}}
     mock_response.raise_for_status = Mock()
-    mock_get.return_value = mock_response
+    client = MarketDataClient()
 
-    rate: float = get_currency_rate("USD")
+    with patch("src.views.market_client", client), patch.object(client.session, "get", return_value=mock_response):
+        rate: Optional[float] = get_currency_rate("USD")
+    assert rate is not None
     assert rate == 74.0
 
 
-@patch("src.views.yf.Ticker")
+def test_get_currency_rate_error() -> None:
+    client = MarketDataClient()
+    with (
+        patch("src.views.market_client", client),
+        patch.object(client.session, "get", side_effect=requests.ConnectionError("нет сети")),
+    ):
+        assert get_currency_rate("USD") is None
+
+
+@patch("src.market.yf.Ticker")
 def test_get_stock_currency(mock_ticker: Mock) -> None:
     mock_stock: Mock = Mock()
     mock_stock.history.return_value = pd.DataFrame({"High": [150.0]})
     mock_ticker.return_value = mock_stock
 
-    price: float = get_stock_currency("AAPL")
+    with patch("src.views.market_client", MarketDataClient()):
+        price: Optional[float] = get_stock_currency("AAPL")
+    assert price is not None
     assert price == 150.0
 
 
@@ -127,5 +233,13 @@ def test_top_transactions(sample_transactions: list[dict[str, str | float]]) ->
     assert result[0]["Сумма операции"] == -300.0
 
 
+def test_card_summary_chunks(sample_operations: list[dict[str, str | float | None]]) -> None:
+    frame = pd.DataFrame(sample_operations * 3)
+    chunks = [frame.iloc[i : i + 2] for i in range(0, len(frame), 2)]
+    pd.testing.assert_frame_equal(card_summary_chunks(chunks), card_summary(frame))
+    assert card_summary_chunks([]).empty
+    assert total_costs_chunks(chunks) == total_costs(frame.to_dict("records"))
+
+
 if __name__ == "__main__":
     pytest.main()